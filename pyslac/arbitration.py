@@ -0,0 +1,123 @@
+"""
+Site level arbitration of the attenuation profiles
+
+Due to PLC crosstalk, the CM_SLAC_PARM.REQ and the sounds of an EV may be
+received by several EVSEs of the same site, each one running its own SLAC
+session for the same run_id and PEV MAC. AttenuationArbiter collects the
+averaged attenuation profile of each of those sessions and lets only the one
+with the lowest attenuation, i.e. the EVSE the EV is most likely plugged
+into, carry on with CM_ATTEN_CHAR.IND.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from pyslac.enums import ARBITRATION_CONTEST_TTL, ARBITRATION_WINDOW
+
+logger = logging.getLogger("arbitration")
+
+
+class ArbitrationLost(Exception):
+    """Raised in the sessions whose EVSE lost the attenuation arbitration"""
+
+
+class _Contest:
+    """Sessions competing for the same run_id and PEV MAC"""
+
+    def __init__(self, created_at: float):
+        self.created_at = created_at
+        self.joined: Set[str] = set()
+        # Mean attenuation of the profile submitted by each EVSE, in dB
+        self.attenuations: Dict[str, float] = {}
+        self.winner: Optional[asyncio.Future] = None
+
+
+class AttenuationArbiter:
+    """
+    Shared by the sessions of a site (check
+    SlacSessionController.enable_attenuation_arbitration)
+
+    A session joins the contest of a (run_id, PEV MAC) once it receives
+    CM_SLAC_PARM.REQ and submits its profile once the sounding is over. The
+    winner is decided as soon as all the sessions that joined submitted their
+    profile or, at the latest, `window` seconds after the first submission.
+    The window adds up to the sounding time, which must remain within the
+    TT_EV_atten_results (1200 ms) of the EV.
+
+    :param window: max time, in seconds, to wait for the other profiles
+    """
+
+    def __init__(self, window: float = ARBITRATION_WINDOW):
+        self.window = window
+        self._contests: Dict[Tuple[bytes, bytes], _Contest] = {}
+        self.won = 0
+        self.lost = 0
+
+    def join(self, evse_id: str, run_id: bytes, pev_mac: bytes) -> None:
+        now = asyncio.get_event_loop().time()
+        # Contests whose sessions never submitted a profile are dropped
+        for key, contest in list(self._contests.items()):
+            if now - contest.created_at > ARBITRATION_CONTEST_TTL:
+                del self._contests[key]
+        contest = self._contests.get((run_id, pev_mac))
+        if contest is None:
+            contest = self._contests[(run_id, pev_mac)] = _Contest(now)
+        contest.joined.add(evse_id)
+
+    async def submit(
+        self,
+        evse_id: str,
+        run_id: bytes,
+        pev_mac: bytes,
+        aag: List[int],
+        num_groups: int,
+    ) -> bool:
+        """
+        Submits the averaged attenuation profile of the session and waits for
+        the decision
+
+        :return: True if the EVSE shall carry on with the matching
+        """
+        contest = self._contests.get((run_id, pev_mac))
+        if contest is None:
+            # The session did not join, so there is no one to compete with
+            return True
+        num_groups = num_groups or len(aag)
+        contest.attenuations[evse_id] = sum(aag[:num_groups]) / num_groups
+        if contest.winner is None:
+            contest.winner = asyncio.get_event_loop().create_future()
+        if contest.joined <= contest.attenuations.keys():
+            self._decide(contest)
+        else:
+            try:
+                await asyncio.wait_for(asyncio.shield(contest.winner), self.window)
+            except asyncio.TimeoutError:
+                self._decide(contest)
+        winner = contest.winner.result()
+        contest.joined.discard(evse_id)
+        if not contest.joined:
+            self._contests.pop((run_id, pev_mac), None)
+        if winner == evse_id:
+            self.won += 1
+            return True
+        self.lost += 1
+        logger.info(
+            "EVSE %s lost the attenuation arbitration of run_id %s to EVSE %s "
+            "(%.1f dB vs %.1f dB)",
+            evse_id,
+            run_id.hex(),
+            winner,
+            contest.attenuations[evse_id],
+            contest.attenuations[winner],
+        )
+        return False
+
+    @staticmethod
+    def _decide(contest: _Contest) -> None:
+        if contest.winner.done():
+            return
+        # min returns the first of the EVSEs with the lowest attenuation, so
+        # a tie is won by the first one to submit
+        contest.winner.set_result(
+            min(contest.attenuations, key=contest.attenuations.__getitem__)
+        )
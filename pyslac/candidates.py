@@ -0,0 +1,124 @@
+"""
+Candidate runs of a SLAC session
+
+A session follows the run (run_id and PEV MAC) of the first CM_SLAC_PARM.REQ
+it answers, but that request may come from a neighbour EV (PLC crosstalk)
+instead of the EV plugged into the EVSE. The CM_SLAC_PARM.REQ of other runs
+received afterwards are also answered, and each of those candidate runs keeps
+its own attenuation characterization state. The run that sends
+CM_SLAC_MATCH.REQ to the EVSE is the one matched; the others are dropped.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Iterator, List, Optional
+
+from pyslac.enums import SLAC_GROUPS, SLAC_MAX_CANDIDATES
+from pyslac.utils import half_round as hw
+
+
+class SlacCandidate:
+    """
+    Run answered by a session besides the one it follows. The attribute
+    names are the ones of the session, so that the frames sent to the EV of
+    the run can be built from either of them
+    """
+
+    __slots__ = (
+        "run_id",
+        "pev_mac",
+        "forwarding_sta",
+        "application_type",
+        "security_type",
+        "num_expected_sounds",
+        "num_total_sounds",
+        "num_groups",
+        "time_out_ms",
+        "aag",
+        "aag_sum",
+        "sounding_done",
+        "task",
+    )
+
+    def __init__(
+        self,
+        run_id: bytes,
+        pev_mac: bytes,
+        application_type: int,
+        security_type: int,
+    ):
+        self.run_id = run_id
+        self.pev_mac = pev_mac
+        self.forwarding_sta = pev_mac
+        self.application_type = application_type
+        self.security_type = security_type
+        self.num_expected_sounds = 0
+        self.num_total_sounds = 0
+        self.num_groups = SLAC_GROUPS
+        self.time_out_ms = 0
+        self.aag: List[int] = [0] * SLAC_GROUPS
+        self.aag_sum: List[int] = [0] * SLAC_GROUPS
+        # Set once all the sounds expected were received
+        self.sounding_done = asyncio.Event()
+        # Task concluding the sounding of the run, once it started
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def is_sounding(self) -> bool:
+        return self.task is not None and not self.sounding_done.is_set()
+
+    def add_profile(self, aag: List[int], num_groups: int) -> None:
+        """Adds the AAG of a CM_ATTEN_PROFILE.IND of the run"""
+        for group in range(num_groups):
+            self.aag_sum[group] += aag[group]
+        self.num_groups = num_groups
+        self.num_total_sounds += 1
+        if self.num_total_sounds >= self.num_expected_sounds:
+            self.sounding_done.set()
+
+    def average(self) -> None:
+        for group in range(SLAC_GROUPS):
+            self.aag[group] = hw(self.aag_sum[group] / self.num_total_sounds)
+
+    def cancel(self) -> None:
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+
+class CandidateTable:
+    """
+    Candidate runs of a session, by run_id. Once `size` runs are kept, the
+    oldest one is dropped to make room for a new one
+    """
+
+    def __init__(self, size: int = SLAC_MAX_CANDIDATES):
+        self.size = size
+        self._candidates: "OrderedDict[bytes, SlacCandidate]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._candidates)
+
+    def __iter__(self) -> Iterator[SlacCandidate]:
+        return iter(list(self._candidates.values()))
+
+    def add(self, candidate: SlacCandidate) -> None:
+        if len(self._candidates) >= self.size:
+            _, oldest = self._candidates.popitem(last=False)
+            oldest.cancel()
+        self._candidates[candidate.run_id] = candidate
+
+    def get(self, run_id: bytes) -> Optional[SlacCandidate]:
+        return self._candidates.get(run_id)
+
+    def get_by_pev_mac(self, pev_mac: bytes) -> Optional[SlacCandidate]:
+        for candidate in self._candidates.values():
+            if candidate.pev_mac == pev_mac:
+                return candidate
+        return None
+
+    def pop(self, run_id: bytes) -> Optional[SlacCandidate]:
+        return self._candidates.pop(run_id, None)
+
+    def clear(self) -> None:
+        for candidate in self._candidates.values():
+            candidate.cancel()
+        self._candidates.clear()
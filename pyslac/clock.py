@@ -0,0 +1,105 @@
+"""
+Time source of the SLAC timing
+
+The timers of the sessions (state deadlines, retry pauses, PLC readiness
+polls, expiry of incomplete fragmented MMEs, ...) are all awaited with
+asyncio.sleep/asyncio.wait_for and measured with now()/now_ms(), i.e. with
+the clock of the running event loop. Thus, the loop is the only clock to
+replace in order to control the SLAC timing.
+
+VirtualClockEventLoop is an event loop whose clock only moves forward when
+the loop has nothing left to run: instead of blocking until the next timer is
+due, it jumps straight to it. A complete matching, with its retries and the
+SLAC_INIT_TIMEOUT of 50 s included, then runs in a few milliseconds and
+always in the same order, which is what the tests and the simulations over a
+LoopbackNetwork (check pyslac.load_harness) need:
+
+    run_virtual(LoadHarness(profile).run())
+
+ATTENTION: time jumps as soon as no callback is ready, so the virtual clock
+is only meant for code that waits on timers and in-process transports; a
+frame from a raw socket or the result of a thread would arrive "late".
+"""
+import asyncio
+import selectors
+import time
+from typing import Any, Awaitable, TypeVar
+
+T = TypeVar("T")
+
+
+def now() -> float:
+    """
+    Time, in seconds, of the running event loop or, if there is no running
+    loop, of the monotonic clock
+    """
+    try:
+        return asyncio.get_running_loop().time()
+    except RuntimeError:
+        return time.monotonic()
+
+
+def now_ms() -> int:
+    return round(now() * 1000)
+
+
+class _VirtualTimeSelector:
+    """
+    Wraps the selector of a VirtualClockEventLoop: the file descriptors are
+    only polled and the time the loop would have waited for is added to the
+    virtual clock instead
+    """
+
+    def __init__(self, selector: selectors.BaseSelector, loop: "VirtualClockEventLoop"):
+        self._selector = selector
+        self._loop = loop
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            # No timer is scheduled, so only I/O can wake the loop up
+            return self._selector.select(None)
+        self._loop.advance(timeout)
+        return []
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._selector, name)
+
+
+class VirtualClockEventLoop(asyncio.SelectorEventLoop):
+    """Event loop driven by a virtual clock, starting at `start` seconds"""
+
+    def __init__(self, start: float = 0.0):
+        super().__init__()
+        self._virtual_time = start
+        self._selector = _VirtualTimeSelector(self._selector, self)
+
+    def time(self) -> float:
+        return self._virtual_time
+
+    def advance(self, seconds: float) -> None:
+        """Moves the virtual clock forward"""
+        if seconds > 0:
+            self._virtual_time += seconds
+
+
+def run_virtual(main: Awaitable[T], start: float = 0.0) -> T:
+    """
+    Same as asyncio.run, but the coroutine runs in a VirtualClockEventLoop
+    """
+    loop = VirtualClockEventLoop(start)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
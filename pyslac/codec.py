@@ -0,0 +1,29 @@
+from dataclasses import dataclass, fields
+
+
+def slotted_dataclass(cls):
+    """
+    Builds a dataclass whose instances use __slots__ instead of a per-instance
+    __dict__, which is the equivalent of `@dataclass(slots=True)` for Python
+    versions older than 3.10.
+
+    Messages and headers are created for every frame received, so dropping the
+    __dict__ considerably reduces the memory used by each of them. The
+    generated __init__, __repr__ and __eq__ are the same as the ones of a
+    regular dataclass, so the public attributes are not affected.
+
+    The class is recreated, which means the methods of the decorated class
+    cannot use the zero-argument form of super().
+    """
+    cls = dataclass(cls)
+    field_names = tuple(f.name for f in fields(cls))
+    cls_dict = dict(cls.__dict__)
+    cls_dict["__slots__"] = field_names
+    # The defaults are already bound to the generated __init__, so the class
+    # attributes holding them must be removed, otherwise they clash with the
+    # slot descriptors
+    for field_name in field_names:
+        cls_dict.pop(field_name, None)
+    cls_dict.pop("__dict__", None)
+    cls_dict.pop("__weakref__", None)
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
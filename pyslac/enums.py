@@ -102,6 +102,9 @@ class Timers(float, Enum):
 # is supposed to be done as an integer (type int)
 SLAC_ATTEN_TIMEOUT = 6  # [TT_EVSE_match_MNBC = 600 ms]
 
+# Max number of matching attempts (check pyslac.retry)
+SLAC_MAX_MATCHING_ATTEMPTS = 3  # [C_conn_max_match = min 3]
+
 
 class FramesSizes(int, Enum):
     """
@@ -128,6 +131,7 @@ class FramesSizes(int, Enum):
     CM_ATTEN_PROFILE_IND = 85
     CM_ATTEN_CHAR_RSP = 70
     CM_SLAC_MATCH_REQ = 85
+    CM_VALIDATE_REQ = 60
     LINK_STATUS_CNF = 60
 
 
@@ -151,8 +155,47 @@ SLAC_PAUSE = 0.02
 SLAC_GROUPS = 58
 SLAC_LIMIT = 40
 # Time to await after reception of a successful CM_SET_KEY.CNF
-# This timer is used and defined in the Qualcomm example
+# This timer is used and defined in the Qualcomm example. It is now the upper
+# bound of the readiness probe, which ends as soon as the PLC chip reports
+# that the new NID is active
 SLAC_SETTLE_TIME = 10
+# Interval between the VS_NW_INFO.REQ sent by the readiness probe and the max
+# time awaited for each VS_NW_INFO.CNF
+SLAC_READY_POLL_INTERVAL = 0.25
+SLAC_READY_POLL_TIMEOUT = 0.5
+# Max number of PLC nodes initialized at the same time at startup and the max
+# time, in seconds, each one may take (CM_SET_KEY.CNF plus the settle time)
+PLC_INIT_MAX_CONCURRENCY = 8
+PLC_INIT_TIMEOUT = 60
+# Number of NMK/NID pairs kept pre-derived for the next CM_SET_KEY
+KEY_POOL_SIZE = 2
+# Link monitor run after the match: min and max interval, in seconds, between
+# LINK_STATUS.REQ, max time awaited for each LINK_STATUS.CNF and number of
+# failed polls in a row after which the link is considered lost
+LINK_MONITOR_MIN_INTERVAL = 0.5
+LINK_MONITOR_MAX_INTERVAL = 8.0
+LINK_STATUS_TIMEOUT = 0.5
+LINK_MONITOR_MAX_FAILURES = 3
+# Default port of the metrics server and min time, in seconds, between two
+# renderings of the metrics page
+METRICS_SERVER_PORT = 9108
+METRICS_RENDER_INTERVAL = 1.0
+# Max time, in seconds, the attenuation arbitration waits for the profiles of
+# the other EVSEs. The sounding lasts at most TT_EVSE_match_MNBC (600 ms), so
+# the CM_ATTEN_CHAR.IND is still sent within TT_EV_atten_results (1200 ms).
+# Contests not decided after ARBITRATION_CONTEST_TTL seconds are dropped
+ARBITRATION_WINDOW = 0.2
+ARBITRATION_CONTEST_TTL = 10
+# Max number of runs, besides the one followed, a session answers while
+# waiting for the match (e.g. CM_SLAC_PARM.REQ of neighbour EVs)
+SLAC_MAX_CANDIDATES = 4
+# EV side of SLAC (check pyslac.ev_session): number of CM_START_ATTEN_CHAR.IND
+# sent, number of retransmissions of CM_SLAC_PARM.REQ and CM_SLAC_MATCH.REQ left
+# unanswered and number of CM_MNBC_SOUND.IND sent back to back, between two
+# pauses of TP_EV_batch_msg_interval (SLAC_PAUSE)
+SLAC_START_ATTEN_CHAR_INDS = 3  # [C_EV_start_atten_char_inds = 3]
+SLAC_EV_MATCH_RETRY = 2  # [C_EV_match_retry = 2]
+SLAC_SOUND_BATCH = 1
 
 ETHER_ADDR_LEN = 6
 BROADCAST_ADDR = b"\xFF" * 6
@@ -169,6 +212,15 @@ CM_SET_KEY_PMN = b"\x00"
 CM_SET_KEY_NEW_EKS = b"\x01"
 CM_SET_CCO_CAPAB = b"\x00"
 
+# CM_VALIDATE settings. The only signal type defined is the toggling of the
+# CP between states B and C by the EV
+CM_VALIDATE_SIGNAL_TYPE = 0x00
+CM_VALIDATE_RESULT_NOT_READY = 0x00
+CM_VALIDATE_RESULT_READY = 0x01
+CM_VALIDATE_RESULT_SUCCESS = 0x02
+CM_VALIDATE_RESULT_FAILURE = 0x03
+CM_VALIDATE_RESULT_NOT_REQUIRED = 0x04
+
 # MMTypes Base Codes
 CM_SET_KEY = 0x6008  # Equal to 24584 in decimal
 CM_SLAC_PARM = 0x6064
@@ -176,8 +228,15 @@ CM_START_ATTEN_CHAR = 0x6068
 CM_MNBC_SOUND = 0x6074
 CM_ATTEN_PROFILE = 0x6084
 CM_ATTEN_CHAR = 0x606C
+CM_VALIDATE = 0x6078
 CM_SLAC_MATCH = 0x607C
 
+# Qualcomm Atheros Vendor Specific MMTypes Base Codes
+VS_SW_VER = 0xA000
+VS_RESET = 0xA01C
+VS_NW_INFO = 0xA038
+LINK_STATUS = 0xA0B8
+
 # MMType Kind
 MMTYPE_REQ = 0x0000
 MMTYPE_CNF = 0x0001
@@ -188,9 +247,34 @@ MMTYPE_RSP = 0x0003
 ETH_TYPE_HPAV = 0x88E1
 
 HOMEPLUG_MMV = b"\x01"
+# The Vendor Specific MMEs follow the HomePlug AV 1.0 format, which uses
+# MMV = 0x00 and does not include the fragmentation fields
+HOMEPLUG_MMV_AV_1_0 = b"\x00"
+# Organizationally Unique Identifier of Qualcomm Atheros, which starts the
+# payload of every Vendor Specific MME
+QUALCOMM_OUI = b"\x00\xb0\x52"
 HOMEPLUG_FMSN = b"\x00"
 HOMEPLUG_FMID = b"\x00"
 
+# Size in bytes of the Ethernet header and of the HomePlug header (including
+# the FMI field)
+ETH_HEADER_SIZE = 14
+HOMEPLUG_HEADER_SIZE = 5
+# Size of the largest frame received: Ethernet header and a full payload, e.g.
+# a fragment of MME_FRAGMENT_MAX_SIZE bytes with its HomePlug header
+ETH_FRAME_MAX_SIZE = ETH_HEADER_SIZE + BUFF_MAX_SIZE
+
+# MME Fragmentation
+# Max size of the MMENTRY carried by each fragment of a MME
+MME_FRAGMENT_MAX_SIZE = BUFF_MAX_SIZE - HOMEPLUG_HEADER_SIZE
+# NF_MI is a 4 bits field, so a MME can be split into max 16 fragments
+MME_MAX_FRAGMENTS = 16
+# Time (in seconds) after which an incomplete MME is discarded
+MME_REASSEMBLY_TIMEOUT = 1.0
+# Number of MMEs that can be reassembled at the same time. Each one has a
+# preallocated buffer of MME_MAX_FRAGMENTS * MME_FRAGMENT_MAX_SIZE bytes
+MME_REASSEMBLY_SLOTS = 4
+
 
 # STATES
 STATE_UNMATCHED = 0
@@ -198,11 +282,42 @@ STATE_MATCHING = 1
 STATE_MATCHED = 2
 
 
+class SlacEvseState(int, Enum):
+    """
+    States of the EVSE SLAC state machine (check SlacEvseSession), which
+    refine the STATE_MATCHING of a session into the steps of ISO15118-3
+    """
+
+    WAIT_SLAC_PARM_REQ = 0
+    WAIT_START_ATTEN_CHAR = 1
+    SOUNDING = 2
+    WAIT_ATTEN_CHAR_RSP = 3
+    WAIT_SLAC_MATCH_REQ = 4
+    MATCHED = 5
+    # Optional validation (CM_VALIDATE), entered from WAIT_SLAC_MATCH_REQ once
+    # the EVSE is ready to count the CP toggles of the EV
+    WAIT_VALIDATE_REQ = 6
+
+
+# Event fed to the SLAC state machine when the timer of the current state
+# expires. The events of the frames received are identified by their MMTYPE
+SLAC_TIMER_EVENT = -1
+
+
 # Station Identifier
 EVSE_ID = "BBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBB"
 # The dest MAC was defined in channel.c as follows in Qualcomm open-plc
 EVSE_PLC_MAC = b"\x00\xb0\x52\x00\x00\x01"
 
+# Qualcomm Vendor Specific MMEs settings
+# MSTATUS value of a successful VS_*.CNF
+VS_MSTATUS_SUCCESS = 0x00
+# LINK_STATUS.CNF values
+LINK_STATUS_DISCONNECTED = 0x00
+LINK_STATUS_CONNECTED = 0x01
+# Size of the version string field of VS_SW_VER.CNF
+VS_SW_VER_VERSION_SIZE = 128
+
 # Qualcomm settings
 # HomePlugAV0123 (defined in evse.c and also evse.ini of Qualcomm open-plc)
 QUALCOMM_NID = b"\x02\x6b\xcb\xa5\x35\x4e\x08"
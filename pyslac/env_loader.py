@@ -0,0 +1,148 @@
+"""
+Stdlib-only loader of the settings
+
+environs (and marshmallow, which it builds upon) takes longer to import than
+the rest of pyslac, which counts on boards where pyslac is restarted as part
+of the connector recovery. StdlibEnv has the subset of the environs.Env API
+used by Config.load_envs, with the same parsing and validation, and only
+relies on the standard library (check Config.load_envs(stdlib=True)).
+
+Only the common .env syntax is supported: KEY=VALUE lines, optionally
+prefixed by `export`, with single or double quoted values and comments;
+variable expansion and multi-line values are not. Unlike environs, the .env
+file is not searched for in the parent directories.
+"""
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+# Values accepted for a boolean setting, compared case insensitively, as
+# marshmallow.fields.Boolean does
+TRUTHY = frozenset(("1", "t", "true", "y", "yes", "on"))
+FALSY = frozenset(("0", "f", "false", "n", "no", "off"))
+
+
+class EnvValidationError(ValueError):
+    """
+    :param error_messages: error messages, by name of the variable
+    """
+
+    def __init__(self, message: str, error_messages: Dict[str, List[str]]):
+        super().__init__(message)
+        self.error_messages = error_messages
+
+
+class AtMost:
+    """
+    Validator of a maximum value, the StdlibEnv counterpart of
+    marshmallow.validate.Range(max=maximum), with the same error message
+    """
+
+    def __init__(self, maximum: float):
+        self.maximum = maximum
+
+    def __call__(self, value: Any) -> Any:
+        if value > self.maximum:
+            raise ValueError(f"Must be less than or equal to {self.maximum}.")
+        return value
+
+
+def parse_env_file(path: str) -> Dict[str, str]:
+    """:return: the variables set by the .env file, by name"""
+    variables = {}
+    with open(path, encoding="utf-8") as env_file:
+        for line in env_file:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            name, value = line.split("=", 1)
+            name = name.strip()
+            if name.startswith("export "):
+                name = name[len("export ") :].strip()
+            value = value.strip()
+            if value[:1] in ("'", '"') and value[:1] in value[1:]:
+                quote = value[0]
+                value = value[1 : value.index(quote, 1)]
+                if quote == '"':
+                    value = value.replace("\\n", "\n").replace('\\"', '"')
+            elif " #" in value:
+                value = value[: value.index(" #")].rstrip()
+            variables[name] = value
+    return variables
+
+
+class StdlibEnv:
+    """
+    Reads typed settings from the environment. As with environs.Env(eager=False),
+    the errors are collected and raised at once by seal().
+    The typed getters are named after the builtins, as in environs, so they
+    are defined last
+    """
+
+    def __init__(self):
+        self._errors: Dict[str, List[str]] = {}
+
+    def read_env(self, path: Optional[str] = None, override: bool = False) -> bool:
+        """
+        Sets the variables of the .env file in the environment, if the file
+        exists
+
+        :param override: if set, replaces the variables already set
+        :return: True if the file was read
+        """
+        path = path or os.path.join(os.getcwd(), ".env")
+        if not os.path.isfile(path):
+            return False
+        for name, value in parse_env_file(path).items():
+            if override or name not in os.environ:
+                os.environ[name] = value
+        return True
+
+    def _get(
+        self,
+        name: str,
+        default: Any,
+        cast: Callable[[str], Any],
+        error: str,
+        validate: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        raw_value = os.environ.get(name)
+        if raw_value is None:
+            return default
+        try:
+            value = cast(raw_value)
+        except ValueError:
+            self._errors[name] = [error]
+            return None
+        if validate is not None:
+            try:
+                validate(value)
+            except ValueError as e:
+                self._errors[name] = [str(e)]
+                return None
+        return value
+
+    def seal(self) -> None:
+        """:raises EnvValidationError: if any variable read was invalid"""
+        if self._errors:
+            raise EnvValidationError(
+                f"Environment variables invalid: {self._errors}", self._errors
+            )
+
+    def str(self, name, default=None, validate=None):
+        return self._get(name, default, str, "Not a valid string.", validate)
+
+    def int(self, name, default=None, validate=None):
+        return self._get(name, default, int, "Not a valid integer.", validate)
+
+    def float(self, name, default=None, validate=None):
+        return self._get(name, default, float, "Not a valid number.", validate)
+
+    def bool(self, name, default=None, validate=None):
+        def cast(raw_value):
+            if raw_value.lower() in TRUTHY:
+                return True
+            if raw_value.lower() in FALSY:
+                return False
+            raise ValueError(raw_value)
+
+        return self._get(name, default, cast, "Not a valid boolean.", validate)
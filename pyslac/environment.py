@@ -1,34 +1,88 @@
 import logging
 import os
-from dataclasses import dataclass
-from typing import Optional
-
-import environs
-from marshmallow.validate import Range
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Tuple
 
 from pyslac.enums import Timers
+from pyslac.env_loader import AtMost, StdlibEnv
 
 logger = logging.getLogger(__name__)
 
+# Variables set in the environment by the .env file read last, as
+# {name: (value before, value set)}, so that the next load restores the ones
+# removed from the file
+_dotenv_variables: Dict[str, Tuple[Optional[str], str]] = {}
+
+
+def _restore_environ() -> None:
+    """
+    Undoes the changes of the .env file read last, except for the variables
+    changed since
+    """
+    for name, (previous, value) in _dotenv_variables.items():
+        if os.environ.get(name) != value:
+            continue
+        if previous is None:
+            del os.environ[name]
+        else:
+            os.environ[name] = previous
+    _dotenv_variables.clear()
+
 
 @dataclass
 class Config:
     slac_init_timeout: Optional[int] = None
     slac_atten_results_timeout: Optional[int] = None
     log_level: Optional[int] = None
+    trace_file: Optional[str] = None
+    slac_validation: bool = False
+    state_dir: Optional[str] = None
 
-    def load_envs(self, env_path: Optional[str] = None) -> None:
+    def load_envs(
+        self,
+        env_path: Optional[str] = None,
+        override: bool = False,
+        stdlib: bool = False,
+    ) -> None:
         """
         Tries to load the .env file containing all the project settings.
         If `env_path` is not specified, it will get the .env on the current
-        working directory of the project
+        working directory of the project.
+        The variables set by the .env file loaded before are restored first,
+        so that a setting removed from the file since gets its previous value
+        or default again
         Args:
             env_path (str): Absolute path to the location of the .env file
+            override (bool): if set, the values of the .env file replace the
+            ones already in the environment
+            stdlib (bool): if set, the settings are read by the stdlib-only
+            loader (check pyslac.env_loader) instead of environs, which is
+            then not imported; it is also used if environs is not installed
         """
-        env = environs.Env(eager=False)
+        env = StdlibEnv()
+        max_atten_results_timeout: Any = AtMost(1050)
+        if not stdlib:
+            # environs and marshmallow take long to import, so they are only
+            # imported when needed
+            try:
+                import environs
+                from marshmallow.validate import Range
+
+                env = environs.Env(eager=False)
+                max_atten_results_timeout = Range(max=1050)
+            except ImportError:
+                logger.debug("environs not installed, using the stdlib loader")
         if not env_path:
             env_path = os.getcwd() + "/.env"
-        env.read_env(path=env_path)  # read .env file, if it exists
+        # read .env file, if it exists
+        _restore_environ()
+        environ = dict(os.environ)
+        env.read_env(path=env_path, override=override)
+        _dotenv_variables.update(
+            (name, (environ.get(name), value))
+            for name, value in os.environ.items()
+            if environ.get(name) != value
+        )
 
         # This timer is set in docker-compose.dev.yml, for merely debugging and dev
         # reasons
@@ -39,9 +93,37 @@ class Config:
         # A max value of 1050 is imposed to this env as the EV timeout value is
         # 1200 ms as described in [V2G3-A09-31] and we dont want to trigger it
         self.slac_atten_results_timeout = env.int(
-            "ATTEN_RESULTS_TIMEOUT", default=None, validate=Range(max=1050)
+            "ATTEN_RESULTS_TIMEOUT", default=None, validate=max_atten_results_timeout
         )
 
         self.log_level = env.str("LOG_LEVEL", default="INFO")
 
+        # When set, the spans of the matching processes are appended, as JSON
+        # lines, to this file
+        self.trace_file = env.str("SLAC_TRACE_FILE", default=None)
+
+        # When set, the EVSE takes part in the optional validation step
+        # (CM_VALIDATE) requested by the EV; otherwise it answers that the
+        # validation is not required
+        self.slac_validation = env.bool("SLAC_VALIDATION", default=False)
+
+        # When set, the key and the state of each session are saved in this
+        # directory, so that the key is reused after a restart of the process
+        # (check pyslac.state_store)
+        self.state_dir = env.str("SLAC_STATE_DIR", default=None)
+
         env.seal()  # raise all errors at once, if any
+
+    def diff(self, other: "Config") -> Dict[str, Tuple[Any, Any]]:
+        """
+        :return: the settings whose value differs in `other`, as
+        {name: (value in this config, value in other)}
+        """
+        return {
+            config_field.name: (
+                getattr(self, config_field.name),
+                getattr(other, config_field.name),
+            )
+            for config_field in fields(self)
+            if getattr(self, config_field.name) != getattr(other, config_field.name)
+        }
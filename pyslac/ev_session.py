@@ -0,0 +1,337 @@
+"""
+EV side of SLAC
+
+SlacEvSession runs the matching process of the EV, as defined by ISO15118-3,
+against the EVSEs it hears:
+CM_SLAC_PARM.REQ/CNF -> CM_START_ATTEN_CHAR.IND -> CM_MNBC_SOUND.IND ->
+CM_ATTEN_CHAR.IND/RSP -> CM_SLAC_MATCH.REQ/CNF
+
+It uses the same codecs and transport as SlacEvseSession, so it runs either on
+a raw socket, e.g. to test an EVSE, or on a LoopbackSocket, which allows to
+match many simulated EVs against EVSE sessions in one process (check
+pyslac/examples/ev_simulator.py).
+"""
+import asyncio
+import logging
+import os
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Type, Union
+
+from pyslac.enums import (
+    BROADCAST_ADDR,
+    CM_ATTEN_CHAR,
+    CM_MNBC_SOUND,
+    CM_SLAC_MATCH,
+    CM_SLAC_PARM,
+    CM_START_ATTEN_CHAR,
+    ETH_FRAME_MAX_SIZE,
+    MMTYPE_CNF,
+    MMTYPE_IND,
+    MMTYPE_REQ,
+    MMTYPE_RSP,
+    SLAC_EV_MATCH_RETRY,
+    SLAC_RUNID_LEN,
+    SLAC_SOUND_BATCH,
+    SLAC_START_ATTEN_CHAR_INDS,
+    STATE_MATCHED,
+    STATE_MATCHING,
+    STATE_UNMATCHED,
+    Timers,
+)
+from pyslac.fragmentation import MmeReassembler
+from pyslac.frame_validator import FrameValidator
+from pyslac.layer_2_headers import EthernetHeader, HomePlugHeader
+from pyslac.messages import (
+    AtennChar,
+    AtennCharRsp,
+    MatchCnf,
+    MatchReq,
+    MnbcSound,
+    SlacParmCnf,
+    SlacParmReq,
+    StartAtennChar,
+)
+from pyslac.session import SlacSession
+from pyslac.sockets.async_linux_socket import create_socket, readeth, sendeth
+from pyslac.sockets.loopback import LoopbackSocket
+from pyslac.utils import get_if_hwaddr
+
+logger = logging.getLogger("slac_ev_session")
+
+EvseAnswer = Union[SlacParmCnf, AtennChar, MatchCnf]
+
+
+class SlacEvSession(SlacSession):
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        iface: str,
+        socket: Optional[LoopbackSocket] = None,
+        num_evses: Optional[int] = None,
+    ):
+        """
+        :param socket: LoopbackSocket used instead of a raw socket bound to
+        `iface` (check pyslac.sockets.loopback)
+        :param num_evses: number of EVSEs the EV hears, if known; the EV then
+        stops waiting for CM_SLAC_PARM.CNF and CM_ATTEN_CHAR.IND once all of
+        them answered, instead of waiting until TT_match_response and
+        TT_EV_atten_results expire
+        """
+        self.iface = iface
+        if socket is None:
+            host_mac = get_if_hwaddr(self.iface)
+            self.socket = create_socket(iface=self.iface, port=0)
+        else:
+            host_mac = socket.mac
+            self.socket = socket
+        self.num_evses = num_evses
+        self.reassembler = MmeReassembler()
+        self.frame_validator = FrameValidator()
+        # Number of CM_MNBC_SOUND.IND sent back to back, between two pauses
+        self.sound_batch = SLAC_SOUND_BATCH
+        # CM_ATTEN_CHAR.IND of the current run, by EVSE MAC
+        self.atten_chars: Dict[bytes, AtennChar] = {}
+        # Time, in seconds, taken by the last successful matching process
+        self.matching_time: Optional[float] = None
+        SlacSession.__init__(
+            self, state=STATE_UNMATCHED, pev_mac=host_mac, forwarding_sta=host_mac
+        )
+
+    def reset(self):
+        """Same as SlacSession.reset, but the MAC of the EV host is kept"""
+        pev_mac = self.pev_mac
+        super().reset()
+        self.pev_mac = pev_mac
+        self.forwarding_sta = pev_mac
+        self.atten_chars = {}
+
+    async def send_frame(self, frame_to_send: bytes) -> None:
+        await sendeth(s=self.socket, frame_to_send=frame_to_send, iface=self.iface)
+
+    async def _rcv_mme(self) -> bytes:
+        """
+        Reads frames from the socket until a complete and well formed MME
+        is available
+        """
+        while True:
+            frame = await readeth(self.socket, self.iface, ETH_FRAME_MAX_SIZE)
+            mme = self.reassembler.feed(frame)
+            if mme is not None and self.frame_validator.validate(mme):
+                return mme
+
+    async def rcv_mme_of_type(self, mm_type: int, timeout: Union[float, int]) -> bytes:
+        """
+        Receives frames until a MME of the given MMTYPE arrives. Other frames
+        received in the meantime are discarded
+        """
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            frame = await asyncio.wait_for(self._rcv_mme(), remaining)
+            if frame[15] | frame[16] << 8 == mm_type:
+                return frame
+
+    async def _evse_answers(
+        self,
+        mm_type: int,
+        message_cls: Type[EvseAnswer],
+        timeout: Union[float, int],
+        max_answers: Optional[int] = None,
+        evse_mac: Optional[bytes] = None,
+    ) -> AsyncIterator[Tuple[bytes, EvseAnswer]]:
+        """
+        Yields the EVSE MAC and the message of the MMEs of the given MMTYPE
+        that belong to the current run, once per EVSE, until `max_answers`
+        EVSEs answered or the timeout expired
+
+        :param evse_mac: if given, the MMEs of other EVSEs are ignored
+        """
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        evse_macs = set()
+        while max_answers is None or len(evse_macs) < max_answers:
+            try:
+                frame = await self.rcv_mme_of_type(mm_type, deadline - loop.time())
+            except asyncio.TimeoutError:
+                return
+            message = message_cls.from_bytes(frame)
+            if message.run_id != self.run_id:
+                logger.debug("%s of another run ignored", message_cls.__name__)
+                continue
+            src_mac = EthernetHeader.from_bytes(frame).src_mac
+            if src_mac in evse_macs or evse_mac not in (None, src_mac):
+                # e.g. answer to a retransmission of the request
+                continue
+            evse_macs.add(src_mac)
+            yield src_mac, message
+
+    async def ev_slac_parm(self) -> List[bytes]:
+        """
+        Broadcasts CM_SLAC_PARM.REQ, with a new run_id, until at least one
+        EVSE answers
+
+        :return: MACs of the EVSEs that answered
+        """
+        self.run_id = os.urandom(SLAC_RUNID_LEN)
+        frame_to_send = (
+            EthernetHeader(dst_mac=BROADCAST_ADDR, src_mac=self.pev_mac).pack_big()
+            + HomePlugHeader(CM_SLAC_PARM | MMTYPE_REQ).pack_big()
+            + SlacParmReq(run_id=self.run_id).pack_big()
+        )
+        for _ in range(SLAC_EV_MATCH_RETRY + 1):
+            await self.send_frame(frame_to_send)
+            evse_macs = [
+                evse_mac
+                async for evse_mac, _ in self._evse_answers(
+                    CM_SLAC_PARM | MMTYPE_CNF,
+                    SlacParmCnf,
+                    Timers.SLAC_RESP_TIMEOUT,
+                    self.num_evses,
+                )
+            ]
+            if evse_macs:
+                return evse_macs
+        raise asyncio.TimeoutError("No CM_SLAC_PARM.CNF received")
+
+    async def start_atten_char(self) -> None:
+        frame_to_send = (
+            EthernetHeader(dst_mac=BROADCAST_ADDR, src_mac=self.pev_mac).pack_big()
+            + HomePlugHeader(CM_START_ATTEN_CHAR | MMTYPE_IND).pack_big()
+            + StartAtennChar(
+                num_sounds=self.sounds,
+                time_out=self.time_out_ms,
+                forwarding_sta=self.forwarding_sta,
+                run_id=self.run_id,
+            ).pack_big()
+        )
+        for count in range(SLAC_START_ATTEN_CHAR_INDS):
+            if count:
+                await asyncio.sleep(self.pause)
+            await self.send_frame(frame_to_send)
+
+    async def mnbc_sounds(self) -> None:
+        """
+        Sends the sounds in batches of `sound_batch` frames, with a pause of
+        TP_EV_batch_msg_interval between batches. The frames are encoded
+        before the first one is sent
+        """
+        headers = (
+            EthernetHeader(dst_mac=BROADCAST_ADDR, src_mac=self.pev_mac).pack_big()
+            + HomePlugHeader(CM_MNBC_SOUND | MMTYPE_IND).pack_big()
+        )
+        frames = [
+            headers + MnbcSound(cnt=cnt, run_id=self.run_id).pack_big()
+            for cnt in range(self.sounds - 1, -1, -1)
+        ]
+        for start in range(0, len(frames), self.sound_batch):
+            if start:
+                await asyncio.sleep(self.pause)
+            for frame in frames[start : start + self.sound_batch]:
+                await self.send_frame(frame)
+
+    async def atten_char(self, timeout: Union[float, int]) -> Dict[bytes, AtennChar]:
+        """
+        Receives the CM_ATTEN_CHAR.IND of the EVSEs and answers each one
+        with CM_ATTEN_CHAR.RSP
+
+        :param timeout: time left of TT_EV_atten_results
+        :return: the CM_ATTEN_CHAR.IND received, by EVSE MAC
+        """
+        self.atten_chars = {}
+        async for evse_mac, atten_char in self._evse_answers(
+            CM_ATTEN_CHAR | MMTYPE_IND, AtennChar, timeout, self.num_evses
+        ):
+            self.atten_chars[evse_mac] = atten_char
+            frame_to_send = (
+                EthernetHeader(dst_mac=evse_mac, src_mac=self.pev_mac).pack_big()
+                + HomePlugHeader(CM_ATTEN_CHAR | MMTYPE_RSP).pack_big()
+                + AtennCharRsp(
+                    source_address=self.pev_mac,
+                    run_id=self.run_id,
+                    source_id=0x00,
+                    resp_id=0x00,
+                    result=0x00,
+                ).pack_big()
+            )
+            await self.send_frame(frame_to_send)
+        if not self.atten_chars:
+            raise asyncio.TimeoutError("No CM_ATTEN_CHAR.IND received")
+        return self.atten_chars
+
+    def select_evse(self) -> bytes:
+        """
+        :return: MAC of the EVSE with the lowest average attenuation
+        :raises ValueError: if it is above the attenuation threshold
+        """
+        attenuations = {
+            evse_mac: sum(atten_char.aag[: atten_char.num_groups])
+            / max(atten_char.num_groups, 1)
+            for evse_mac, atten_char in self.atten_chars.items()
+        }
+        evse_mac = min(attenuations, key=attenuations.get)
+        if attenuations[evse_mac] > self.slac_threshold:
+            raise ValueError(
+                f"Lowest attenuation {attenuations[evse_mac]:.1f} dB is above "
+                f"the threshold of {self.slac_threshold} dB"
+            )
+        return evse_mac
+
+    async def slac_match(self, evse_mac: bytes) -> MatchCnf:
+        frame_to_send = (
+            EthernetHeader(dst_mac=evse_mac, src_mac=self.pev_mac).pack_big()
+            + HomePlugHeader(CM_SLAC_MATCH | MMTYPE_REQ).pack_big()
+            + MatchReq(
+                pev_mac=self.pev_mac, evse_mac=evse_mac, run_id=self.run_id
+            ).pack_big()
+        )
+        match_cnf: Optional[MatchCnf] = None
+        for _ in range(SLAC_EV_MATCH_RETRY + 1):
+            await self.send_frame(frame_to_send)
+            async for _, match_cnf in self._evse_answers(
+                CM_SLAC_MATCH | MMTYPE_CNF,
+                MatchCnf,
+                Timers.SLAC_RESP_TIMEOUT,
+                max_answers=1,
+                evse_mac=evse_mac,
+            ):
+                self.evse_mac = evse_mac
+                self.nid = match_cnf.nid
+                self.nmk = match_cnf.nmk
+            if match_cnf is not None:
+                return match_cnf
+        raise asyncio.TimeoutError("No CM_SLAC_MATCH.CNF received")
+
+    async def matching_process(self) -> bytes:
+        """
+        Runs the whole matching process. The NMK and NID of the logical network
+        joined are kept in the session
+
+        :return: MAC of the EVSE matched
+        :raises asyncio.TimeoutError: if an EVSE did not answer in time
+        :raises ValueError: if no EVSE is below the attenuation threshold
+        """
+        loop = asyncio.get_event_loop()
+        time_start = loop.time()
+        self.state = STATE_MATCHING
+        try:
+            await self.ev_slac_parm()
+            # TT_EV_atten_results runs from the first CM_START_ATTEN_CHAR.IND
+            atten_results_deadline = loop.time() + Timers.SLAC_ATTEN_RESULTS_TIMEOUT
+            await self.start_atten_char()
+            await self.mnbc_sounds()
+            await self.atten_char(atten_results_deadline - loop.time())
+            await self.slac_match(self.select_evse())
+        except BaseException:
+            self.state = STATE_UNMATCHED
+            raise
+        self.matching_time = loop.time() - time_start
+        self.state = STATE_MATCHED
+        logger.debug(
+            "EV %s matched with EVSE %s in %.3f s",
+            self.pev_mac.hex(),
+            self.evse_mac.hex(),
+            self.matching_time,
+        )
+        return self.evse_mac
@@ -0,0 +1,106 @@
+"""
+Matches simulated EVs against the EVSE SLAC sessions, all in one process and
+over a LoopbackNetwork, so that neither root privileges nor PLC nodes are
+needed. Each EV is plugged into its own EVSE and, with --crosstalk, is also
+heard by the next EVSE, with a higher attenuation.
+
+$ python pyslac/examples/ev_simulator.py --evs 200 --crosstalk
+"""
+import argparse
+import asyncio
+import logging
+from statistics import mean
+from typing import List, Optional
+
+from pyslac.enums import STATE_MATCHED
+from pyslac.environment import Config
+from pyslac.ev_session import SlacEvSession
+from pyslac.session import SlacEvseSession, SlacSessionController
+from pyslac.sockets.loopback import LoopbackNetwork
+
+logger = logging.getLogger(__file__)
+
+CROSSTALK_ATTENUATION = 35
+
+
+def evse_mac(number: int) -> bytes:
+    return b"\x02\xe5" + number.to_bytes(4, "big")
+
+
+def ev_mac(number: int) -> bytes:
+    return b"\x02\xe7" + number.to_bytes(4, "big")
+
+
+async def run_ev(ev: SlacEvSession) -> Optional[bytes]:
+    try:
+        return await ev.matching_process()
+    except (asyncio.TimeoutError, ValueError) as e:
+        logger.error("EV %s not matched: %r", ev.pev_mac.hex(), e)
+        return None
+
+
+async def main(num_evs: int, crosstalk: bool):
+    network = LoopbackNetwork()
+    controller = SlacSessionController()
+    config = Config(slac_init_timeout=10)
+    evse_sessions: List[SlacEvseSession] = []
+    for number in range(num_evs):
+        socket = network.attach(evse_mac(number), plc_node=True)
+        slac_session = SlacEvseSession(f"EVSE{number}", "loop", config, socket)
+        await slac_session.evse_set_key()
+        evse_sessions.append(slac_session)
+
+    evs: List[SlacEvSession] = []
+    for number in range(num_evs):
+        network.link(ev_mac(number), evse_mac(number))
+        if crosstalk and num_evs > 1:
+            network.link(
+                ev_mac(number),
+                evse_mac((number + 1) % num_evs),
+                attenuation=CROSSTALK_ATTENUATION,
+            )
+        ev = SlacEvSession(
+            "loop", network.attach(ev_mac(number)), num_evses=2 if crosstalk else 1
+        )
+        # The sounds are sent at once, instead of TP_EV_batch_msg_interval apart
+        ev.pause = 0
+        ev.sound_batch = ev.sounds
+        evs.append(ev)
+
+    for slac_session in evse_sessions:
+        await controller.process_cp_state(slac_session, "B")
+    # The sessions wait for CM_SLAC_PARM.REQ before the EVs send it
+    await asyncio.sleep(0)
+
+    loop = asyncio.get_event_loop()
+    time_start = loop.time()
+    matched = await asyncio.gather(*(run_ev(ev) for ev in evs))
+    duration = loop.time() - time_start
+
+    well_matched = sum(evse == evse_mac(number) for number, evse in enumerate(matched))
+    matching_times = [ev.matching_time for ev in evs if ev.state == STATE_MATCHED]
+    print(f"{well_matched}/{num_evs} EVs matched with their EVSE in {duration:.2f} s")
+    if matching_times:
+        print(
+            f"Matching time: mean {mean(matching_times) * 1000:.1f} ms, "
+            f"max {max(matching_times) * 1000:.1f} ms"
+        )
+
+    for slac_session in evse_sessions:
+        await controller.process_cp_state(slac_session, "A")
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--evs", type=int, default=100, help="number of EVs")
+    parser.add_argument(
+        "--crosstalk",
+        action="store_true",
+        help="each EV is also heard by the next EVSE",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.evs, args.crosstalk))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,64 @@
+"""
+Load test of the EVSE SLAC sessions: N simulated EVs plug, following a Poisson
+process, into M EVSEs of one SlacSessionController (check
+pyslac.load_harness), and the matchings per second, the time to match
+percentiles, the retries and the CPU time per matching are printed as JSON.
+
+$ python pyslac/examples/load_test.py --evs 500 --evses 100 --rate 200
+"""
+import argparse
+import asyncio
+import json
+
+from pyslac.clock import run_virtual
+from pyslac.load_harness import LoadHarness, LoadProfile
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--evs", type=int, default=100, help="number of EVs")
+    parser.add_argument("--evses", type=int, default=100, help="number of EVSEs")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="mean plug-ins per second (all the EVs plug in at once if not set)",
+    )
+    parser.add_argument(
+        "--dwell",
+        type=float,
+        default=0.0,
+        help="time, in seconds, an EV stays plugged once matched",
+    )
+    parser.add_argument(
+        "--crosstalk",
+        action="store_true",
+        help="each EV is also heard by the next EVSE",
+    )
+    parser.add_argument(
+        "--slow-sounding",
+        action="store_true",
+        help="the EVs send their sounds TP_EV_batch_msg_interval apart",
+    )
+    parser.add_argument(
+        "--virtual-time",
+        action="store_true",
+        help="run with a virtual clock: the SLAC timers expire without waiting, "
+        "the duration and times to match are in simulated time",
+    )
+    args = parser.parse_args()
+    profile = LoadProfile(
+        num_evs=args.evs,
+        num_evses=args.evses,
+        arrival_rate=args.rate,
+        dwell_time=args.dwell,
+        crosstalk=args.crosstalk,
+        fast_sounding=not args.slow_sounding,
+    )
+    run_loop = run_virtual if args.virtual_time else asyncio.run
+    report = run_loop(LoadHarness(profile).run())
+    print(json.dumps(report.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    run()
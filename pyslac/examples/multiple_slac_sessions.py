@@ -12,9 +12,8 @@ from typing import List, Optional
 
 from pyslac.environment import Config
 from pyslac.session import SlacEvseSession, SlacSessionController
-from pyslac.utils import wait_for_tasks
+from pyslac.utils import setup_logging, wait_for_tasks
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__file__)
 
 
@@ -41,23 +40,19 @@ class SlacHandler(SlacSessionController):
         ):
             raise AttributeError("Number of evses provided is invalid.")
 
-        for evse_params in cs_config["parameters"]:
-            evse_id: str = evse_params["evse_id"]
-            network_interface: str = evse_params["network_interface"]
-            try:
-                slac_session = SlacEvseSession(
-                    evse_id, network_interface, self.slac_config
-                )
-                await slac_session.evse_set_key()
-                self.running_sessions.append(slac_session)
-            except (OSError, TimeoutError, ValueError) as e:
+        # The PLC chips of all EVSEs are initialized concurrently; the EVSEs
+        # whose initialization failed are left out
+        results = await self.init_plc_nodes(cs_config["parameters"], self.slac_config)
+        for result in results:
+            if result.is_ready:
+                self.running_sessions.append(result.session)
+            else:
                 logger.error(
-                    f"PLC chip initialization failed for "
-                    f"EVSE {evse_id}, interface "
-                    f"{network_interface}: {e}. \n"
-                    f"Please check your settings."
+                    "EVSE %s is not available, please check the settings of the "
+                    "interface %s",
+                    result.evse_id,
+                    result.iface,
                 )
-                return
         for session in self.running_sessions:
             asyncio.create_task(self.enable_hlc_and_trigger_slac(session))
 
@@ -78,13 +73,20 @@ async def main(env_path: Optional[str] = None):
     # get configuration
     slac_config = Config()
     slac_config.load_envs(env_path)
+    # Log records are written by a separate thread, off the event loop
+    log_listener = setup_logging(slac_config.log_level)
     root_dir = os.path.dirname(os.path.abspath(__file__))
     json_file = open(os.path.join(root_dir, "cs_configuration.json"))
     cs_config = json.load(json_file)
     json_file.close()
     slac_handler = SlacHandler(slac_config)
+    # `kill -HUP <pid>` applies the changes of the .env file to the sessions
+    slac_handler.install_reload_handler(env_path)
     tasks = [slac_handler.start(cs_config)]
-    await wait_for_tasks(tasks)
+    try:
+        await wait_for_tasks(tasks)
+    finally:
+        log_listener.stop()
 
 
 def run():
@@ -11,9 +11,8 @@ from typing import List, Optional
 
 from pyslac.environment import Config
 from pyslac.session import SlacEvseSession, SlacSessionController
-from pyslac.utils import wait_for_tasks
+from pyslac.utils import setup_logging, wait_for_tasks
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__file__)
 
 
@@ -75,13 +74,18 @@ async def main(env_path: Optional[str] = None):
     # get configuration
     slac_config = Config()
     slac_config.load_envs(env_path)
+    # Log records are written by a separate thread, off the event loop
+    log_listener = setup_logging(slac_config.log_level)
     root_dir = os.path.dirname(os.path.abspath(__file__))
     json_file = open(os.path.join(root_dir, "cs_configuration.json"))
     cs_config = json.load(json_file)
     json_file.close()
     slac_handler = SlacHandler(slac_config)
     tasks = [slac_handler.start(cs_config)]
-    await wait_for_tasks(tasks)
+    try:
+        await wait_for_tasks(tasks)
+    finally:
+        log_listener.stop()
 
 
 def run():
@@ -0,0 +1,223 @@
+"""
+HomePlug MME fragmentation and reassembly
+
+A MME whose MMENTRY does not fit in a single Ethernet frame is split into up to
+16 fragments. All fragments share the same FMSN (Fragmentation Message Sequence
+Number) and carry in FMID the total number of fragments (NF_MI) and the number
+of the fragment (FN_MI). Check the HomePlugHeader docstring for the details.
+"""
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pyslac.clock import now
+from pyslac.enums import (
+    ETH_HEADER_SIZE,
+    HOMEPLUG_HEADER_SIZE,
+    MME_FRAGMENT_MAX_SIZE,
+    MME_MAX_FRAGMENTS,
+    MME_REASSEMBLY_SLOTS,
+    MME_REASSEMBLY_TIMEOUT,
+)
+
+logger = logging.getLogger("fragmentation")
+
+# Position of the MMV, FMID and FMSN fields within the frame
+MMV_OFFSET = ETH_HEADER_SIZE
+FMID_OFFSET = ETH_HEADER_SIZE + 3
+FMSN_OFFSET = ETH_HEADER_SIZE + 4
+MME_ENTRY_OFFSET = ETH_HEADER_SIZE + HOMEPLUG_HEADER_SIZE
+
+
+def fragment_frame(
+    frame: bytes, fmsn: int, max_fragment_size: int = MME_FRAGMENT_MAX_SIZE
+) -> List[bytes]:
+    """
+    Splits a complete MME frame (Ethernet header + HomePlug header + MMENTRY)
+    into the frames of each one of its fragments.
+    If the MMENTRY fits in a single frame, the frame is returned as it is.
+
+    :param frame: MME frame, whose FMI field is ignored
+    :param fmsn: Fragmentation Message Sequence Number used for all fragments
+    :param max_fragment_size: max size of the MMENTRY carried by one fragment
+    :return: list with the frames to send, in order
+    """
+    mme_entry = frame[MME_ENTRY_OFFSET:]
+    if len(mme_entry) <= max_fragment_size:
+        return [frame]
+    num_fragments = -(-len(mme_entry) // max_fragment_size)
+    if num_fragments > MME_MAX_FRAGMENTS:
+        raise ValueError(
+            f"MME with {len(mme_entry)} bytes requires {num_fragments} "
+            f"fragments, but the max is {MME_MAX_FRAGMENTS}"
+        )
+    # The Ethernet header, MMV and MMTYPE are the same for all fragments
+    prefix = bytes(frame[:FMID_OFFSET])
+    fmsn_byte = (fmsn & 0xFF).to_bytes(1, "big")
+    fragments = []
+    for fragment_number in range(num_fragments):
+        start = fragment_number * max_fragment_size
+        fmid = (fragment_number << 4 | (num_fragments - 1)).to_bytes(1, "big")
+        fragments.append(
+            prefix + fmid + fmsn_byte + mme_entry[start : start + max_fragment_size]
+        )
+    return fragments
+
+
+class _ReassemblySlot:
+    """Preallocated buffer holding the fragments received for one MME"""
+
+    __slots__ = (
+        "buffer",
+        "key",
+        "header",
+        "started_at",
+        "num_fragments",
+        "fragments_rcvd",
+        "fragment_sizes",
+    )
+
+    def __init__(self, buffer_size: int):
+        self.buffer = bytearray(buffer_size)
+        self.fragment_sizes = [0] * MME_MAX_FRAGMENTS
+        self.clear()
+
+    def clear(self):
+        self.key = None
+        self.header = b""
+        self.started_at = 0.0
+        self.num_fragments = 0
+        # bitmask of the fragment numbers already received
+        self.fragments_rcvd = 0
+
+
+class MmeReassembler:
+    """
+    Reassembles fragmented MMEs, so that the layers above only deal with
+    complete MMEs.
+
+    The fragments are grouped by (source MAC, MMTYPE, FMSN) and copied into a
+    fixed number of preallocated buffers, which caps the memory used. A MME
+    that is not complete within `timeout` seconds is discarded and, if a new
+    MME arrives while all buffers are in use, the oldest incomplete one is
+    evicted.
+
+    Frames of MMEs that are not fragmented, or whose MMV is 0x00 (HomePlug AV
+    1.0 vendor specific MMEs do not have the FMI field), are returned as they
+    are, without any copy.
+    """
+
+    def __init__(
+        self,
+        slots: int = MME_REASSEMBLY_SLOTS,
+        timeout: float = MME_REASSEMBLY_TIMEOUT,
+        max_fragment_size: int = MME_FRAGMENT_MAX_SIZE,
+        time_func: Callable[[], float] = now,
+    ):
+        self.timeout = timeout
+        self.max_fragment_size = max_fragment_size
+        self._time_func = time_func
+        self._free_slots = [
+            _ReassemblySlot(MME_MAX_FRAGMENTS * max_fragment_size) for _ in range(slots)
+        ]
+        self._active_slots: Dict[Tuple[bytes, int, int], _ReassemblySlot] = {}
+        # Statistics
+        self.completed = 0
+        self.timed_out = 0
+        self.evicted = 0
+        self.discarded = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of MMEs waiting for more fragments"""
+        return len(self._active_slots)
+
+    def feed(self, frame: bytes) -> Optional[bytes]:
+        """
+        Processes a received frame.
+
+        :param frame: frame received from the socket
+        :return: the complete MME frame (with the FMI field set to 0x0000, as
+        if it was never fragmented) or None if more fragments are needed
+        """
+        if (
+            len(frame) <= FMSN_OFFSET
+            or frame[MMV_OFFSET] == 0x00
+            or frame[FMID_OFFSET] & 0x0F == 0
+        ):
+            return frame
+
+        now = self._time_func()
+        if self._active_slots:
+            self._expire(now)
+
+        fmid = frame[FMID_OFFSET]
+        num_fragments = (fmid & 0x0F) + 1
+        fragment_number = fmid >> 4
+        fragment_size = len(frame) - MME_ENTRY_OFFSET
+        if fragment_number >= num_fragments or fragment_size > self.max_fragment_size:
+            self.discarded += 1
+            logger.debug("Invalid MME fragment discarded (FMID: %#04x)", fmid)
+            return None
+
+        key = (
+            bytes(frame[6:12]),
+            int.from_bytes(frame[15:17], "little"),
+            frame[FMSN_OFFSET],
+        )
+        slot = self._active_slots.get(key)
+        if slot is None or slot.num_fragments != num_fragments:
+            if slot is not None:
+                # Same sequence number, but a different MME. Start over
+                self.discarded += 1
+                self._release(slot)
+            slot = self._acquire(key, num_fragments, now)
+
+        offset = fragment_number * self.max_fragment_size
+        slot.buffer[offset : offset + fragment_size] = frame[MME_ENTRY_OFFSET:]
+        slot.fragment_sizes[fragment_number] = fragment_size
+        if fragment_number == 0:
+            slot.header = bytes(frame[:FMID_OFFSET])
+        slot.fragments_rcvd |= 1 << fragment_number
+        if slot.fragments_rcvd != (1 << num_fragments) - 1:
+            return None
+
+        mme = bytearray(slot.header)
+        mme += b"\x00\x00"
+        for fragment_number in range(num_fragments):
+            offset = fragment_number * self.max_fragment_size
+            mme += slot.buffer[offset : offset + slot.fragment_sizes[fragment_number]]
+        self._release(slot)
+        self.completed += 1
+        return bytes(mme)
+
+    @property
+    def dropped(self) -> int:
+        """Fragments discarded and incomplete MMEs expired or evicted"""
+        return self.discarded + self.timed_out + self.evicted
+
+    def _acquire(
+        self, key: Tuple[bytes, int, int], num_fragments: int, now: float
+    ) -> _ReassemblySlot:
+        if not self._free_slots:
+            oldest = min(self._active_slots.values(), key=lambda s: s.started_at)
+            logger.debug("Reassembly buffers full, evicting MME %s", oldest.key)
+            self.evicted += 1
+            self._release(oldest)
+        slot = self._free_slots.pop()
+        slot.key = key
+        slot.started_at = now
+        slot.num_fragments = num_fragments
+        self._active_slots[key] = slot
+        return slot
+
+    def _release(self, slot: _ReassemblySlot):
+        del self._active_slots[slot.key]
+        slot.clear()
+        self._free_slots.append(slot)
+
+    def _expire(self, now: float):
+        for slot in list(self._active_slots.values()):
+            if now - slot.started_at > self.timeout:
+                logger.debug("Reassembly of MME %s timed out", slot.key)
+                self.timed_out += 1
+                self._release(slot)
@@ -0,0 +1,131 @@
+from typing import Dict, NamedTuple, Optional
+
+from pyslac.enums import (
+    CM_ATTEN_CHAR,
+    CM_ATTEN_PROFILE,
+    CM_MNBC_SOUND,
+    CM_SET_KEY,
+    CM_SLAC_MATCH,
+    CM_SLAC_PARM,
+    CM_START_ATTEN_CHAR,
+    CM_VALIDATE,
+    ETH_HEADER_SIZE,
+    ETH_TYPE_HPAV,
+    HOMEPLUG_HEADER_SIZE,
+    HOMEPLUG_MMV,
+    LINK_STATUS,
+    MMTYPE_CNF,
+    MMTYPE_IND,
+    MMTYPE_REQ,
+    MMTYPE_RSP,
+    SLAC_GROUPS,
+    VS_NW_INFO,
+    VS_RESET,
+    VS_SW_VER,
+)
+from pyslac.messages import (
+    AtennChar,
+    AtennCharRsp,
+    AttenProfile,
+    MatchCnf,
+    MatchReq,
+    MnbcSound,
+    SetKeyCnf,
+    SlacParmCnf,
+    SlacParmReq,
+    StartAtennChar,
+    ValidateCnf,
+    ValidateReq,
+)
+from pyslac.vendor_messages import LinkStatusCnf, VsNwInfoCnf, VsResetCnf, VsSwVerCnf
+
+HEADERS_SIZE = ETH_HEADER_SIZE + HOMEPLUG_HEADER_SIZE
+ETH_TYPE_HPAV_BYTES = ETH_TYPE_HPAV.to_bytes(2, "big")
+HOMEPLUG_MMV_INT = HOMEPLUG_MMV[0]
+
+
+class FrameShape(NamedTuple):
+    # Class used to decode the frame
+    message_cls: type
+    # Min size of the frame in bytes, including Ethernet and HomePlug headers
+    min_size: int
+    # Offset of the NumGroups field, for frames carrying a variable number of
+    # AAG bytes right after it
+    num_groups_offset: Optional[int] = None
+    # Expected MMV. The Vendor Specific MMEs use 0x00 (HomePlug AV 1.0)
+    mmv: int = HOMEPLUG_MMV_INT
+
+
+# Shape of each of the MMEs decoded by pyslac.messages and
+# pyslac.vendor_messages. A frame that matches its shape can be decoded by the
+# corresponding from_bytes method without indexing outside of the frame.
+# VS_NW_INFO.CNF has a variable number of nested entries, so only its fixed
+# part is checked here and its from_bytes raises ValueError if it is truncated
+FRAME_SHAPES: Dict[int, FrameShape] = {
+    CM_SET_KEY | MMTYPE_CNF: FrameShape(SetKeyCnf, 33),
+    CM_SLAC_PARM | MMTYPE_REQ: FrameShape(SlacParmReq, 29),
+    CM_SLAC_PARM | MMTYPE_CNF: FrameShape(SlacParmCnf, 44),
+    CM_START_ATTEN_CHAR | MMTYPE_IND: FrameShape(StartAtennChar, 38),
+    CM_MNBC_SOUND | MMTYPE_IND: FrameShape(MnbcSound, 71),
+    CM_ATTEN_PROFILE | MMTYPE_IND: FrameShape(AttenProfile, 27, 25),
+    CM_ATTEN_CHAR | MMTYPE_IND: FrameShape(AtennChar, 71, 70),
+    CM_ATTEN_CHAR | MMTYPE_RSP: FrameShape(AtennCharRsp, 70),
+    CM_VALIDATE | MMTYPE_REQ: FrameShape(ValidateReq, 22),
+    CM_VALIDATE | MMTYPE_CNF: FrameShape(ValidateCnf, 22),
+    CM_SLAC_MATCH | MMTYPE_REQ: FrameShape(MatchReq, 85),
+    CM_SLAC_MATCH | MMTYPE_CNF: FrameShape(MatchCnf, 109),
+    VS_SW_VER | MMTYPE_CNF: FrameShape(VsSwVerCnf, 151, mmv=0x00),
+    VS_RESET | MMTYPE_CNF: FrameShape(VsResetCnf, 21, mmv=0x00),
+    VS_NW_INFO | MMTYPE_CNF: FrameShape(VsNwInfoCnf, 21, mmv=0x00),
+    LINK_STATUS | MMTYPE_CNF: FrameShape(LinkStatusCnf, 22, mmv=0x00),
+}
+
+
+class FrameValidator:
+    """
+    Rejects malformed frames before they are decoded, so that a short or
+    hostile frame is dropped instead of raising an IndexError in the middle
+    of a SLAC phase.
+
+    The check is done in constant time: the MMTYPE is used to get the
+    expected shape of the frame from FRAME_SHAPES, and only the size of the
+    frame and, if it applies, the number of AAG groups are checked.
+    Frames with a MMTYPE not present in the table are accepted, as they are
+    not decoded by the SLAC phases.
+    """
+
+    def __init__(self, shapes: Dict[int, FrameShape] = FRAME_SHAPES):
+        self.shapes = shapes
+        self.accepted = 0
+        self.rejected = 0
+        self.rejected_by_mm_type: Dict[int, int] = {}
+
+    def validate(self, frame: bytes) -> bool:
+        """
+        :param frame: frame to check
+        :return: True if the frame can be decoded, False otherwise
+        """
+        if len(frame) < HEADERS_SIZE:
+            return self._reject(None)
+        mm_type = frame[15] | frame[16] << 8
+        shape = self.shapes.get(mm_type)
+        if shape is None:
+            self.accepted += 1
+            return True
+        if (
+            len(frame) < shape.min_size
+            or frame[12:14] != ETH_TYPE_HPAV_BYTES
+            or frame[14] != shape.mmv
+        ):
+            return self._reject(mm_type)
+        if shape.num_groups_offset is not None:
+            num_groups = frame[shape.num_groups_offset]
+            if num_groups > SLAC_GROUPS or len(frame) < shape.min_size + num_groups:
+                return self._reject(mm_type)
+        self.accepted += 1
+        return True
+
+    def _reject(self, mm_type: Optional[int]) -> bool:
+        self.rejected += 1
+        self.rejected_by_mm_type[mm_type] = self.rejected_by_mm_type.get(mm_type, 0) + 1
+        return False
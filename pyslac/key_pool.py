@@ -0,0 +1,82 @@
+"""
+Pre-derived NMK/NID pairs
+
+Each CM_SET_KEY uses a fresh NMK and the NID derived from it, so a few pairs
+are derived in advance and the one used by the next CM_SET_KEY is just taken
+from the pool.
+"""
+import logging
+from collections import deque
+from dataclasses import dataclass
+from os import urandom
+from typing import Deque, Tuple
+
+from pyslac.enums import KEY_POOL_SIZE
+from pyslac.utils import generate_nid
+
+logger = logging.getLogger("key_pool")
+
+
+def generate_key_pair() -> Tuple[bytes, bytes]:
+    """
+    Generates a new NMK, a random 16 bytes value, and derives its NID, whose
+    2 MSBs are 0b00
+
+    :return: (NMK, NID)
+    """
+    nmk = urandom(16)
+    return nmk, generate_nid(nmk)
+
+
+class KeyPool:
+    """Pool of NMK/NID pairs derived in advance"""
+
+    def __init__(self, size: int = KEY_POOL_SIZE):
+        self.size = size
+        self._pairs: Deque[Tuple[bytes, bytes]] = deque()
+        self.fill()
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+    def fill(self) -> None:
+        """Derives new pairs until the pool is full"""
+        while len(self._pairs) < self.size:
+            self._pairs.append(generate_key_pair())
+
+    def clear(self) -> None:
+        self._pairs.clear()
+
+    def take(self) -> Tuple[bytes, bytes]:
+        """
+        Takes a pair from the pool. If the pool is empty, a new pair is
+        generated on the spot
+
+        :return: (NMK, NID)
+        """
+        if self._pairs:
+            return self._pairs.popleft()
+        logger.debug("Key pool is empty, generating a new NMK/NID pair")
+        return generate_key_pair()
+
+
+@dataclass
+class KeyRotationStats:
+    """Counters of the key rotations done between sessions"""
+
+    # Key rotations started and the ones whose CM_SET_KEY failed
+    rotations: int = 0
+    failed_rotations: int = 0
+    # Plug-ins (start of a matching process) and the ones that had to wait for
+    # a key rotation still in progress
+    plugins: int = 0
+    plugins_waited: int = 0
+    # Total time, in seconds, that plug-ins waited for key rotations
+    total_wait_time: float = 0.0
+
+    @property
+    def wait_ratio(self) -> float:
+        """Ratio of plug-ins that had to wait for a key rotation"""
+        if not self.plugins:
+            return 0.0
+        return self.plugins_waited / self.plugins
@@ -1,9 +1,14 @@
-from dataclasses import dataclass
+from pyslac.codec import slotted_dataclass
+from pyslac.enums import (
+    ETH_TYPE_HPAV,
+    HOMEPLUG_FMID,
+    HOMEPLUG_FMSN,
+    HOMEPLUG_MMV,
+    HOMEPLUG_MMV_AV_1_0,
+)
 
-from pyslac.enums import ETH_TYPE_HPAV, HOMEPLUG_FMID, HOMEPLUG_FMSN, HOMEPLUG_MMV
 
-
-@dataclass
+@slotted_dataclass
 class EthernetHeader:
     #  6 bytes (channel peer)
     dst_mac: bytes
@@ -36,22 +41,29 @@ class EthernetHeader:
         )
 
 
-@dataclass
+@slotted_dataclass
 class HomePlugHeader:
     """
     All messages defined in HomePlug GREEN PHY specification Version 1.0 shall
     have the MMV field set to 0x01. HPGP spec page 494
 
     This payload is defined as follows:
-    | MMV | MMTYPE | FMSN | FMID |
+    | MMV | MMTYPE | FMID | FMSN |
 
     MMV [1 byte] = 0x01
     MMTYPE [2 bytes]: Or operation between the MMID (called MM Base value)
                       to be sent and the mm_type (REQ or CNF)
                       The Management Message Ids can be found in table 11-5
                       page 501 of HPGP standard
-    FMSN [1 byte] - Fragmentation Message Sequence number = 0x00
-    FMID [1 byte] = 0x00
+
+    FMID and FMSN form together the Fragmentation Management Information (FMI)
+    field, used when a MME does not fit in a single Ethernet frame:
+
+    FMID [1 byte] = 0x00: Bits 0-3 (NF_MI) contain the number of fragments
+                          minus one and bits 4-7 (FN_MI) the number of this
+                          fragment, starting at 0
+    FMSN [1 byte] = 0x00: Fragmentation Message Sequence Number, which is the
+                          same for all the fragments of one MME
     """
 
     mm_type: int
@@ -59,11 +71,57 @@ class HomePlugHeader:
     fmsn: bytes = HOMEPLUG_FMSN
     fmid: bytes = HOMEPLUG_FMID
 
+    @property
+    def num_fragments(self) -> int:
+        return (self.fmid[0] & 0x0F) + 1
+
+    @property
+    def fragment_number(self) -> int:
+        return self.fmid[0] >> 4
+
     def __bytes__(self, endianess: str = "big"):
         if endianess == "big":
             # The MMType is sent in little endian format
-            return self.mmv + self.mm_type.to_bytes(2, "little") + self.fmsn + self.fmid
-        return self.fmid + self.fmsn + self.mm_type.to_bytes(2, "little") + self.mmv
+            return self.mmv + self.mm_type.to_bytes(2, "little") + self.fmid + self.fmsn
+        return self.fmsn + self.fmid + self.mm_type.to_bytes(2, "little") + self.mmv
+
+    def pack_big(self):
+        return self.__bytes__()
+
+    def pack_little(self):
+        return self.__bytes__("little")
+
+    @classmethod
+    def from_bytes(cls, payload: bytes):
+        return cls(
+            mmv=payload[14].to_bytes(1, "big"),
+            mm_type=int.from_bytes(payload[15:17], "little"),
+            fmid=payload[17].to_bytes(1, "big"),
+            fmsn=payload[18].to_bytes(1, "big"),
+        )
+
+
+@slotted_dataclass
+class HomePlugVendorHeader:
+    """
+    Header used by the Qualcomm Vendor Specific MMEs (VS_*), which follow the
+    HomePlug AV 1.0 format and, thus, do not include the fragmentation fields
+
+    This payload is defined as follows:
+    | MMV | MMTYPE |
+
+    MMV [1 byte] = 0x00
+    MMTYPE [2 bytes]: Or operation between the Vendor Specific MMID and the
+                      mm_type (REQ or CNF), sent in little endian
+    """
+
+    mm_type: int
+    mmv: bytes = HOMEPLUG_MMV_AV_1_0
+
+    def __bytes__(self, endianess: str = "big"):
+        if endianess == "big":
+            return self.mmv + self.mm_type.to_bytes(2, "little")
+        return self.mm_type.to_bytes(2, "little") + self.mmv
 
     def pack_big(self):
         return self.__bytes__()
@@ -76,6 +134,4 @@ class HomePlugHeader:
         return cls(
             mmv=payload[14].to_bytes(1, "big"),
             mm_type=int.from_bytes(payload[15:17], "little"),
-            fmsn=payload[17].to_bytes(1, "big"),
-            fmid=payload[18].to_bytes(1, "big"),
         )
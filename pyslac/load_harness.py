@@ -0,0 +1,241 @@
+"""
+End-to-end load test of the EVSE SLAC stack
+
+LoadHarness runs M SlacEvseSessions under one SlacSessionController against N
+simulated EVs (check pyslac.ev_session), all in one process over a
+LoopbackNetwork. The EVs plug in following a Poisson process of the given
+arrival rate (or all at once), each one into the next free EVSE, stay plugged
+for the dwell time once matched and leave the EVSE to the next EV.
+
+The report gives the matchings per second, the time to match percentiles (from
+the plug-in to CM_SLAC_MATCH.CNF, retries included), the retries and the CPU
+time per matching, e.g. to size the number of connectors a controller board
+can handle or to catch regressions that only show under concurrency. Run with
+pyslac.clock.run_virtual, the timers expire without waiting and the durations
+are in simulated time.
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from math import ceil
+from typing import List, Optional
+
+from pyslac.enums import SLAC_MAX_MATCHING_ATTEMPTS, STATE_MATCHED, Timers
+from pyslac.environment import Config
+from pyslac.ev_session import SlacEvSession
+from pyslac.session import SlacEvseSession, SlacSessionController
+from pyslac.sockets.loopback import LoopbackNetwork
+
+logger = logging.getLogger("load_harness")
+
+# Attenuation, in dB, with which an EVSE hears the EV plugged into the
+# previous EVSE when crosstalk is simulated
+CROSSTALK_ATTENUATION = 35
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q from 0 to 100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+@dataclass
+class LoadProfile:
+    """
+    :param num_evs: number of EVs plugged in during the test
+    :param num_evses: number of EVSEs of the controller
+    :param arrival_rate: mean number of plug-ins per second; if None, all the
+    EVs plug in at once (as many as there are free EVSEs)
+    :param dwell_time: time, in seconds, an EV stays plugged once matched
+    :param crosstalk: if set, each EV is also heard by the next EVSE; the EVs
+    then wait until TT_match_response and TT_EV_atten_results expire, as
+    they do not know how many EVSEs answer
+    :param max_attempts: max number of matching attempts of an EV
+    :param fast_sounding: if set, the EVs send all their sounds at once,
+    instead of TP_EV_batch_msg_interval apart
+    :param seed: seed of the arrival times
+    """
+
+    num_evs: int = 100
+    num_evses: int = 100
+    arrival_rate: Optional[float] = None
+    dwell_time: float = 0.0
+    crosstalk: bool = False
+    max_attempts: int = SLAC_MAX_MATCHING_ATTEMPTS
+    fast_sounding: bool = True
+    seed: int = 15118
+
+
+@dataclass
+class LoadReport:
+    num_evs: int
+    num_evses: int
+    matched: int = 0
+    failed: int = 0
+    # Matching attempts restarted by the EVs and by the EVSEs
+    ev_retries: int = 0
+    evse_retries: int = 0
+    # Wall clock and CPU time, in seconds, from the first plug-in until the
+    # last EV left
+    duration: float = 0.0
+    cpu_time: float = 0.0
+    # Time to match of each EV matched, in ms
+    times_to_match: List[float] = field(default_factory=list)
+
+    @property
+    def matchings_per_second(self) -> float:
+        return self.matched / self.duration if self.duration else 0.0
+
+    @property
+    def cpu_per_matching_ms(self) -> float:
+        return self.cpu_time * 1000 / self.matched if self.matched else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "num_evs": self.num_evs,
+            "num_evses": self.num_evses,
+            "matched": self.matched,
+            "failed": self.failed,
+            "ev_retries": self.ev_retries,
+            "evse_retries": self.evse_retries,
+            "duration_s": self.duration,
+            "matchings_per_s": self.matchings_per_second,
+            "time_to_match_ms": {
+                "p50": percentile(self.times_to_match, 50),
+                "p95": percentile(self.times_to_match, 95),
+                "p99": percentile(self.times_to_match, 99),
+                "max": max(self.times_to_match, default=0.0),
+            },
+            "cpu_per_matching_ms": self.cpu_per_matching_ms,
+        }
+
+
+class LoadHarness:
+    def __init__(
+        self,
+        profile: LoadProfile,
+        config: Optional[Config] = None,
+        controller: Optional[SlacSessionController] = None,
+    ):
+        """
+        :param config: Config of the EVSE sessions
+        :param controller: controller of the EVSE sessions, e.g. with the
+        attenuation arbitration enabled
+        """
+        self.profile = profile
+        self.config = config or Config(slac_init_timeout=Timers.SLAC_INIT_TIMEOUT)
+        self.controller = controller or SlacSessionController()
+        self.network = LoopbackNetwork()
+        self.evse_sessions: List[SlacEvseSession] = []
+        self.report = LoadReport(profile.num_evs, profile.num_evses)
+        # Numbers of the EVSEs without EV plugged in
+        self._free_evses: Optional["asyncio.Queue[int]"] = None
+
+    @staticmethod
+    def evse_mac(number: int) -> bytes:
+        return b"\x02\xe5" + number.to_bytes(4, "big")
+
+    @staticmethod
+    def ev_mac(number: int) -> bytes:
+        return b"\x02\xe7" + number.to_bytes(4, "big")
+
+    async def start_evses(self) -> None:
+        """Creates the EVSE sessions and sets their keys"""
+        for number in range(self.profile.num_evses):
+            socket = self.network.attach(self.evse_mac(number), plc_node=True)
+            self.evse_sessions.append(
+                SlacEvseSession(f"EVSE{number}", "loop", self.config, socket)
+            )
+        await asyncio.gather(
+            *(slac_session.evse_set_key() for slac_session in self.evse_sessions)
+        )
+        self._free_evses = asyncio.Queue()
+        for number in range(self.profile.num_evses):
+            self._free_evses.put_nowait(number)
+
+    def arrival_times(self) -> List[float]:
+        """Plug-in time, in seconds since the start, of each EV"""
+        if self.profile.arrival_rate is None:
+            return [0.0] * self.profile.num_evs
+        rng = random.Random(self.profile.seed)
+        times = []
+        arrival = 0.0
+        for _ in range(self.profile.num_evs):
+            arrival += rng.expovariate(self.profile.arrival_rate)
+            times.append(arrival)
+        return times
+
+    async def run(self) -> LoadReport:
+        if not self.evse_sessions:
+            await self.start_evses()
+        loop = asyncio.get_event_loop()
+        time_start = loop.time()
+        cpu_start = time.process_time()
+        await asyncio.gather(
+            *(
+                self._ev_visit(number, arrival)
+                for number, arrival in enumerate(self.arrival_times())
+            )
+        )
+        self.report.duration = loop.time() - time_start
+        self.report.cpu_time = time.process_time() - cpu_start
+        self.report.evse_retries = sum(
+            slac_session.metrics.matching_retries for slac_session in self.evse_sessions
+        )
+        return self.report
+
+    async def _ev_visit(self, number: int, arrival: float) -> None:
+        """Plugs the EV in the next free EVSE, matches it and unplugs it"""
+        await asyncio.sleep(arrival)
+        evse_number = await self._free_evses.get()
+        slac_session = self.evse_sessions[evse_number]
+        ev_mac = self.ev_mac(number)
+        linked_evses = [self.evse_mac(evse_number)]
+        self.network.link(ev_mac, linked_evses[0])
+        if self.profile.crosstalk and self.profile.num_evses > 1:
+            neighbour_mac = self.evse_mac((evse_number + 1) % self.profile.num_evses)
+            self.network.link(ev_mac, neighbour_mac, CROSSTALK_ATTENUATION)
+            linked_evses.append(neighbour_mac)
+        ev = SlacEvSession(
+            "loop",
+            self.network.attach(ev_mac),
+            num_evses=None if self.profile.crosstalk else 1,
+        )
+        if self.profile.fast_sounding:
+            ev.pause = 0
+            ev.sound_batch = ev.sounds
+        try:
+            await self.controller.process_cp_state(slac_session, "B")
+            # The session waits for CM_SLAC_PARM.REQ before the EV sends it
+            await asyncio.sleep(0)
+            await self._match(ev)
+            if ev.state == STATE_MATCHED:
+                await asyncio.sleep(self.profile.dwell_time)
+        finally:
+            for evse_mac in linked_evses:
+                self.network.unlink(ev_mac, evse_mac)
+            ev.socket.close()
+            await self.controller.process_cp_state(slac_session, "A")
+            self._free_evses.put_nowait(evse_number)
+
+    async def _match(self, ev: SlacEvSession) -> None:
+        loop = asyncio.get_event_loop()
+        plugged_at = loop.time()
+        for attempt in range(1, self.profile.max_attempts + 1):
+            try:
+                await ev.matching_process()
+            except (asyncio.TimeoutError, ValueError) as e:
+                logger.debug("EV %s not matched: %r", ev.pev_mac.hex(), e)
+                if attempt == self.profile.max_attempts:
+                    self.report.failed += 1
+                    return
+                self.report.ev_retries += 1
+                await asyncio.sleep(Timers.SLAC_REPETITION_TIMEOUT)
+                continue
+            self.report.matched += 1
+            self.report.times_to_match.append((loop.time() - plugged_at) * 1000)
+            return
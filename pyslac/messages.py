@@ -1,7 +1,7 @@
 import ctypes
-from dataclasses import dataclass
-from typing import List
+from typing import List, Union
 
+from pyslac.codec import slotted_dataclass
 from pyslac.enums import (
     BROADCAST_ADDR,
     CM_SET_CCO_CAPAB,
@@ -12,6 +12,8 @@ from pyslac.enums import (
     CM_SET_KEY_PRN,
     CM_SET_KEY_TYPE,
     CM_SET_KEY_YOUR_NONCE,
+    CM_VALIDATE_RESULT_READY,
+    CM_VALIDATE_SIGNAL_TYPE,
     SLAC_APPLICATION_TYPE,
     SLAC_ATTEN_TIMEOUT,
     SLAC_MSOUNDS,
@@ -20,7 +22,7 @@ from pyslac.enums import (
 )
 
 
-@dataclass
+@slotted_dataclass
 class SetKeyReq:
     """
     Associated with CM_SET_KEY.REQ, defined in chapter 11.5.4 of the HPGP
@@ -97,7 +99,7 @@ class SetKeyReq:
         return self.__bytes__("little")
 
 
-@dataclass
+@slotted_dataclass
 class SetKeyCnf:
     """
     Associated with CM_SET_KEY.CNF, defined in chapter 11.5.5 of the HPGP
@@ -166,8 +168,9 @@ class SetKeyCnf:
         # MMType == (CM_SET_KEY | MMTYPE_CNF) fields
         # The result is ignored, because some Qualcomm chips firmware have
         # implemented the wrong logic for it and a result of 0x00 means a
-        # failure. In the future we can check if the SET_KEY_REQ was successful
-        # by sending a NW_INFO.REQ to check if the NID was really set
+        # failure. Instead, SlacEvseSession.wait_plc_ready checks if the
+        # SET_KEY_REQ was successful by sending a VS_NW_INFO.REQ to check if
+        # the NID was really set
         # if result != 0x00:
         #     TODO: Raise SLAC Exception
         #     raise ValueError("Device refused SET_KEY_REQ ")
@@ -182,7 +185,7 @@ class SetKeyCnf:
         )
 
 
-@dataclass
+@slotted_dataclass
 class SlacParmReq:
     """
     Broadcast Message
@@ -242,7 +245,7 @@ class SlacParmReq:
         )
 
 
-@dataclass
+@slotted_dataclass
 class SlacParmCnf:
     # pylint: disable=too-many-instance-attributes
     """
@@ -349,7 +352,7 @@ class SlacParmCnf:
         )
 
 
-@dataclass
+@slotted_dataclass
 class StartAtennChar:
     """
     Broadcast Message
@@ -432,7 +435,7 @@ class StartAtennChar:
         )
 
 
-@dataclass
+@slotted_dataclass
 class MnbcSound:
     """
     Broadcast Message
@@ -517,7 +520,7 @@ class MnbcSound:
         )
 
 
-@dataclass
+@slotted_dataclass
 class AttenProfile:
     """
     Sent by the HLE (HighLevel Entity/PLC chip) to the EVSE host application
@@ -543,26 +546,23 @@ class AttenProfile:
 
     pev_mac: bytes
     # it has the length of num_groups bytes
-    aag: List[int]
+    # A list of ints is also accepted, but the value is always stored as
+    # immutable bytes, as each group attenuation fits in one byte
+    aag: Union[bytes, List[int]]
     # 0x3A = 58 Groups
     num_groups: int = 0x3A
     rsvd: int = 0x00
 
+    def __post_init__(self):
+        self.aag = bytes(self.aag)
+
     def __bytes__(self, endianess: str = "big"):
-        # I probably could use here
-        # ``` python
-        # bytearray(self.aag)
-        # ```
-        # but I wouldnt have
-        # control over the number of groups used, so I decided here to go safe
-        aag_bytes = b""
-        for group in range(self.num_groups):
-            aag_bytes += self.aag[group].to_bytes(1, "big")
+        # The slice keeps the control over the number of groups used
         frame = bytearray(
             self.pev_mac
             + self.num_groups.to_bytes(1, "big")
             + self.rsvd.to_bytes(1, "big")
-            + aag_bytes
+            + self.aag[: self.num_groups]
         )
         if endianess == "big":
             return frame
@@ -581,11 +581,11 @@ class AttenProfile:
             pev_mac=payload[19:25],
             num_groups=num_groups,
             rsvd=payload[26],
-            aag=list(payload[27 : 27 + num_groups]),
+            aag=payload[27 : 27 + num_groups],
         )
 
 
-@dataclass
+@slotted_dataclass
 class AtennChar:
     # pylint: disable=too-many-instance-attributes
     """
@@ -636,7 +636,8 @@ class AtennChar:
     num_sounds: int
     num_groups: int
     #  255 bytes
-    aag: List[int]
+    # As in AttenProfile, a list of ints is accepted but stored as bytes
+    aag: Union[bytes, List[int]]
 
     application_type: int = SLAC_APPLICATION_TYPE
     security_type: int = SLAC_SECURITY_TYPE
@@ -645,6 +646,9 @@ class AtennChar:
     # 17 bytes
     resp_id: int = 0x00
 
+    def __post_init__(self):
+        self.aag = bytes(self.aag)
+
     def __bytes__(self, endianess: str = "big"):
         frame = bytearray(
             self.application_type.to_bytes(1, "big")
@@ -655,7 +659,7 @@ class AtennChar:
             + self.resp_id.to_bytes(17, "big")
             + self.num_sounds.to_bytes(1, "big")
             + self.num_groups.to_bytes(1, "big")
-            + bytearray(self.aag)
+            + self.aag
         )
         if endianess == "big":
             return frame
@@ -679,11 +683,11 @@ class AtennChar:
             resp_id=int.from_bytes(payload[52:69], "big"),
             num_sounds=payload[69],
             num_groups=num_groups,
-            aag=list(payload[71 : 71 + num_groups]),
+            aag=payload[71 : 71 + num_groups],
         )
 
 
-@dataclass
+@slotted_dataclass
 class AtennCharRsp:
     """
     Unicast Message
@@ -769,7 +773,132 @@ class AtennCharRsp:
         )
 
 
-@dataclass
+@slotted_dataclass
+class ValidateReq:
+    """
+    Unicast Message
+
+    Associated with CM_VALIDATE.REQ in chapter 11.5.55 of the HPGP
+    standard. Used by the optional validation step of ISO15118-3, in which
+    the EV toggles the Control Pilot between states B and C and the EVSE
+    counts the toggles, to confirm the EV is plugged into that EVSE
+
+    PEV -> EVSE
+
+    This payload is defined as follows:
+
+    |Signal Type|Timer|Result|
+
+    Signal Type [1 byte] - 0x00: Fixed value indicating 'PEV S2 toggles on CP'
+
+    The following parameters are under a nested field called in the HPGP
+    standard as VRVarField (Validate Request Variable Field)
+
+    Timer [1 byte]: 0x00 in the first request. In the second one, the time
+                    the EVSE shall count the toggles, in multiples of 100 ms
+                    with an offset of 100 ms (e.g. 0x09 -> 1000 ms)
+    Result [1 byte] - 0x01: Fixed value indicating 'Ready'
+
+    Message size is = 3 bytes
+    """
+
+    # 1 byte
+    timer: int = 0x00
+    # 1 byte
+    result: int = CM_VALIDATE_RESULT_READY
+    signal_type: int = CM_VALIDATE_SIGNAL_TYPE
+
+    @property
+    def toggle_time(self) -> float:
+        """Time, in seconds, the EVSE shall count the toggles"""
+        return (self.timer + 1) / 10
+
+    def __bytes__(self, endianess: str = "big"):
+        frame = bytearray(
+            self.signal_type.to_bytes(1, "big")
+            + self.timer.to_bytes(1, "big")
+            + self.result.to_bytes(1, "big")
+        )
+        if endianess == "big":
+            return frame
+        frame.reverse()
+        return frame
+
+    def pack_big(self):
+        return self.__bytes__()
+
+    def pack_little(self):
+        return self.__bytes__("little")
+
+    @classmethod
+    def from_bytes(cls, payload: ctypes) -> "ValidateReq":
+        return cls(
+            signal_type=payload[19],
+            timer=payload[20],
+            result=payload[21],
+        )
+
+
+@slotted_dataclass
+class ValidateCnf:
+    """
+    Unicast Message
+
+    Associated with CM_VALIDATE.CNF in chapter 11.5.56 of the HPGP
+    standard
+
+    EVSE -> PEV
+
+    This payload is defined as follows:
+
+    |Signal Type|ToggleNum|Result|
+
+    Signal Type [1 byte] - 0x00: Fixed value indicating 'PEV S2 toggles on CP'
+
+    The following parameters are under a nested field called in the HPGP
+    standard as VCVarField (Validate Confirmation Variable Field)
+
+    ToggleNum [1 byte]: Number of B-C-B toggles counted by the EVSE, 0x00 in
+                        the answer to the first request
+    Result [1 byte]: 0x00 - Not Ready, 0x01 - Ready, 0x02 - Success,
+                     0x03 - Failure, 0x04 - Not Required
+
+    Message size is = 3 bytes
+    """
+
+    # 1 byte
+    result: int
+    # 1 byte
+    toggle_num: int = 0x00
+    signal_type: int = CM_VALIDATE_SIGNAL_TYPE
+
+    def __bytes__(self, endianess: str = "big"):
+        frame = bytearray(
+            self.signal_type.to_bytes(1, "big")
+            + self.toggle_num.to_bytes(1, "big")
+            + self.result.to_bytes(1, "big")
+        )
+        if endianess == "big":
+            return frame
+        frame.reverse()
+        return frame
+
+    def pack_big(self):
+        return self.__bytes__()
+
+    def pack_little(self):
+        return self.__bytes__("little")
+
+    @classmethod
+    def from_bytes(cls, payload: ctypes) -> "ValidateCnf":
+        return cls(
+            signal_type=payload[19],
+            toggle_num=payload[20],
+            result=payload[21],
+        )
+
+
+@slotted_dataclass
 class MatchReq:
     # pylint: disable=too-many-instance-attributes
     """
@@ -857,7 +986,7 @@ class MatchReq:
         )
 
 
-@dataclass
+@slotted_dataclass
 class MatchCnf:
     # pylint: disable=too-many-instance-attributes
     """
@@ -0,0 +1,175 @@
+"""
+Latency instrumentation of the SLAC sessions
+
+Each SlacEvseSession keeps a SessionMetrics with fixed-bucket histograms of
+the time spent in each state of the state machine (the SLAC phases) and of the
+time between the reception of a request and the sending of its response, as
+well as the number of frames processed and discarded in each phase and of the
+frames dropped by the receive path, before reaching the state machine.
+Recording a value is just a bisect over a small tuple and an increment, so
+the instrumentation is always on.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# Upper bounds, in ms, of the histogram buckets. The last bucket holds the
+# values above the last bound. The bounds include the SLAC timers of interest,
+# e.g. TT_match_response (200 ms) and TT_match_sequence (400 ms)
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    1,
+    2,
+    5,
+    10,
+    20,
+    50,
+    100,
+    200,
+    400,
+    600,
+    1000,
+    2000,
+    5000,
+    10000,
+    20000,
+    50000,
+)
+
+
+class Histogram:
+    """Histogram with fixed buckets, that also keeps the count, sum and max"""
+
+    __slots__ = ("bounds", "buckets", "count", "total", "max")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.buckets: List[int] = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket where the quantile q (0 to 1) falls. For
+        the values above the last bound, the max value observed is returned
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket in enumerate(self.buckets[:-1]):
+            cumulative += bucket
+            if cumulative >= rank:
+                return self.bounds[index]
+        return self.max
+
+    def count_above(self, value: float) -> int:
+        """Number of values observed above `value`, which must be a bound"""
+        return sum(self.buckets[self.bounds.index(value) + 1 :])
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip(self.bounds + (float("inf"),), self.buckets)),
+        }
+
+
+class SessionMetrics:
+    """Latency histograms and frame counters of the SLAC sessions of an EVSE"""
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        # Keyed by the name of the SlacEvseState
+        self.phase_durations: Dict[str, Histogram] = {}
+        # Keyed by the name of the response MME, e.g. "CM_SLAC_PARM.CNF"
+        self.response_times: Dict[str, Histogram] = {}
+        self.frames_processed: Dict[str, int] = {}
+        self.frames_discarded: Dict[str, int] = {}
+        # Frames read from the socket and dropped before reaching the state
+        # machine, by reason: "malformed" (check pyslac.frame_validator) or
+        # "reassembly" (fragments discarded and incomplete MMEs expired or
+        # evicted, check pyslac.fragmentation)
+        self.socket_drops: Dict[str, int] = {}
+        # Matching processes in which the EV started SLAC (CM_SLAC_PARM.REQ
+        # received), the ones that ended Matched or Unmatched and the retries
+        self.matchings_attempted = 0
+        self.matchings_succeeded = 0
+        self.matchings_failed = 0
+        self.matching_retries = 0
+        # Time from the first CM_SLAC_PARM.REQ to the match ("matched") or to
+        # the last attempt failing ("given_up")
+        self.matching_times: Dict[str, Histogram] = {}
+        # Sounds received and expected, summed over all the soundings
+        self.sounds_received = 0
+        self.sounds_expected = 0
+        # Time, in seconds, taken by the initialization of the PLC node
+        self.plc_init_time = 0.0
+
+    def _histogram(self, histograms: Dict[str, Histogram], name: str) -> Histogram:
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = Histogram(self.bounds)
+        return histogram
+
+    def observe_phase(self, phase: str, duration_ms: float) -> None:
+        self._histogram(self.phase_durations, phase).observe(duration_ms)
+
+    def observe_response(self, response: str, latency_ms: float) -> None:
+        self._histogram(self.response_times, response).observe(latency_ms)
+
+    def observe_matching(self, outcome: str, duration_ms: float) -> None:
+        self._histogram(self.matching_times, outcome).observe(duration_ms)
+
+    def count_frames(self, phase: str, processed: int = 0, discarded: int = 0) -> None:
+        if processed:
+            self.frames_processed[phase] = (
+                self.frames_processed.get(phase, 0) + processed
+            )
+        if discarded:
+            self.frames_discarded[phase] = (
+                self.frames_discarded.get(phase, 0) + discarded
+            )
+
+    def count_socket_drops(self, reason: str, dropped: int = 1) -> None:
+        self.socket_drops[reason] = self.socket_drops.get(reason, 0) + dropped
+
+    def as_dict(self) -> dict:
+        return {
+            "phase_durations_ms": {
+                phase: histogram.as_dict()
+                for phase, histogram in self.phase_durations.items()
+            },
+            "response_times_ms": {
+                response: histogram.as_dict()
+                for response, histogram in self.response_times.items()
+            },
+            "matching_times_ms": {
+                outcome: histogram.as_dict()
+                for outcome, histogram in self.matching_times.items()
+            },
+            "frames_processed": dict(self.frames_processed),
+            "frames_discarded": dict(self.frames_discarded),
+            "socket_drops": dict(self.socket_drops),
+            "matchings_attempted": self.matchings_attempted,
+            "matchings_succeeded": self.matchings_succeeded,
+            "matchings_failed": self.matchings_failed,
+            "matching_retries": self.matching_retries,
+            "sounds_received": self.sounds_received,
+            "sounds_expected": self.sounds_expected,
+            "plc_init_time": self.plc_init_time,
+        }
@@ -0,0 +1,267 @@
+"""
+Prometheus exporter of the SLAC sessions metrics
+
+MetricsServer serves, over HTTP on a TCP port or on a Unix socket, the
+metrics kept by each SlacEvseSession (check pyslac.metrics) in the Prometheus
+text format. The page is rendered from the in-memory counters only, at most
+once every `render_interval` seconds; scrapes in between get the cached page,
+so scraping does not compete with the SLAC timing.
+"""
+import asyncio
+import logging
+from time import monotonic
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from pyslac.enums import METRICS_RENDER_INTERVAL
+from pyslac.metrics import Histogram
+
+if TYPE_CHECKING:
+    from pyslac.session import SlacEvseSession
+
+logger = logging.getLogger("metrics_server")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Max time, in seconds, a client has to send its request
+REQUEST_TIMEOUT = 2.0
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class _Page:
+    """Lines of the Prometheus text format, grouped by metric family"""
+
+    def __init__(self):
+        self._families: Dict[str, List[str]] = {}
+
+    def add(
+        self, name: str, metric_type: str, help_text: str, labels: Labels, value
+    ) -> None:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = [
+                f"# HELP {name} {help_text}",
+                f"# TYPE {name} {metric_type}",
+            ]
+        family.append(f"{name}{_format_labels(labels)} {value}")
+
+    def add_histogram(
+        self, name: str, help_text: str, labels: Labels, histogram: Histogram
+    ) -> None:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = [
+                f"# HELP {name} {help_text}",
+                f"# TYPE {name} histogram",
+            ]
+        cumulative = 0
+        for bound, bucket in zip(histogram.bounds, histogram.buckets):
+            cumulative += bucket
+            bucket_labels = labels + (("le", str(bound)),)
+            family.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+        bucket_labels = labels + (("le", "+Inf"),)
+        family.append(f"{name}_bucket{_format_labels(bucket_labels)} {histogram.count}")
+        family.append(f"{name}_sum{_format_labels(labels)} {histogram.total}")
+        family.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        return "".join("\n".join(family) + "\n" for family in self._families.values())
+
+
+def render_metrics(sessions: Dict[str, "SlacEvseSession"]) -> str:
+    """
+    Renders the metrics of the sessions, by EVSE ID, in the Prometheus text
+    format
+    """
+    page = _Page()
+    for evse_id, slac_session in sessions.items():
+        evse: Labels = (("evse_id", evse_id),)
+        metrics = slac_session.metrics
+        for name, help_text, value in (
+            (
+                "pyslac_matchings_attempted_total",
+                "Matching processes started by the EV.",
+                metrics.matchings_attempted,
+            ),
+            (
+                "pyslac_matchings_succeeded_total",
+                "Matching processes that ended Matched.",
+                metrics.matchings_succeeded,
+            ),
+            (
+                "pyslac_matchings_failed_total",
+                "Matching processes that failed after all retries.",
+                metrics.matchings_failed,
+            ),
+            (
+                "pyslac_matching_retries_total",
+                "Retries of failed matching processes.",
+                metrics.matching_retries,
+            ),
+            (
+                "pyslac_sounds_received_total",
+                "Sounds received during the attenuation characterization.",
+                metrics.sounds_received,
+            ),
+            (
+                "pyslac_sounds_expected_total",
+                "Sounds announced by the EV for the attenuation characterization.",
+                metrics.sounds_expected,
+            ),
+            (
+                "pyslac_frames_rejected_total",
+                "Malformed frames dropped before being decoded.",
+                slac_session.frame_validator.rejected,
+            ),
+            (
+                "pyslac_fragments_timed_out_total",
+                "MMEs whose fragments did not arrive in time.",
+                slac_session.reassembler.timed_out,
+            ),
+            (
+                "pyslac_fragments_discarded_total",
+                "MME fragments discarded by the reassembly.",
+                slac_session.reassembler.discarded,
+            ),
+        ):
+            page.add(name, "counter", help_text, evse, value)
+        page.add(
+            "pyslac_plc_init_seconds",
+            "gauge",
+            "Time taken by the initialization of the PLC node.",
+            evse,
+            metrics.plc_init_time,
+        )
+        for phase, processed in metrics.frames_processed.items():
+            page.add(
+                "pyslac_frames_processed_total",
+                "counter",
+                "Frames processed by each SLAC phase.",
+                evse + (("phase", phase),),
+                processed,
+            )
+        for phase, discarded in metrics.frames_discarded.items():
+            page.add(
+                "pyslac_frames_discarded_total",
+                "counter",
+                "Frames discarded during each SLAC phase.",
+                evse + (("phase", phase),),
+                discarded,
+            )
+        for reason, dropped in metrics.socket_drops.items():
+            page.add(
+                "pyslac_socket_drops_total",
+                "counter",
+                "Frames read from the socket and dropped by the receive path.",
+                evse + (("reason", reason),),
+                dropped,
+            )
+        for phase, histogram in metrics.phase_durations.items():
+            page.add_histogram(
+                "pyslac_phase_duration_milliseconds",
+                "Time spent in each SLAC phase.",
+                evse + (("phase", phase),),
+                histogram,
+            )
+        for outcome, histogram in metrics.matching_times.items():
+            page.add_histogram(
+                "pyslac_matching_duration_milliseconds",
+                "Time from the first CM_SLAC_PARM.REQ to the match or to giving up.",
+                evse + (("outcome", outcome),),
+                histogram,
+            )
+        for response, histogram in metrics.response_times.items():
+            page.add_histogram(
+                "pyslac_response_time_milliseconds",
+                "Time from the reception of a request to the sending of its "
+                "response.",
+                evse + (("response", response),),
+                histogram,
+            )
+    return page.render()
+
+
+class MetricsServer:
+    """
+    Serves the metrics of the sessions on a TCP port or, if `path` is given,
+    on a Unix socket. Any GET request is answered with the metrics page.
+
+    :param get_sessions: callable returning the sessions to export, by EVSE ID
+    :param render_interval: min time, in seconds, between renderings
+    """
+
+    def __init__(
+        self,
+        get_sessions: Callable[[], Dict[str, "SlacEvseSession"]],
+        render_interval: float = METRICS_RENDER_INTERVAL,
+    ):
+        self.get_sessions = get_sessions
+        self.render_interval = render_interval
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.renderings = 0
+        self._page = b""
+        self._rendered_at: Optional[float] = None
+
+    def page(self) -> bytes:
+        """The metrics page, rendered again if the cached one is too old"""
+        now = monotonic()
+        if self._rendered_at is None or now - self._rendered_at >= self.render_interval:
+            self._page = render_metrics(self.get_sessions()).encode()
+            self._rendered_at = now
+            self.renderings += 1
+        return self._page
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 0, path: Optional[str] = None
+    ) -> None:
+        if path:
+            self.server = await asyncio.start_unix_server(self._handle, path=path)
+            logger.info("Serving metrics on %s", path)
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port)
+            logger.info("Serving metrics on %s", self.sockname)
+
+    @property
+    def sockname(self):
+        return self.server.sockets[0].getsockname() if self.server else None
+
+    async def stop(self) -> None:
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+            # The headers are not used, but must be read before answering
+            while (await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)).strip():
+                pass
+            if request_line.split(b" ", 1)[0] == b"GET":
+                body = self.page()
+                status = b"200 OK"
+            else:
+                body = b""
+                status = b"405 Method Not Allowed"
+            writer.write(
+                b"HTTP/1.0 " + status + b"\r\n"
+                b"Content-Type: " + CONTENT_TYPE.encode() + b"\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                b"Connection: close\r\n\r\n" + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            logger.debug("Metrics request failed: %r", e)
+        finally:
+            writer.close()
@@ -0,0 +1,64 @@
+"""
+Retry policy of the matching process
+
+According to ISO15118-3, a failed matching process may be restarted:
+[V2G3-A09-124] - In case the matching process is considered as FAILED, wait
+for a time of TT_matching_rate before restarting the process.
+[V2G3-A09-125] - If the matching process fails for all retries started within
+TT_matching_repetition, the matching process shall be stopped in "Unmatched"
+state.
+The number of attempts is limited by C_conn_max_match (min 3).
+
+RetryPolicy holds these limits, which can be tuned per EVSE (check
+SlacEvseSession.retry_policy), and decides whether a failed attempt is
+retried. Errors can be classified as fatal, so that the matching is given up
+right away, e.g. to retry timeouts but not protocol errors.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Tuple, Type
+
+from pyslac.clock import now
+from pyslac.enums import SLAC_MAX_MATCHING_ATTEMPTS, Timers
+
+
+@dataclass
+class RetryPolicy:
+    """
+    :param max_attempts: max number of matching attempts (C_conn_max_match)
+    :param pause: time, in seconds, awaited before a new attempt
+    (TT_matching_rate)
+    :param repetition_window: time, in seconds, since the first CM_SLAC_PARM.REQ
+    within which new attempts may start (TT_matching_repetition)
+    :param fail_fast_errors: errors after which the matching is given up
+    without further attempts
+    :param clock: returns the current time, in seconds (by default, the time
+    of the event loop, check pyslac.clock)
+    :param sleep: coroutine function used to await the pause
+    """
+
+    max_attempts: int = SLAC_MAX_MATCHING_ATTEMPTS
+    pause: float = Timers.SLAC_REPETITION_TIMEOUT
+    repetition_window: float = Timers.SLAC_TOTAL_REPETITIONS_TIMEOUT
+    fail_fast_errors: Tuple[Type[BaseException], ...] = ()
+    clock: Callable[[], float] = now
+    sleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+
+    def is_fatal(self, error: Optional[BaseException]) -> bool:
+        return error is not None and isinstance(error, self.fail_fast_errors)
+
+    def should_retry(
+        self,
+        failed_attempts: int,
+        started_at: float,
+        error: Optional[BaseException] = None,
+    ) -> bool:
+        """
+        :param failed_attempts: number of attempts failed so far
+        :param started_at: clock() value when the first attempt started
+        :param error: error that made the last attempt fail, if any
+        :return: True if a new attempt shall start once the pause is over
+        """
+        if self.is_fatal(error) or failed_attempts >= self.max_attempts:
+            return False
+        return self.clock() + self.pause - started_at <= self.repetition_window
@@ -1,13 +1,32 @@
 import asyncio
 import logging
+import signal
 from binascii import hexlify
-from dataclasses import dataclass, field
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field, replace
+from functools import partial
 from inspect import isawaitable
-from os import urandom
-from typing import List, Optional, Union
+from time import perf_counter
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from pyslac import __version__
+from pyslac.arbitration import ArbitrationLost, AttenuationArbiter
+from pyslac.candidates import CandidateTable, SlacCandidate
+from pyslac.clock import now_ms
 from pyslac.enums import (
+    ARBITRATION_WINDOW,
     CM_ATTEN_CHAR,
     CM_ATTEN_PROFILE,
     CM_MNBC_SOUND,
@@ -15,31 +34,56 @@ from pyslac.enums import (
     CM_SLAC_MATCH,
     CM_SLAC_PARM,
     CM_START_ATTEN_CHAR,
-    ETH_TYPE_HPAV,
+    CM_VALIDATE,
+    CM_VALIDATE_RESULT_FAILURE,
+    CM_VALIDATE_RESULT_NOT_REQUIRED,
+    CM_VALIDATE_RESULT_READY,
+    CM_VALIDATE_RESULT_SUCCESS,
+    CM_VALIDATE_SIGNAL_TYPE,
+    ETH_FRAME_MAX_SIZE,
     EVSE_PLC_MAC,
-    HOMEPLUG_MMV,
+    LINK_MONITOR_MAX_FAILURES,
+    LINK_MONITOR_MAX_INTERVAL,
+    LINK_MONITOR_MIN_INTERVAL,
+    LINK_STATUS,
+    LINK_STATUS_TIMEOUT,
+    METRICS_SERVER_PORT,
     MMTYPE_CNF,
     MMTYPE_IND,
     MMTYPE_REQ,
     MMTYPE_RSP,
+    PLC_INIT_MAX_CONCURRENCY,
+    PLC_INIT_TIMEOUT,
     SLAC_ATTEN_TIMEOUT,
     SLAC_GROUPS,
     SLAC_LIMIT,
     SLAC_MSOUNDS,
     SLAC_PAUSE,
+    SLAC_READY_POLL_INTERVAL,
+    SLAC_READY_POLL_TIMEOUT,
     SLAC_RESP_TYPE,
     SLAC_SETTLE_TIME,
+    SLAC_TIMER_EVENT,
     STATE_MATCHED,
     STATE_MATCHING,
     STATE_UNMATCHED,
+    VS_NW_INFO,
     FramesSizes,
+    SlacEvseState,
     Timers,
 )
 
 # This timeout is imported from the environment file, because it makes it
 # easier to use it with the dev compose file for dev and debugging reasons
 from pyslac.environment import Config
-from pyslac.layer_2_headers import EthernetHeader, HomePlugHeader
+from pyslac.fragmentation import MmeReassembler, fragment_frame
+from pyslac.frame_validator import FrameValidator
+from pyslac.key_pool import KeyPool, KeyRotationStats
+from pyslac.layer_2_headers import (
+    EthernetHeader,
+    HomePlugHeader,
+    HomePlugVendorHeader,
+)
 from pyslac.messages import (
     AtennChar,
     AtennCharRsp,
@@ -52,21 +96,44 @@ from pyslac.messages import (
     SlacParmCnf,
     SlacParmReq,
     StartAtennChar,
+    ValidateCnf,
+    ValidateReq,
 )
+from pyslac.metrics import SessionMetrics
+from pyslac.metrics_server import MetricsServer
+from pyslac.retry import RetryPolicy
 from pyslac.sockets.async_linux_socket import (
     create_socket,
     readeth,
-    send_recv_eth,
     sendeth,
 )
-from pyslac.utils import cancel_task, generate_nid, get_if_hwaddr
+from pyslac.sockets.loopback import LoopbackSocket
+from pyslac.state_store import PersistedSession, SessionStateStore
+from pyslac.tracing import NOOP_SPAN, NOOP_TRACER, JsonLinesExporter, Tracer
+from pyslac.utils import cancel_task, get_if_hwaddr
 from pyslac.utils import half_round as hw
-from pyslac.utils import task_callback, time_now_ms
+from pyslac.utils import task_callback
+from pyslac.vendor_messages import (
+    LinkStatusCnf,
+    LinkStatusReq,
+    VsNwInfoCnf,
+    VsNwInfoReq,
+)
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger("slac_session")
 
 
+class SlacEvent(NamedTuple):
+    """Event fed to the SLAC state machine"""
+
+    # MMTYPE of the frame received or SLAC_TIMER_EVENT
+    kind: int
+    # Complete and well formed frame (empty for timer events)
+    frame: bytes = b""
+    # perf_counter() value at the reception of the event
+    rcvd_at: float = 0.0
+
+
 @dataclass
 class SlacSession:
     # pylint: disable=too-many-instance-attributes
@@ -193,13 +260,14 @@ class SlacSession:
         It resets the session values to their default values
         NID and NMK are not reset, because who handles the operation is the
         call to evse_set_key: as defined by the standard, if we cant set a new
-        NID and NMK, then we shall use the already defined ones
+        NID and NMK, then we shall use the already defined ones.
+        The EVSE MAC is not reset either, as it is the MAC of the host and is
+        still needed by the CM_SET_KEY.REQ sent after the reset
         """
         self.state = STATE_UNMATCHED
         self.forwarding_sta = b""
         self.pev_id = None
         self.pev_mac = b""
-        self.evse_mac = b""
         self.run_id = b""
         self.application_type = 0x00
         self.security_type = 0x00
@@ -220,32 +288,176 @@ class SlacSession:
 class SlacEvseSession(SlacSession):
     # pylint: disable=too-many-instance-attributes, too-many-arguments
     # pylint: disable=logging-fstring-interpolation, broad-except
-    def __init__(self, evse_id: str, iface: str, config: Config):
+    def __init__(
+        self,
+        evse_id: str,
+        iface: str,
+        config: Config,
+        socket: Optional[LoopbackSocket] = None,
+    ):
+        """
+        :param socket: LoopbackSocket used instead of a raw socket bound to
+        `iface`, e.g. to run the session against simulated EVs (check
+        pyslac.sockets.loopback)
+        """
         self.iface = iface
         self.evse_id = evse_id
         self.config = config
-        host_mac = get_if_hwaddr(self.iface)
         logger.debug(
-            f"Session created for evse_id {self.evse_id} on " f"interface {self.iface}"
+            "Session created for evse_id %s on interface %s", self.evse_id, self.iface
         )
-        self.socket = create_socket(iface=self.iface, port=0)
+        if socket is None:
+            host_mac = get_if_hwaddr(self.iface)
+            self.socket = create_socket(iface=self.iface, port=0)
+        else:
+            host_mac = socket.mac
+            self.socket = socket
         self.evse_plc_mac = EVSE_PLC_MAC
+        # Higher layers only get complete MMEs, fragmented ones are
+        # reassembled in the receive path
+        self.reassembler = MmeReassembler()
+        # Malformed frames are dropped (and counted) before being decoded
+        self.frame_validator = FrameValidator()
+        # Fragmentation Message Sequence Number of the next fragmented MME sent
+        self.fmsn = 0
+        # Current state of the SLAC state machine, its timer and the events to
+        # be handled again once the state machine moves to the next state
+        self.fsm_state = SlacEvseState.WAIT_SLAC_PARM_REQ
+        self._state_entered_ms = 0
+        self._state_deadline_ms = 0
+        self._deferred_events: Deque[SlacEvent] = deque()
+        # Running sum, per group, of the AAG of the sounds received
+        self._aag_sum: List[int] = [0] * SLAC_GROUPS
+        # NMK/NID pairs for the next CM_SET_KEY, the task setting the next key
+        # in the background after a session ends and its counters
+        self.key_pool = KeyPool()
+        self.key_rotation_task: Optional[asyncio.Task] = None
+        self.key_rotation_stats = KeyRotationStats()
+        # Latency histograms and frame counters of the SLAC phases. The phase
+        # start, the frames rejected by the validator up to then and the
+        # reception time of the event being handled are kept to feed them
+        self.metrics = SessionMetrics()
+        self._phase_started = 0.0
+        self._phase_rejected_frames = 0
+        self._event_rcvd_at = 0.0
+        # Spans of the current matching attempt and SLAC phase, if tracing is
+        # enabled
+        self.tracer = (
+            Tracer(JsonLinesExporter(config.trace_file))
+            if config.trace_file
+            else NOOP_TRACER
+        )
+        self.trace_span = NOOP_SPAN
+        self._phase_span = NOOP_SPAN
+        # Arbiter shared with the other EVSEs of the site, if the attenuation
+        # arbitration is enabled (check
+        # SlacSessionController.enable_attenuation_arbitration)
+        self.arbiter: Optional[AttenuationArbiter] = None
+        # Runs of other CM_SLAC_PARM.REQ answered while the matching follows
+        # self.run_id (check pyslac.candidates)
+        self.candidates = CandidateTable()
+        # Coroutine function counting, for the given time in seconds, the CP
+        # toggles of the EV during the validation (check
+        # SlacSessionController.count_cp_toggles)
+        self.count_cp_toggles: Optional[Callable[[str, float], Awaitable[int]]] = None
+        # Limits and pause of the matching attempts (check pyslac.retry),
+        # which may be replaced to tune the matching of this EVSE
+        self.retry_policy = RetryPolicy()
+        # MAC of the PLC node, as reported by its last VS_NW_INFO.CNF
+        self.plc_node_mac = b""
+        # Set once the NMK is sent to an EV, in CM_SLAC_MATCH.CNF
+        self.nmk_sent = False
+        # Key saved whenever it is set or sent to an EV, for a warm restart,
+        # if enabled (check pyslac.state_store)
+        self.state_store = (
+            SessionStateStore(config.state_dir, evse_id) if config.state_dir else None
+        )
+        # Last write of the state_store, done off the event loop
+        self._state_saved: Optional["Future[None]"] = None
+        # Config reloaded while a phase was in progress, applied once it is
+        # over (check update_config)
+        self._pending_config: Optional[Config] = None
+        self._in_phase = False
         SlacSession.__init__(self, state=STATE_UNMATCHED, evse_mac=host_mac)
 
+    def update_config(self, config: Config) -> Dict[str, Tuple[Any, Any]]:
+        """
+        Applies a new Config: right away if no SLAC phase is in progress,
+        otherwise once the current phase is over, so that a phase never mixes
+        the settings of two configs
+
+        :return: the settings changed, as {name: (old value, new value)}
+        """
+        changes = (self._pending_config or self.config).diff(config)
+        if self._in_phase:
+            self._pending_config = config
+        else:
+            self._apply_config(config)
+        return changes
+
+    def _apply_config(self, config: Config) -> None:
+        self._pending_config = None
+        if config.trace_file != self.config.trace_file:
+            # The file of the previous exporter would otherwise stay open
+            self.tracer.close()
+            self.tracer = (
+                Tracer(JsonLinesExporter(config.trace_file))
+                if config.trace_file
+                else NOOP_TRACER
+            )
+        if config.state_dir != self.config.state_dir:
+            self.state_store = (
+                SessionStateStore(config.state_dir, self.evse_id)
+                if config.state_dir
+                else None
+            )
+            self.save_state()
+        self.config = config
+
+    def save_state(self) -> None:
+        """
+        Saves the key of the session, if a store is set. The file is written
+        in the background (check wait_state_saved)
+        """
+        if self.state_store is None or not self.nmk:
+            return
+        self._state_saved = self.state_store.save_nowait(
+            PersistedSession(
+                evse_id=self.evse_id,
+                evse_mac=self.evse_mac,
+                plc_node_mac=self.plc_node_mac,
+                nmk=self.nmk,
+                nid=self.nid,
+                nmk_sent=self.nmk_sent,
+            )
+        )
+
+    async def wait_state_saved(self) -> None:
+        """Waits for the last state saved to be written"""
+        if self._state_saved is not None:
+            await asyncio.wrap_future(self._state_saved)
+
     def reset_socket(self):
+        if isinstance(self.socket, LoopbackSocket):
+            self.socket.flush()
+            return
         self.socket.close()
         self.socket = create_socket(iface=self.iface, port=0)
 
     async def send_frame(self, frame_to_send: bytes) -> None:
         """
-        Async wrapper for a sendeth that checks if sendeth is an awaitable
+        Async wrapper for a sendeth that checks if sendeth is an awaitable.
+        MMEs that do not fit in a single Ethernet frame are sent fragmented.
         """
-        # TODO: Add this to a send method
-        bytes_sent = sendeth(
-            s=self.socket, frame_to_send=frame_to_send, iface=self.iface
-        )
-        if isawaitable(bytes_sent):
-            await bytes_sent
+        fragments = fragment_frame(frame_to_send, self.fmsn)
+        if len(fragments) > 1:
+            self.fmsn = (self.fmsn + 1) % 256
+        for fragment in fragments:
+            bytes_sent = sendeth(
+                s=self.socket, frame_to_send=fragment, iface=self.iface
+            )
+            if isawaitable(bytes_sent):
+                await bytes_sent
 
     async def rcv_frame(self, rcv_frame_size: int, timeout: Union[float, int]) -> bytes:
         """
@@ -254,12 +466,28 @@ class SlacEvseSession(SlacSession):
 
         :param rcv_frame_size: size of the frame to be received
         :param timeout: timeout for the specific message that is being expected
-        :return:
+        :return: a complete MME frame
         """
-        return await asyncio.wait_for(
-            readeth(self.socket, self.iface, rcv_frame_size),
-            timeout,
-        )
+        return await asyncio.wait_for(self._rcv_mme(rcv_frame_size), timeout)
+
+    async def _rcv_mme(self, rcv_frame_size: int) -> bytes:
+        """
+        Reads frames from the socket until a complete and well formed MME
+        is available
+        """
+        while True:
+            frame = await readeth(self.socket, self.iface, rcv_frame_size)
+            dropped = self.reassembler.dropped
+            mme = self.reassembler.feed(frame)
+            if self.reassembler.dropped != dropped:
+                self.metrics.count_socket_drops(
+                    "reassembly", self.reassembler.dropped - dropped
+                )
+            if mme is None:
+                continue
+            if self.frame_validator.validate(mme):
+                return mme
+            self.metrics.count_socket_drops("malformed")
 
     async def leave_logical_network(self):
         """
@@ -272,6 +500,50 @@ class SlacEvseSession(SlacSession):
         await self.evse_set_key()
         self.reset()
 
+    def leave_logical_network_nowait(self) -> asyncio.Task:
+        """
+        Same as leave_logical_network, but the session parameters are reset
+        right away and the new NMK and NID are set in the background, so that
+        the EVSE is ready before the next plug-in without delaying the end
+        of the current session.
+        The next matching process waits for the task, using wait_key_rotation,
+        if it is not done by then
+
+        :return: the task setting the new NMK and NID
+        """
+        self.reset()
+        self.key_rotation_task = asyncio.create_task(self._rotate_key())
+        self.key_rotation_task.set_name(f"Key rotation for EVSE {self.evse_id}")
+        self.key_rotation_task.add_done_callback(task_callback)
+        return self.key_rotation_task
+
+    async def _rotate_key(self) -> None:
+        self.key_rotation_stats.rotations += 1
+        try:
+            await self.evse_set_key()
+        except (OSError, TimeoutError, ValueError) as e:
+            self.key_rotation_stats.failed_rotations += 1
+            logger.error("Key rotation failed for EVSE %s: %s", self.evse_id, e)
+        # The pairs for the next rotations are derived while the EVSE is idle
+        self.key_pool.fill()
+
+    async def wait_key_rotation(self) -> None:
+        """
+        Called at the start of a matching process, waits for the key rotation
+        started by the end of the previous session, if it is still in progress
+        """
+        self.key_rotation_stats.plugins += 1
+        if self.key_rotation_task is None or self.key_rotation_task.done():
+            return
+        self.key_rotation_stats.plugins_waited += 1
+        loop = asyncio.get_event_loop()
+        time_start = loop.time()
+        logger.info("Waiting for the key rotation of EVSE %s", self.evse_id)
+        # Shielded, so that the cancellation of the matching process does not
+        # interrupt the CM_SET_KEY
+        await asyncio.shield(self.key_rotation_task)
+        self.key_rotation_stats.total_wait_time += loop.time() - time_start
+
     async def evse_set_key(self) -> bytes:
         """
         PEV-HLE sets the NMK and NID on PEV-PLC using CM_SET_KEY.REQ;
@@ -292,16 +564,21 @@ class SlacEvseSession(SlacSession):
         Refer to Section 7.10.7.3 for generation of nonces.
 
         The only secure way to remove a STA from an AVLN is to change the NMK
+
+        The new key is only used, and saved, once the readiness probe confirms
+        that the PLC node applied it; otherwise, the previous key applies
+
+        :raises TimeoutError: if the PLC node did not apply the new key and
+        there is no previous one
         """
         logger.info("CM_SET_KEY: Started...")
         # for each new set_key message sent (or pyslac session),
         # a new pair of NID (Network ID) and NMK (Network Mask) shall be
-        # generated
-        nmk = urandom(16)
-        # the NID shall be derived from the NMK and its 2 MSBs must be 0b00
-        nid = generate_nid(nmk)
-        logger.debug("New NMK: %s", hexlify(nmk))
-        logger.debug("New NID: %s", hexlify(nid))
+        # used; they are derived in advance by the key pool
+        nmk, nid = self.key_pool.take()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("New NMK: %s", hexlify(nmk))
+            logger.debug("New NID: %s", hexlify(nid))
         ethernet_header = EthernetHeader(
             dst_mac=self.evse_plc_mac, src_mac=self.evse_mac
         )
@@ -321,78 +598,324 @@ class SlacEvseSession(SlacSession):
         # Send and the CNF of the message
         try:
             await self.send_frame(frame_to_send)
-            data_rcvd = await self.rcv_frame(
-                rcv_frame_size=FramesSizes.CM_SET_KEY_CNF,
-                timeout=Timers.SLAC_INIT_TIMEOUT,
+            data_rcvd = await self.rcv_mme_of_type(
+                CM_SET_KEY | MMTYPE_CNF, timeout=Timers.SLAC_INIT_TIMEOUT
             )
         except asyncio.TimeoutError as e:
             raise TimeoutError("SetKey Timeout raised") from e
         try:
-            SetKeyCnf.from_bytes(data_rcvd)
-            self.nmk = nmk
-            self.nid = nid
+            set_key_cnf = SetKeyCnf.from_bytes(data_rcvd)
         except ValueError as e:
             logger.error(e)
-            if self.nmk and self.nid:
-                logger.debug(
-                    "SetKeyReq has failed, old NMK: %s and NID: %s apply",
-                    self.nmk,
-                    self.nid,
-                )
-            else:
+            if not (self.nmk and self.nid):
                 raise ValueError("SetKeyCnf data parsing into the class failed") from e
+            logger.debug("SetKeyReq has failed, the old NMK and NID apply")
+            return data_rcvd
+        # The Result field is not reliable (see SetKeyCnf.from_bytes), so
+        # whether the key was applied is confirmed by the readiness probe
+        logger.debug("SetKeyCnf Result: %#04x", set_key_cnf.result)
         logger.debug("Registering NMK and NID into the PLC node...")
-        await asyncio.sleep(SLAC_SETTLE_TIME)
+        # SLAC_SETTLE_TIME is just the upper bound, the wait ends as soon as
+        # the PLC node reports that the NID is active
+        if not await self.wait_plc_ready(nid, timeout=SLAC_SETTLE_TIME):
+            # The new key is neither handed to an EV nor saved
+            if not (self.nmk and self.nid):
+                raise TimeoutError("The PLC node did not apply the new NMK and NID")
+            logger.warning(
+                "The PLC node did not apply the new NMK and NID, the old ones apply"
+            )
+            return data_rcvd
+        self.nmk = nmk
+        self.nid = nid
+        self.nmk_sent = False
+        self.save_state()
         logger.info("CM_SET_KEY: Finished!")
         return data_rcvd
 
-    async def evse_slac_parm(self) -> None:
-        logger.debug("CM_SLAC_PARM: Started...")
-        # TODO: Pass the expected parameters later to the read function
-        # so that it can be evaluated while the timeout hasnt elapsed
-        self.reset_socket()
+    async def evse_restore_key(self) -> bool:
+        """
+        Warm restart: reuses the NMK and NID saved by the previous run of the
+        process, instead of setting a new key, if that key was never sent to
+        an EV and a single VS_NW_INFO.REQ confirms that the PLC node is still
+        member of its network
+
+        :return: True if the key was restored; otherwise, a new key must be
+        set with evse_set_key
+        """
+        if self.state_store is None:
+            return False
+        saved = self.state_store.load()
+        if saved is None:
+            return False
+        if saved.nmk_sent or saved.evse_mac != self.evse_mac:
+            logger.info(
+                "Saved key of EVSE %s not reused: %s",
+                self.evse_id,
+                "already sent to an EV" if saved.nmk_sent else "host MAC changed",
+            )
+            return False
+        try:
+            is_active = await self.is_nid_active(saved.nid)
+        except asyncio.TimeoutError:
+            is_active = False
+        if not is_active or self.plc_node_mac != saved.plc_node_mac:
+            logger.info("PLC node of EVSE %s no longer has the saved key", self.evse_id)
+            return False
+        self.nmk = saved.nmk
+        self.nid = saved.nid
+        logger.info("Key of EVSE %s restored, CM_SET_KEY skipped", self.evse_id)
+        return True
+
+    async def evse_init_key(self) -> bool:
+        """
+        Restores the key saved, if possible, or sets a new one
+
+        :return: True if the key was restored
+        """
+        if await self.evse_restore_key():
+            return True
+        await self.evse_set_key()
+        return False
+
+    async def rcv_mme_of_type(self, mm_type: int, timeout: Union[float, int]) -> bytes:
+        """
+        Receives frames until a MME of the given MMTYPE arrives. Other frames
+        received in the meantime are discarded
+
+        :param mm_type: MMTYPE expected
+        :param timeout: max time, in seconds, to wait for the MME
+        :return: the MME frame
+        """
+
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            frame = await asyncio.wait_for(self._rcv_mme(ETH_FRAME_MAX_SIZE), remaining)
+            # The MMTYPE field, in little endian, follows the Ethernet header
+            # and the MMV
+            if frame[15] | frame[16] << 8 == mm_type:
+                return frame
+
+    async def is_nid_active(self, nid: bytes) -> bool:
+        """
+        Requests the networks (AVLN) the PLC node is member of, using
+        VS_NW_INFO.REQ, and checks if one of them has the NID given
+
+        :raises asyncio.TimeoutError: if VS_NW_INFO.CNF is not received within
+        SLAC_READY_POLL_TIMEOUT
+        """
+        ethernet_header = EthernetHeader(
+            dst_mac=self.evse_plc_mac, src_mac=self.evse_mac
+        )
+        homeplug_header = HomePlugVendorHeader(VS_NW_INFO | MMTYPE_REQ)
+        frame_to_send = (
+            ethernet_header.pack_big()
+            + homeplug_header.pack_big()
+            + VsNwInfoReq().pack_big()
+        )
+        await self.send_frame(frame_to_send)
+        data_rcvd = await self.rcv_mme_of_type(
+            VS_NW_INFO | MMTYPE_CNF, timeout=SLAC_READY_POLL_TIMEOUT
+        )
+        self.plc_node_mac = EthernetHeader.from_bytes(data_rcvd).src_mac
+        try:
+            return VsNwInfoCnf.from_bytes(data_rcvd).has_nid(nid)
+        except ValueError as e:
+            logger.warning("Invalid VS_NW_INFO.CNF received: %s", e)
+            return False
+
+    async def wait_plc_ready(self, nid: bytes, timeout: Union[float, int]) -> bool:
+        """
+        Readiness probe run after CM_SET_KEY: polls the PLC node until it
+        reports that the network with the NID given is active, which confirms
+        that the key was applied
+
+        :param nid: NID of the key set
+        :param timeout: max time to wait, in seconds
+        :return: True if the PLC node is ready, False if the timeout expired
+        """
+        loop = asyncio.get_event_loop()
+        time_start = loop.time()
+        deadline = time_start + timeout
         while True:
             try:
-                # A complete CM_SLAC_PARM.REQ frame must have 60 Bytes:
-                # EthernetHeader = 14 bytes
-                # HomePlugHeader  = 5 bytes
-                # SlacParmReq = 10 bytes
-                # Padding = 31 bytes (The min ETH frame must have 60 bytes,
-                # it this frame requires padding)
-                data_rcvd = await self.rcv_frame(
-                    rcv_frame_size=FramesSizes.CM_SLAC_PARM_REQ,
-                    timeout=self.config.slac_init_timeout,
+                if await self.is_nid_active(nid):
+                    logger.debug(
+                        "PLC node ready after %.2f s", loop.time() - time_start
+                    )
+                    return True
+            except asyncio.TimeoutError:
+                logger.debug("VS_NW_INFO.CNF not received")
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning(
+                    "PLC node did not report NID %s as active within %s s",
+                    nid.hex(),
+                    timeout,
                 )
-            except TimeoutError as e:
-                logger.warning(f"Timeout waiting for CM_SLAC_PARM.REQ: {e}")
-                raise e
-            try:
-                ether_frame = EthernetHeader.from_bytes(data_rcvd)
-                homeplug_frame = HomePlugHeader.from_bytes(data_rcvd)
-                if homeplug_frame.mm_type != CM_SLAC_PARM | MMTYPE_REQ:
-                    logger.warning("Frame received is not CM_SLAC_PARM.REQ")
-                    logger.debug("Continue waiting for CM_SLAC_PARM.REQ...")
+                return False
+            await asyncio.sleep(min(SLAC_READY_POLL_INTERVAL, remaining))
+
+    async def run_state_machine(
+        self, state: SlacEvseState, stop_state: SlacEvseState
+    ) -> None:
+        """
+        Runs the SLAC state machine from `state` until `stop_state` is reached.
+
+        The state machine is fed by events: the frames received, identified by
+        their MMTYPE, and the expiry of the timer of the current state.
+        The handler of each (state, event) pair is looked up in
+        SLAC_EVSE_TRANSITIONS and returns the next state. Events without a
+        handler, e.g. a late retransmission of a frame that was already
+        processed, are ignored instead of aborting the matching process, so
+        that harmless reordering of the frames does not make it fail.
+        """
+        self.fsm_state = state
+        if state == stop_state:
+            return
+        await self._enter_state(state)
+        try:
+            while self.fsm_state != stop_state:
+                event = await self._next_event()
+                self._event_rcvd_at = event.rcvd_at
+                handler = SLAC_EVSE_TRANSITIONS.get((self.fsm_state, event.kind))
+                if self.candidates and event.kind in CANDIDATE_EVENTS:
+                    candidate = self._candidate_of(event)
+                    if candidate is not None:
+                        handler = partial(
+                            SlacEvseSession._on_candidate_event, candidate=candidate
+                        )
+                if handler is None:
+                    logger.debug(
+                        "Event %#06x ignored in state %s",
+                        event.kind,
+                        self.fsm_state.name,
+                    )
+                    self.metrics.count_frames(self.fsm_state.name, discarded=1)
                     continue
-                slac_parm_req = SlacParmReq.from_bytes(data_rcvd)
-            except Exception as e:
-                # TODO: PROPER Exception
-                logger.exception(e, exc_info=True)
-                raise e
-            break
+                if event.kind != SLAC_TIMER_EVENT:
+                    self.metrics.count_frames(self.fsm_state.name, processed=1)
+                next_state = await handler(self, event)
+                if next_state != self.fsm_state:
+                    logger.debug(
+                        "SLAC state transition: %s -> %s",
+                        self.fsm_state.name,
+                        next_state.name,
+                    )
+                    self._exit_state(self.fsm_state)
+                    self.fsm_state = next_state
+                    if next_state != stop_state:
+                        await self._enter_state(next_state)
+        except BaseException as e:
+            # The duration of the phase that failed (e.g. timeout) is also
+            # recorded
+            self._exit_state(self.fsm_state, e)
+            raise
+
+    async def _enter_state(self, state: SlacEvseState) -> None:
+        """Runs the entry actions of the state and starts its timer"""
+        self._in_phase = True
+        self._state_entered_ms = now_ms()
+        self._phase_started = perf_counter()
+        self._phase_rejected_frames = self.frame_validator.rejected
+        self._phase_span = self.tracer.start_span(state.name, parent=self.trace_span)
+        if state == SlacEvseState.SOUNDING:
+            self._aag_sum = [0] * SLAC_GROUPS
+            self.aag = [0] * SLAC_GROUPS
+            self.num_total_sounds = 0
+        elif state == SlacEvseState.WAIT_ATTEN_CHAR_RSP:
+            await self._send_atten_char()
+        self._state_deadline_ms = self._state_entered_ms + round(
+            self._state_timeout(state) * 1000
+        )
 
-        # Saving SLAC_PARM_REQ parameters from EV
-        self.application_type = slac_parm_req.application_type
-        self.security_type = slac_parm_req.security_type
-        self.run_id = slac_parm_req.run_id
+    def _exit_state(
+        self, state: SlacEvseState, error: Optional[BaseException] = None
+    ) -> None:
+        """Records the duration of the state and the frames rejected in it"""
+        if error is not None:
+            self._phase_span.set_error(error)
+        self._phase_span.end()
+        self._phase_span = NOOP_SPAN
+        self.metrics.observe_phase(
+            state.name, (perf_counter() - self._phase_started) * 1000
+        )
+        self.metrics.count_frames(
+            state.name,
+            discarded=self.frame_validator.rejected - self._phase_rejected_frames,
+        )
+        self._in_phase = False
+        if self._pending_config is not None:
+            self._apply_config(self._pending_config)
 
-        # both fields are filled with the EV MAC Address
-        self.pev_mac = ether_frame.src_mac
-        self.forwarding_sta = ether_frame.src_mac
+    def _observe_response(self, response: str) -> None:
+        """
+        Records the time since the reception of the event being handled,
+        called once its response is sent
+        """
+        self.metrics.observe_response(
+            response, (perf_counter() - self._event_rcvd_at) * 1000
+        )
+        self.tracer.start_span(
+            response, parent=self._phase_span, start_perf_counter=self._event_rcvd_at
+        ).end()
+
+    def start_trace(self, attempt: int) -> None:
+        """Starts the trace of a matching attempt"""
+        self.trace_span = self.tracer.start_span(
+            "matching_attempt",
+            attributes={"evse_id": self.evse_id, "attempt": attempt},
+        )
 
-        # SLAC_PARM_CNF frame formation
-        ether_header = EthernetHeader(dst_mac=self.pev_mac, src_mac=self.evse_mac)
+    def end_trace(self, error: Optional[BaseException] = None) -> None:
+        """Ends the trace of the current matching attempt, if any"""
+        self.trace_span.set_attribute("run_id", self.run_id.hex())
+        self.trace_span.set_attribute("matched", self.state == STATE_MATCHED)
+        if error is not None:
+            self.trace_span.set_error(error)
+        self.trace_span.end()
+        self.trace_span = NOOP_SPAN
+
+    def _state_timeout(self, state: SlacEvseState) -> float:
+        """Time, in seconds, the state machine may stay in the state"""
+        if state == SlacEvseState.WAIT_SLAC_PARM_REQ:
+            return self.config.slac_init_timeout or Timers.SLAC_INIT_TIMEOUT
+        if state == SlacEvseState.WAIT_START_ATTEN_CHAR:
+            return Timers.SLAC_REQ_TIMEOUT
+        if state == SlacEvseState.SOUNDING:
+            return self.time_out_ms / 1000
+        if state == SlacEvseState.WAIT_ATTEN_CHAR_RSP:
+            # The SLAC_RESP_TIMEOUT used seems to not be enough for the
+            # PLC chip to send a sound, so we use 1 sec instead
+            return 1
+        return Timers.SLAC_MATCH_TIMEOUT
+
+    async def _next_event(self) -> SlacEvent:
+        if self._deferred_events:
+            return self._deferred_events.popleft()
+        timeout = (self._state_deadline_ms - now_ms()) / 1000
+        if timeout <= 0:
+            return SlacEvent(SLAC_TIMER_EVENT, rcvd_at=perf_counter())
+        try:
+            frame = await self.rcv_frame(
+                rcv_frame_size=ETH_FRAME_MAX_SIZE, timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            return SlacEvent(SLAC_TIMER_EVENT, rcvd_at=perf_counter())
+        return SlacEvent(frame[15] | frame[16] << 8, frame, perf_counter())
+
+    async def _on_timeout(self, event: SlacEvent) -> SlacEvseState:
+        raise asyncio.TimeoutError(f"Timeout in SLAC state {self.fsm_state.name}")
+
+    async def _send_slac_parm_cnf(self, run: Optional[SlacCandidate] = None) -> None:
+        """Sends CM_SLAC_PARM.CNF for the run followed or for a candidate run"""
+        run = run or self
+        ether_header = EthernetHeader(dst_mac=run.pev_mac, src_mac=self.evse_mac)
         homeplug_header = HomePlugHeader(CM_SLAC_PARM | MMTYPE_CNF)
-        slac_parm_cnf = SlacParmCnf(forwarding_sta=self.pev_mac, run_id=self.run_id)
+        slac_parm_cnf = SlacParmCnf(forwarding_sta=run.pev_mac, run_id=run.run_id)
 
         frame_to_send = (
             ether_header.pack_big()
@@ -401,55 +924,91 @@ class SlacEvseSession(SlacSession):
         )
 
         await self.send_frame(frame_to_send)
+        self._observe_response("CM_SLAC_PARM.CNF")
         logger.debug("Sent SLAC_PARM.CNF")
 
-        # Update SLAC Session State, indicating that is occupied and ready for
-        # a match decision process
-        self.state = STATE_MATCHING
+    async def _on_slac_parm_req(self, event: SlacEvent) -> SlacEvseState:
+        ether_frame = EthernetHeader.from_bytes(event.frame)
+        slac_parm_req = SlacParmReq.from_bytes(event.frame)
 
-        logger.debug("CM_SLAC_PARM: Finished!")
+        # Saving SLAC_PARM_REQ parameters from EV
+        self.application_type = slac_parm_req.application_type
+        self.security_type = slac_parm_req.security_type
+        self.run_id = slac_parm_req.run_id
 
-    async def cm_start_atten_charac(self):
-        logger.debug("CM_START_ATTEN_CHAR: Started...")
-        while True:
-            try:
-                # A complete CM_START_ATTEN_CHAR.IND frame must have 60 Bytes:
-                # EthernetHeader = 14 bytes
-                # HomePlugHeader  = 5 bytes
-                # StartAtennChar = 19 bytes
-                # Padding = 22 bytes (The min ETH frame must have 60 bytes,
-                # it this frame requires padding)
-                data_rcvd = await self.rcv_frame(
-                    rcv_frame_size=FramesSizes.CM_START_ATTEN_CHAR_IND,
-                    timeout=Timers.SLAC_REQ_TIMEOUT,
-                )
-                EthernetHeader.from_bytes(data_rcvd)
-                homeplug_frame = HomePlugHeader.from_bytes(data_rcvd)
-                if homeplug_frame.mm_type != CM_START_ATTEN_CHAR | MMTYPE_IND:
-                    logger.warning("Frame received is not CM_START_ATTEN_CHAR.IND")
-                    logger.debug("Continue waiting for CM_START_ATTEN_CHAR.IND...")
-                    continue
-                start_atten_char = StartAtennChar.from_bytes(data_rcvd)
-            except Exception as e:
-                logger.exception(e, exc_info=True)
-                raise e
+        # both fields are filled with the EV MAC Address
+        self.pev_mac = ether_frame.src_mac
+        self.forwarding_sta = ether_frame.src_mac
 
-            if (
-                self.application_type != start_atten_char.application_type
-                or self.security_type != start_atten_char.security_type
-                or self.run_id != start_atten_char.run_id
-                or start_atten_char.resp_type != SLAC_RESP_TYPE
-            ):
-                logger.exception(ValueError("Error in StartAttenChar"))
-                raise ValueError("Error in StartAttenChar")
-            break
+        await self._send_slac_parm_cnf()
+        if self.arbiter:
+            self.arbiter.join(self.evse_id, self.run_id, self.pev_mac)
 
-        # As is stated in ISO15118-3, the EV will send 3 consecutive
-        # CM_START_ATTEN_CHAR, regardless if the first one was correctly
-        # received and processed. However, the PLC just forwards 1 to the
-        # application, so we just need to process 1
+        # Update SLAC Session State, indicating that is occupied and ready for
+        # a match decision process
+        self.state = STATE_MATCHING
+        return SlacEvseState.WAIT_START_ATTEN_CHAR
 
+    async def _on_later_slac_parm_req(self, event: SlacEvent) -> SlacEvseState:
+        """
+        CM_SLAC_PARM.REQ received while a run is followed:
+        * the EV repeats it if it did not get the confirmation, so the
+          confirmation is sent again;
+        * a new run_id from the same EV means it restarted SLAC, so the new
+          run is followed from now on;
+        * a request from another EV, e.g. a neighbour one heard due to PLC
+          crosstalk or the EV plugged into the EVSE whose request arrived
+          later, is answered and its run kept as a candidate, in case that EV
+          sends CM_SLAC_MATCH.REQ to this EVSE
+        """
+        ether_frame = EthernetHeader.from_bytes(event.frame)
+        slac_parm_req = SlacParmReq.from_bytes(event.frame)
+        pev_mac = ether_frame.src_mac
+        if pev_mac == self.pev_mac:
+            if slac_parm_req.run_id == self.run_id:
+                await self._send_slac_parm_cnf()
+                return self.fsm_state
+            logger.info(
+                "EV %s restarted SLAC with run_id %s",
+                pev_mac.hex(),
+                slac_parm_req.run_id.hex(),
+            )
+            self.num_start_attn_rcvd = 0
+            return await self._on_slac_parm_req(event)
+        candidate = self.candidates.get(slac_parm_req.run_id)
+        if candidate is None:
+            # A new run of the EV of a candidate replaces the previous one
+            previous = self.candidates.get_by_pev_mac(pev_mac)
+            if previous is not None:
+                self.candidates.pop(previous.run_id).cancel()
+            candidate = SlacCandidate(
+                slac_parm_req.run_id,
+                pev_mac,
+                slac_parm_req.application_type,
+                slac_parm_req.security_type,
+            )
+            self.candidates.add(candidate)
+            if self.arbiter:
+                self.arbiter.join(self.evse_id, candidate.run_id, pev_mac)
+            logger.info(
+                "CM_SLAC_PARM.REQ of EV %s answered as candidate run %s",
+                pev_mac.hex(),
+                candidate.run_id.hex(),
+            )
+        await self._send_slac_parm_cnf(candidate)
+        return self.fsm_state
+
+    def _is_start_atten_char_valid(self, start_atten_char: StartAtennChar) -> bool:
+        return (
+            self.application_type == start_atten_char.application_type
+            and self.security_type == start_atten_char.security_type
+            and self.run_id == start_atten_char.run_id
+            and start_atten_char.resp_type == SLAC_RESP_TYPE
+        )
+
+    def _apply_start_atten_char(self, start_atten_char: StartAtennChar) -> None:
         # Saving START_ATTEN_CHAR parameters from EV
+        self.num_start_attn_rcvd += 1
         self.num_expected_sounds = start_atten_char.num_sounds
         # the value sent by the EV for the timeout has a factor of 1/100
         # Thus, if the value is e.g. 6, the original value is 600 ms (6 * 100)
@@ -471,7 +1030,387 @@ class SlacEvseSession(SlacSession):
         if self.config.slac_atten_results_timeout:
             self.time_out_ms = self.config.slac_atten_results_timeout
         self.forwarding_sta = start_atten_char.forwarding_sta
+
+    async def _on_start_atten_char(self, event: SlacEvent) -> SlacEvseState:
+        start_atten_char = StartAtennChar.from_bytes(event.frame)
+        if start_atten_char.run_id != self.run_id:
+            # e.g. from an EV plugged into a neighbour EVSE (crosstalk), whose
+            # CM_SLAC_PARM.REQ was sent before this session started
+            logger.debug("CM_START_ATTEN_CHAR.IND of another session ignored")
+            return self.fsm_state
+        if not self._is_start_atten_char_valid(start_atten_char):
+            logger.exception(ValueError("Error in StartAttenChar"))
+            raise ValueError("Error in StartAttenChar")
+        # As is stated in ISO15118-3, the EV will send 3 consecutive
+        # CM_START_ATTEN_CHAR, regardless if the first one was correctly
+        # received and processed. The following ones are handled by
+        # _on_start_atten_char_retransmission
+        self._apply_start_atten_char(start_atten_char)
         logger.debug("CM_START_ATTEN_CHAR: Finished!")
+        return SlacEvseState.SOUNDING
+
+    async def _on_start_atten_char_retransmission(
+        self, event: SlacEvent
+    ) -> SlacEvseState:
+        start_atten_char = StartAtennChar.from_bytes(event.frame)
+        if not self._is_start_atten_char_valid(start_atten_char):
+            logger.debug("CM_START_ATTEN_CHAR.IND of another session ignored")
+        elif self.num_start_attn_rcvd == 0:
+            # The sounding was started by sounds that arrived before this
+            # frame, so the parameters of the EV apply from now on
+            self._apply_start_atten_char(start_atten_char)
+            self._state_deadline_ms = self._state_entered_ms + self.time_out_ms
+        else:
+            self.num_start_attn_rcvd += 1
+        return self.fsm_state
+
+    async def _on_early_sound(self, event: SlacEvent) -> SlacEvseState:
+        """
+        A sound of this session arrived before CM_START_ATTEN_CHAR.IND (which
+        may have been lost or reordered), so the sounding starts with the
+        default parameters and the sound is handled in the SOUNDING state
+        """
+        if event.kind == CM_MNBC_SOUND | MMTYPE_IND:
+            belongs_to_session = MnbcSound.from_bytes(event.frame).run_id == self.run_id
+        else:
+            belongs_to_session = (
+                AttenProfile.from_bytes(event.frame).pev_mac == self.pev_mac
+            )
+        if not belongs_to_session:
+            logger.debug("Sound of another session ignored")
+            return self.fsm_state
+        self.num_expected_sounds = SLAC_MSOUNDS
+        self.time_out_ms = (
+            self.config.slac_atten_results_timeout or SLAC_ATTEN_TIMEOUT * 100
+        )
+        self._deferred_events.append(event)
+        return SlacEvseState.SOUNDING
+
+    async def _on_sound(self, event: SlacEvent) -> SlacEvseState:
+        self.process_sound_frame(
+            HomePlugHeader.from_bytes(event.frame),
+            EthernetHeader.from_bytes(event.frame),
+            event.frame,
+            self.num_total_sounds,
+            self._aag_sum,
+        )
+        if self.num_total_sounds < self.num_expected_sounds:
+            return self.fsm_state
+        return await self._conclude_sounding()
+
+    async def _on_sounding_timeout(self, event: SlacEvent) -> SlacEvseState:
+        # Time specified by the EV for the Characterization has expired, thus,
+        # the Atten data must be grouped and averaged [V2G3-A09-19]
+        if self.num_total_sounds == 0:
+            raise asyncio.TimeoutError("No sounds received")
+        return await self._conclude_sounding()
+
+    def _average_sounds(self) -> None:
+        for group in range(SLAC_GROUPS):
+            self.aag[group] = hw(self._aag_sum[group] / self.num_total_sounds)
+        self.metrics.sounds_received += self.num_total_sounds
+        self.metrics.sounds_expected += self.num_expected_sounds
+        if self.tracer.enabled:
+            self._phase_span.set_attribute("num_sounds", self.num_total_sounds)
+            self._phase_span.set_attribute(
+                "num_expected_sounds", self.num_expected_sounds
+            )
+            self._phase_span.set_attribute("num_groups", self.num_groups)
+            self._phase_span.set_attribute("aag_min", min(self.aag))
+            self._phase_span.set_attribute("aag_max", max(self.aag))
+            self._phase_span.set_attribute("aag_mean", sum(self.aag) / SLAC_GROUPS)
+        logger.debug("CM_MNBC_SOUND: Finished!")
+
+    async def _conclude_sounding(self) -> SlacEvseState:
+        """
+        Averages the sounds and submits the attenuation profile to the
+        arbiter, if any, so that only the EVSE with the lowest attenuation
+        answers the EV
+
+        :raises ArbitrationLost: if another EVSE heard the EV better and
+        there is no candidate run left to wait for
+        """
+        self._average_sounds()
+        if self.arbiter is None:
+            return SlacEvseState.WAIT_ATTEN_CHAR_RSP
+        won = await self.arbiter.submit(
+            self.evse_id, self.run_id, self.pev_mac, self.aag, self.num_groups
+        )
+        self._phase_span.set_attribute("arbitration_won", won)
+        if won:
+            return SlacEvseState.WAIT_ATTEN_CHAR_RSP
+        if self.candidates:
+            # The EV followed is not answered, but the EV of a candidate run
+            # may still send CM_SLAC_MATCH.REQ
+            return SlacEvseState.WAIT_SLAC_MATCH_REQ
+        raise ArbitrationLost(f"EVSE {self.evse_id} lost the attenuation arbitration")
+
+    async def _send_atten_char(self, run: Optional[SlacCandidate] = None) -> None:
+        """Sends CM_ATTEN_CHAR.IND for the run followed or for a candidate run"""
+        run = run or self
+        ether_header = EthernetHeader(dst_mac=run.pev_mac, src_mac=self.evse_mac)
+        homeplug_header = HomePlugHeader(CM_ATTEN_CHAR | MMTYPE_IND)
+        atten_charac = AtennChar(
+            source_address=run.pev_mac,
+            run_id=run.run_id,
+            num_sounds=run.num_total_sounds,
+            num_groups=run.num_groups,
+            aag=run.aag,
+        )
+
+        frame_to_send = (
+            ether_header.pack_big()
+            + homeplug_header.pack_big()
+            + atten_charac.pack_big()
+        )
+
+        await self.send_frame(frame_to_send)
+        if run is self:
+            self._observe_response("CM_ATTEN_CHAR.IND")
+
+    async def _on_atten_char_rsp(self, event: SlacEvent) -> SlacEvseState:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Payload Received: \n %s", hexlify(event.frame))
+        atten_charac_response = AtennCharRsp.from_bytes(event.frame)
+        if self.run_id != atten_charac_response.run_id:
+            # [V2G3-A09-47]: e.g. a late response of a previous run
+            logger.debug("CM_ATTEN_CHAR.RSP of another session ignored")
+            self.metrics.count_frames(self.fsm_state.name, discarded=1)
+            return self.fsm_state
+
+        if atten_charac_response.result != 0:
+            e = ValueError("Atten Char Resp Failed: Atten Char Result " "is not 0x00")
+            logger.exception(e)
+            raise e
+        logger.debug("CM_ATTEN_CHAR: Finished!")
+        logger.debug("Num total sounds: %s", self.num_total_sounds)
+        logger.debug("Num expected sounds: %s", self.num_expected_sounds)
+        return SlacEvseState.WAIT_SLAC_MATCH_REQ
+
+    async def _send_validate_cnf(self, result: int, toggle_num: int = 0) -> None:
+        ether_header = EthernetHeader(dst_mac=self.pev_mac, src_mac=self.evse_mac)
+        homeplug_header = HomePlugHeader(CM_VALIDATE | MMTYPE_CNF)
+        validate_cnf = ValidateCnf(result=result, toggle_num=toggle_num)
+        await self.send_frame(
+            ether_header.pack_big()
+            + homeplug_header.pack_big()
+            + validate_cnf.pack_big()
+        )
+        self._observe_response("CM_VALIDATE.CNF")
+
+    async def _on_validate_req(self, event: SlacEvent) -> SlacEvseState:
+        """
+        First CM_VALIDATE.REQ of the optional validation step. If the
+        validation is enabled for the EVSE (Config.slac_validation), the EVSE
+        answers it is ready to count the CP toggles; otherwise, that the
+        validation is not required, and keeps waiting for CM_SLAC_MATCH.REQ
+        """
+        validate_req = ValidateReq.from_bytes(event.frame)
+        if (
+            not self.config.slac_validation
+            or self.count_cp_toggles is None
+            or validate_req.signal_type != CM_VALIDATE_SIGNAL_TYPE
+        ):
+            await self._send_validate_cnf(CM_VALIDATE_RESULT_NOT_REQUIRED)
+            return self.fsm_state
+        await self._send_validate_cnf(CM_VALIDATE_RESULT_READY)
+        return SlacEvseState.WAIT_VALIDATE_REQ
+
+    async def _on_validate_toggles_req(self, event: SlacEvent) -> SlacEvseState:
+        """
+        Second CM_VALIDATE.REQ: the CP toggles of the EV are counted for the
+        time requested and the EV compares their number with the toggles it
+        did. A request with Timer 0x00 is a retransmission of the first one
+        """
+        validate_req = ValidateReq.from_bytes(event.frame)
+        if validate_req.timer == 0x00:
+            await self._send_validate_cnf(CM_VALIDATE_RESULT_READY)
+            return self.fsm_state
+        try:
+            toggles = await self.count_cp_toggles(
+                self.evse_id, validate_req.toggle_time
+            )
+        except Exception as e:
+            logger.error("CP toggles could not be counted: %r", e)
+            await self._send_validate_cnf(CM_VALIDATE_RESULT_FAILURE)
+        else:
+            logger.info("CP toggles counted during the validation: %s", toggles)
+            self._phase_span.set_attribute("cp_toggles", toggles)
+            await self._send_validate_cnf(CM_VALIDATE_RESULT_SUCCESS, toggles)
+        return SlacEvseState.WAIT_SLAC_MATCH_REQ
+
+    async def _on_slac_match_req(self, event: SlacEvent) -> SlacEvseState:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Payload Received: \n %s", hexlify(event.frame))
+        slac_match_req = MatchReq.from_bytes(event.frame)
+        if slac_match_req.run_id != self.run_id:
+            # [V2G3-A09-98]: e.g. a late request of a previous run
+            logger.debug(
+                "CM_SLAC_MATCH.REQ of another session ignored, run_id %s",
+                slac_match_req.run_id.hex(),
+            )
+            self.metrics.count_frames(self.fsm_state.name, discarded=1)
+            return self.fsm_state
+
+        self.pev_id = slac_match_req.pev_id
+        self.pev_mac = slac_match_req.pev_mac
+
+        # Send Slac Match Confirmation Message
+        ether_header = EthernetHeader(dst_mac=self.pev_mac, src_mac=self.evse_mac)
+        homeplug_header = HomePlugHeader(CM_SLAC_MATCH | MMTYPE_CNF)
+        slac_match_conf = MatchCnf(
+            pev_mac=self.pev_mac,
+            evse_mac=self.evse_mac,
+            run_id=self.run_id,
+            nid=self.nid,
+            nmk=self.nmk,
+        )
+
+        frame_to_send = (
+            ether_header.pack_big()
+            + homeplug_header.pack_big()
+            + slac_match_conf.pack_big()
+        )
+
+        # Saved as the NMK leaves the EVSE, so that it is not reused after a
+        # restart. The write is not awaited, so that it does not delay the
+        # CM_SLAC_MATCH.CNF
+        self.nmk_sent = True
+        self.save_state()
+        await self.send_frame(frame_to_send)
+        self._observe_response("CM_SLAC_MATCH.CNF")
+        logger.debug("CM_SLAC_MATCH: Finished!")
+        self.state = STATE_MATCHED
+        return SlacEvseState.MATCHED
+
+    def _candidate_of(self, event: SlacEvent) -> Optional[SlacCandidate]:
+        """Candidate run the frame belongs to, if any"""
+        if event.kind == CM_ATTEN_PROFILE | MMTYPE_IND:
+            # The profile generated by the PLC node has no run_id, but the EV
+            # of each candidate run is a different one
+            return self.candidates.get_by_pev_mac(
+                AttenProfile.from_bytes(event.frame).pev_mac
+            )
+        return self.candidates.get(
+            CANDIDATE_EVENTS[event.kind].from_bytes(event.frame).run_id
+        )
+
+    async def _on_candidate_event(
+        self, event: SlacEvent, candidate: SlacCandidate
+    ) -> SlacEvseState:
+        """
+        Handles the frames of a candidate run, whatever the state of the run
+        followed. The attenuation characterization of the candidate run is
+        concluded by a task of its own (check _conclude_candidate_sounding)
+        and its CM_SLAC_MATCH.REQ makes it the run followed
+        """
+        if event.kind == CM_SLAC_MATCH | MMTYPE_REQ:
+            logger.info(
+                "CM_SLAC_MATCH.REQ received for candidate run %s, which replaces "
+                "run %s",
+                candidate.run_id.hex(),
+                self.run_id.hex(),
+            )
+            self.candidates.pop(candidate.run_id).cancel()
+            self.run_id = candidate.run_id
+            self.pev_mac = candidate.pev_mac
+            self.forwarding_sta = candidate.forwarding_sta
+            self.application_type = candidate.application_type
+            self.security_type = candidate.security_type
+            self.num_expected_sounds = candidate.num_expected_sounds
+            self.num_total_sounds = candidate.num_total_sounds
+            self.num_groups = candidate.num_groups
+            self.aag = candidate.aag
+            return await self._on_slac_match_req(event)
+        if event.kind == CM_START_ATTEN_CHAR | MMTYPE_IND:
+            start_atten_char = StartAtennChar.from_bytes(event.frame)
+            if (
+                start_atten_char.application_type != candidate.application_type
+                or start_atten_char.security_type != candidate.security_type
+                or start_atten_char.resp_type != SLAC_RESP_TYPE
+            ):
+                logger.debug("Invalid CM_START_ATTEN_CHAR.IND of candidate ignored")
+            elif candidate.task is None:
+                self._start_candidate_sounding(
+                    candidate,
+                    start_atten_char.num_sounds,
+                    start_atten_char.time_out * 100,
+                )
+        elif event.kind == CM_ATTEN_PROFILE | MMTYPE_IND:
+            if candidate.task is None:
+                # Sounds arrived before CM_START_ATTEN_CHAR.IND
+                self._start_candidate_sounding(
+                    candidate, SLAC_MSOUNDS, SLAC_ATTEN_TIMEOUT * 100
+                )
+            if candidate.is_sounding:
+                atten_profile = AttenProfile.from_bytes(event.frame)
+                candidate.add_profile(atten_profile.aag, atten_profile.num_groups)
+        # Nothing to do for CM_MNBC_SOUND.IND, whose AAG comes with the
+        # CM_ATTEN_PROFILE.IND that follows it, nor for CM_ATTEN_CHAR.RSP
+        return self.fsm_state
+
+    def _start_candidate_sounding(
+        self, candidate: SlacCandidate, num_sounds: int, time_out_ms: int
+    ) -> None:
+        candidate.num_expected_sounds = num_sounds
+        candidate.time_out_ms = self.config.slac_atten_results_timeout or time_out_ms
+        candidate.task = asyncio.create_task(
+            self._conclude_candidate_sounding(candidate)
+        )
+
+    async def _conclude_candidate_sounding(self, candidate: SlacCandidate) -> None:
+        """
+        Awaits the sounds of the candidate run, or the expiry of its timer,
+        and answers its EV with CM_ATTEN_CHAR.IND, unless another EVSE of
+        the site won the arbitration
+        """
+        try:
+            await asyncio.wait_for(
+                candidate.sounding_done.wait(), candidate.time_out_ms / 1000
+            )
+        except asyncio.TimeoutError:
+            candidate.sounding_done.set()
+        if candidate.num_total_sounds == 0:
+            logger.debug("No sounds received for candidate %s", candidate.run_id.hex())
+            return
+        candidate.average()
+        if self.arbiter and not await self.arbiter.submit(
+            self.evse_id,
+            candidate.run_id,
+            candidate.pev_mac,
+            candidate.aag,
+            candidate.num_groups,
+        ):
+            return
+        await self._send_atten_char(candidate)
+
+    async def evse_slac_parm(self) -> None:
+        """
+        Waits for CM_SLAC_PARM.REQ and answers with CM_SLAC_PARM.CNF
+        (state WAIT_SLAC_PARM_REQ of the state machine)
+        """
+        logger.debug("CM_SLAC_PARM: Started...")
+        self.reset_socket()
+        # Events deferred by a previous matching attempt do not apply anymore
+        self._deferred_events.clear()
+        try:
+            await self.run_state_machine(
+                SlacEvseState.WAIT_SLAC_PARM_REQ, SlacEvseState.WAIT_START_ATTEN_CHAR
+            )
+        except asyncio.TimeoutError as e:
+            logger.warning("Timeout waiting for CM_SLAC_PARM.REQ: %s", e)
+            raise e
+        logger.debug("CM_SLAC_PARM: Finished!")
+
+    async def cm_start_atten_charac(self):
+        """
+        Waits for CM_START_ATTEN_CHAR.IND (state WAIT_START_ATTEN_CHAR of the
+        state machine)
+        """
+        logger.debug("CM_START_ATTEN_CHAR: Started...")
+        await self.run_state_machine(
+            SlacEvseState.WAIT_START_ATTEN_CHAR, SlacEvseState.SOUNDING
+        )
 
     def process_sound_frame(
         self,
@@ -548,11 +1487,11 @@ class SlacEvseSession(SlacSession):
         the class AttenProfile:
         |PEV MAC|NumGroups|RSVD|AAG 1| AAG 2| AAG 3...|
 
-        The sounds reception loop is comprised by the following steps:
-        1. awaiting for the reception of a packet
-        2. Check for incorrect metadata like Application Type, RunID, ...
-        3. Check if the packet is a CM_MNBC_SOUND or CM_ATTEN_PROFILE
-        4. if it is a CM_MNBC_SOUND
+        The sounds reception (state SOUNDING of the state machine) is comprised
+        by the following steps:
+        1. awaiting for the reception of a packet or for the expiry of the timer
+        2. Check if the packet is a CM_MNBC_SOUND or CM_ATTEN_PROFILE
+        3. Check for incorrect metadata like RunID or the PEV MAC
 
 
         accept only CM_MNBC_SOUND.IND that match RunID from the earlier
@@ -566,271 +1505,226 @@ class SlacEvseSession(SlacSession):
         number of sounds before returning;
         """
         logger.debug("CM_MNBC_SOUND: Started...")
-        sounds_rcvd: int = 0
-        aag: List[int] = [0] * SLAC_GROUPS
-        self.aag = [0] * SLAC_GROUPS
-        # time stamp of the start of the signal attenuation measurement and calc
-        time_start = time_now_ms()
-        self.num_total_sounds = 0
-        # We receive in an alternated way the messages
-        # CM_MNBC_SOUND.IND and CM_ATTEN_PROFILE.IND and the first
-        # message is always a CM_MNBC_SOUND.IND
-        next_frame_size: int = FramesSizes.CM_MNBC_SOUND_IND
-        while True:
-            try:
-                data_rcvd = await self.rcv_frame(
-                    rcv_frame_size=next_frame_size,
-                    # The SLAC_REQ_TIMEOUT used seems to not be enough for the
-                    # PLC chip to send a sound, so we use 1 sec instead
-                    timeout=1,
-                )
-                ether_frame = EthernetHeader.from_bytes(data_rcvd)
-                homeplug_frame = HomePlugHeader.from_bytes(data_rcvd)
-            except Exception as e:
-                logger.exception(e, exc_info=True)
-                raise e
-            if (
-                ether_frame.ether_type == ETH_TYPE_HPAV
-                and homeplug_frame.mmv == HOMEPLUG_MMV
-            ):
-                if homeplug_frame.mm_type in [
-                    CM_ATTEN_PROFILE | MMTYPE_IND,
-                    CM_MNBC_SOUND | MMTYPE_IND,
-                ]:
-                    next_frame_size = self.process_sound_frame(
-                        homeplug_frame, ether_frame, data_rcvd, sounds_rcvd, aag
-                    )
-
-                # Check for a timeout of a reception of the expected sounds
-                time_elapsed = time_now_ms() - time_start
-                if (
-                    time_elapsed < self.time_out_ms
-                    and self.num_total_sounds < self.num_expected_sounds
-                ):
-                    continue
-
-                # Time specified by the EV for the Characterization has expired
-                # or num of total sounds is >= expected sounds thus, the Atten
-                # data must be grouped and averaged before the loop is
-                # terminated [V2G3-A09-19]
-                if self.num_total_sounds > 0:
-                    for group in range(SLAC_GROUPS):
-                        self.aag[group] = hw(aag[group] / self.num_total_sounds)
-                logger.debug("CM_MNBC_SOUND: Finished!")
-                return
+        await self.run_state_machine(
+            SlacEvseState.SOUNDING, SlacEvseState.WAIT_ATTEN_CHAR_RSP
+        )
 
     async def cm_atten_char(self):
+        """
+        Sends CM_ATTEN_CHAR.IND and waits for CM_ATTEN_CHAR.RSP (state
+        WAIT_ATTEN_CHAR_RSP of the state machine)
+        """
         logger.debug("CM_ATTEN_CHAR Started...")
-        ether_header = EthernetHeader(dst_mac=self.pev_mac, src_mac=self.evse_mac)
-        homeplug_header = HomePlugHeader(CM_ATTEN_CHAR | MMTYPE_IND)
-        atten_charac = AtennChar(
-            source_address=self.pev_mac,
-            run_id=self.run_id,
-            num_sounds=self.num_total_sounds,
-            num_groups=self.num_groups,
-            aag=self.aag,
-        )
-
-        frame_to_send = (
-            ether_header.pack_big()
-            + homeplug_header.pack_big()
-            + atten_charac.pack_big()
+        await self.run_state_machine(
+            SlacEvseState.WAIT_ATTEN_CHAR_RSP, SlacEvseState.WAIT_SLAC_MATCH_REQ
         )
 
-        await self.send_frame(frame_to_send)
-        while True:
-            try:
-                # A complete CM_ATTEN_CHAR.RSP frame must have 70 Bytes:
-                # EthernetHeader = 14 bytes
-                # HomePlugHeader  = 5 bytes
-                # AttenCharRsp = 51 bytes
-                data_rcvd = await self.rcv_frame(
-                    rcv_frame_size=FramesSizes.CM_ATTEN_CHAR_RSP,
-                    # The SLAC_RESP_TIMEOUT used seems to not be enough for the
-                    # PLC chip to send a sound, so we use 1 sec instead
-                    timeout=1,
-                )
-                logger.debug(f"Payload Received: \n {hexlify(data_rcvd)}")
-                ether_frame = EthernetHeader.from_bytes(data_rcvd)
-                homeplug_frame = HomePlugHeader.from_bytes(data_rcvd)
-                if homeplug_frame.mm_type != CM_ATTEN_CHAR | MMTYPE_RSP:
-                    logger.warning("Frame received is not CM_ATTEN_CHAR.RSP")
-                    logger.debug("Continue waiting for CM_ATTEN_CHAR.RSP...")
-                    continue
-                atten_charac_response = AtennCharRsp.from_bytes(data_rcvd)
-            except Exception as e:
-                logger.exception(e, exc_info=True)
-                raise e
-
-            if (
-                ether_frame.ether_type != ETH_TYPE_HPAV
-                or homeplug_frame.mmv != HOMEPLUG_MMV
-                or self.run_id != atten_charac_response.run_id
-            ):
-                # TODO: add __str__ or __repr__ methods to the classes
-                # for a neat printing
-                logger.exception(ether_frame)
-                logger.exception(homeplug_frame)
-                logger.exception(atten_charac_response)
-                # TODO: Check if we shall raise an Error or just ignore
-                # According with [V2G3-A09-47] from ISO15118-3, it shall just be
-                # ignored
-                e = ValueError(
-                    "AttenChar Resp Failed, ether type or homeplug "
-                    "frame are incorrect."
-                )
-                logger.exception(e)
-                raise e
-            break
-
-        if atten_charac_response.result != 0:
-            e = ValueError("Atten Char Resp Failed: Atten Char Result " "is not 0x00")
-            logger.exception(e)
-            raise e
-        logger.debug("CM_ATTEN_CHAR: Finished!")
-        logger.debug(f"Num sounds received {self.num_total_sounds}")
-        logger.debug(f"Num total sounds: {self.num_total_sounds}")
-        logger.debug(f"Num expected sounds: {self.num_expected_sounds}")
-
     async def cm_slac_match(self):
+        """
+        Waits for CM_SLAC_MATCH.REQ and answers with CM_SLAC_MATCH.CNF (state
+        WAIT_SLAC_MATCH_REQ of the state machine)
+        """
         logger.debug("CM_SLAC_MATCH: Started...")
-        # Await for a CM_SLAC_MATCH.REQ from EV
-        while True:
-            try:
-                # A complete CM_SLAC_MATCH.REQ frame must have 85 Bytes:
-                # EthernetHeader = 14 bytes
-                # HomePlugHeader  = 5 bytes
-                # AttenCharRsp = 66 bytes
-                data_rcvd = await self.rcv_frame(
-                    rcv_frame_size=FramesSizes.CM_SLAC_MATCH_REQ,
-                    timeout=Timers.SLAC_MATCH_TIMEOUT,
-                )
-
-                logger.debug(f"Payload Received: \n {hexlify(data_rcvd)}")
-                ether_frame = EthernetHeader.from_bytes(data_rcvd)
-                homeplug_frame = HomePlugHeader.from_bytes(data_rcvd)
-                if homeplug_frame.mm_type != CM_SLAC_MATCH | MMTYPE_REQ:
-                    logger.warning("Frame received is not CM_SLAC_MATCH.REQ")
-                    logger.debug("Continue waiting for CM_SLAC_MATCH.REQ...")
-                    continue
-                slac_match_req = MatchReq.from_bytes(data_rcvd)
-            except Exception as e:
-                logger.exception(e, exc_info=True)
-                raise ValueError("SLAC Match Failed") from e
-
-            if (
-                ether_frame.ether_type != ETH_TYPE_HPAV
-                or homeplug_frame.mmv != HOMEPLUG_MMV
-                or slac_match_req.run_id != self.run_id
-            ):
-                # TODO: add __str__ or __repr__ methods to the classes
-                # for a neat printing
-                logger.debug(
-                    f"ether_type: {ether_frame.ether_type} \n"
-                    f"Expected: {ETH_TYPE_HPAV}"
-                )
-                logger.debug(
-                    f"MMV: {homeplug_frame.mmv} \n " f"Expected: {HOMEPLUG_MMV}"
-                )
-                logger.debug(
-                    f"MMType: {homeplug_frame.mm_type} \n "
-                    f"Expected: {CM_SLAC_MATCH | MMTYPE_REQ}"
-                )
-                logger.debug(
-                    f"RunId: {slac_match_req.run_id} \n " f"Expected: {self.run_id}"
-                )
-                # TODO: Check if we shall raise an Error or just ignore
-                # according with requirement [V2G3-A09-98] from ISO15118-3
-                # it shall be ignored
-                raise ValueError("SLAC Match Request Failed")
-            break
-
-        self.pev_id = slac_match_req.pev_id
-        self.pev_mac = slac_match_req.pev_mac
-
-        # Send Slac Match Confirmation Message
-        ether_header = EthernetHeader(dst_mac=self.pev_mac, src_mac=self.evse_mac)
-        homeplug_header = HomePlugHeader(CM_SLAC_MATCH | MMTYPE_CNF)
-        slac_match_conf = MatchCnf(
-            pev_mac=self.pev_mac,
-            evse_mac=self.evse_mac,
-            run_id=self.run_id,
-            nid=self.nid,
-            nmk=self.nmk,
-        )
-
-        frame_to_send = (
-            ether_header.pack_big()
-            + homeplug_header.pack_big()
-            + slac_match_conf.pack_big()
+        await self.run_state_machine(
+            SlacEvseState.WAIT_SLAC_MATCH_REQ, SlacEvseState.MATCHED
         )
 
-        await self.send_frame(frame_to_send)
-        logger.debug("CM_SLAC_MATCH: Finished!")
-        self.state = STATE_MATCHED
-
     async def is_link_status_active(self) -> bool:
         """
         This is something I checked that Intec does
         They send a HPGP message called LINK_STATUS.REQ to check if the
         the link between the PEV and EVSE is healthy
 
-        The call is done each 0.5s after the send of a CM_SLAC_MATCH.CNF
-        In order to not stress out the chip with requests, we do every 2 secs
+        The CNF is awaited through the same receive path as the SLAC frames,
+        so the session socket is not read by anyone else meanwhile
         """
         logger.debug("Checking Link Status: Started...")
         ethernet_header = EthernetHeader(
             dst_mac=self.evse_plc_mac, src_mac=self.evse_mac
         )
-        LINK_STATUS = 0xA0B8
-        mmv = b"\x00"
-        mm_type = LINK_STATUS | MMTYPE_REQ
-        # Link Status Req does not use the fragmentation fields
-        # TODO: Add an option in HomeplgugHeader to add this use case
-        homeplug_header_no_fragm = mmv + mm_type.to_bytes(2, "little")
-        vendor_mme = 0x00B052
-        link_status_req_payload = vendor_mme.to_bytes(3, "big")
+        homeplug_header = HomePlugVendorHeader(LINK_STATUS | MMTYPE_REQ)
+        link_status_req = LinkStatusReq()
 
         frame_to_send = (
             ethernet_header.pack_big()
-            + homeplug_header_no_fragm
-            + link_status_req_payload
-        )
-
-        # A complete LINK_STATUS.CNF frame must have 60 Bytes:
-        # EthernetHeader = 14 bytes
-        # HomePlugHeaderNoFrag  = 3 bytes
-        # LinkStatusRsp = 3 bytes
-        # Padding = 40 bytes (The min ETH frame must have 60 bytes,
-        # it this frame requires padding)
-        payload_rcvd = send_recv_eth(
-            frame_to_send=frame_to_send,
-            s=self.socket,
-            iface=self.iface,
-            rcv_frame_size=FramesSizes.LINK_STATUS_CNF,
-        )
-        if isawaitable(payload_rcvd):
-            payload_rcvd = await payload_rcvd
-
-        logger.debug(f"Payload Received {payload_rcvd}")
+            + homeplug_header.pack_big()
+            + link_status_req.pack_big()
+        )
         try:
-            # TODO: Create the Link Status Class and HomePlug to get properly
-            # TODO: the info
-            mm_type_rcvd = int.from_bytes(payload_rcvd[15:17], "little")
-            if mm_type_rcvd != (LINK_STATUS | MMTYPE_CNF):
-                raise ValueError("Message received is not LINK_STATUS.CNF")
-        except ValueError as e:
-            logger.error(e)
-            logger.debug("Link Status: Error")
+            await self.send_frame(frame_to_send)
+            payload_rcvd = await self.rcv_mme_of_type(
+                LINK_STATUS | MMTYPE_CNF, timeout=LINK_STATUS_TIMEOUT
+            )
+            link_status_cnf = LinkStatusCnf.from_bytes(payload_rcvd)
+        except (asyncio.TimeoutError, ValueError) as e:
+            logger.debug("Link Status: Error (%r)", e)
+            return False
+        if not link_status_cnf.is_link_active:
+            logger.debug(
+                "Link Status: Inactive (Status: %s, Link Status: %s)",
+                link_status_cnf.status,
+                link_status_cnf.link_status,
+            )
             return False
         logger.debug("Link Status: Active")
         return True
 
+    async def monitor_link(self) -> None:
+        """
+        Polls the link status after the match, until the link is considered
+        lost (LINK_MONITOR_MAX_FAILURES polls in a row without an active
+        link). The polls start LINK_MONITOR_MIN_INTERVAL apart, right after the
+        match, and the interval doubles after each healthy poll, up to
+        LINK_MONITOR_MAX_INTERVAL; a failed poll goes back to the min interval
+        """
+        interval = LINK_MONITOR_MIN_INTERVAL
+        failures = 0
+        while failures < LINK_MONITOR_MAX_FAILURES:
+            await asyncio.sleep(interval)
+            if await self.is_link_status_active():
+                failures = 0
+                interval = min(interval * 2, LINK_MONITOR_MAX_INTERVAL)
+            else:
+                failures += 1
+                interval = LINK_MONITOR_MIN_INTERVAL
+        logger.warning("PEV-EVSE Link Lost (EVSE ID: %s)", self.evse_id)
+
     async def atten_charac_routine(self):
-        await self.cm_start_atten_charac()
-        await self.cm_sounds_loop()
-        await self.cm_atten_char()
-        await self.cm_slac_match()
+        """
+        Runs the attenuation characterization and the match steps as a single
+        run of the state machine, from the reception of CM_START_ATTEN_CHAR.IND
+        until CM_SLAC_MATCH.CNF is sent, so that a frame of any of these steps
+        is handled whenever it arrives
+        """
+        try:
+            await self.run_state_machine(
+                SlacEvseState.WAIT_START_ATTEN_CHAR, SlacEvseState.MATCHED
+            )
+        finally:
+            # The candidate runs are dropped once a run is matched, or the
+            # matching attempt failed
+            self.candidates.clear()
+
+
+# Messages, by MMTYPE, whose run_id tells the candidate run a frame belongs to.
+# CM_ATTEN_PROFILE.IND, which has no run_id, is assigned by PEV MAC
+CANDIDATE_EVENTS = {
+    CM_START_ATTEN_CHAR | MMTYPE_IND: StartAtennChar,
+    CM_MNBC_SOUND | MMTYPE_IND: MnbcSound,
+    CM_ATTEN_PROFILE | MMTYPE_IND: AttenProfile,
+    CM_ATTEN_CHAR | MMTYPE_RSP: AtennCharRsp,
+    CM_SLAC_MATCH | MMTYPE_REQ: MatchReq,
+}
+
+# Handler of each (state, event) pair of the EVSE SLAC state machine. Each
+# handler returns the next state; events without a handler are ignored
+SLAC_EVSE_TRANSITIONS: Dict[
+    Tuple[SlacEvseState, int],
+    Callable[[SlacEvseSession, SlacEvent], Awaitable[SlacEvseState]],
+] = {
+    (
+        SlacEvseState.WAIT_SLAC_PARM_REQ,
+        CM_SLAC_PARM | MMTYPE_REQ,
+    ): SlacEvseSession._on_slac_parm_req,
+    (SlacEvseState.WAIT_SLAC_PARM_REQ, SLAC_TIMER_EVENT): SlacEvseSession._on_timeout,
+    (
+        SlacEvseState.WAIT_START_ATTEN_CHAR,
+        CM_SLAC_PARM | MMTYPE_REQ,
+    ): SlacEvseSession._on_later_slac_parm_req,
+    (
+        SlacEvseState.WAIT_START_ATTEN_CHAR,
+        CM_START_ATTEN_CHAR | MMTYPE_IND,
+    ): SlacEvseSession._on_start_atten_char,
+    (
+        SlacEvseState.WAIT_START_ATTEN_CHAR,
+        CM_MNBC_SOUND | MMTYPE_IND,
+    ): SlacEvseSession._on_early_sound,
+    (
+        SlacEvseState.WAIT_START_ATTEN_CHAR,
+        CM_ATTEN_PROFILE | MMTYPE_IND,
+    ): SlacEvseSession._on_early_sound,
+    (
+        SlacEvseState.WAIT_START_ATTEN_CHAR,
+        SLAC_TIMER_EVENT,
+    ): SlacEvseSession._on_timeout,
+    (
+        SlacEvseState.SOUNDING,
+        CM_SLAC_PARM | MMTYPE_REQ,
+    ): SlacEvseSession._on_later_slac_parm_req,
+    (
+        SlacEvseState.SOUNDING,
+        CM_START_ATTEN_CHAR | MMTYPE_IND,
+    ): SlacEvseSession._on_start_atten_char_retransmission,
+    (SlacEvseState.SOUNDING, CM_MNBC_SOUND | MMTYPE_IND): SlacEvseSession._on_sound,
+    (SlacEvseState.SOUNDING, CM_ATTEN_PROFILE | MMTYPE_IND): SlacEvseSession._on_sound,
+    (SlacEvseState.SOUNDING, SLAC_TIMER_EVENT): SlacEvseSession._on_sounding_timeout,
+    (
+        SlacEvseState.WAIT_ATTEN_CHAR_RSP,
+        CM_ATTEN_CHAR | MMTYPE_RSP,
+    ): SlacEvseSession._on_atten_char_rsp,
+    (SlacEvseState.WAIT_ATTEN_CHAR_RSP, SLAC_TIMER_EVENT): SlacEvseSession._on_timeout,
+    (
+        SlacEvseState.WAIT_ATTEN_CHAR_RSP,
+        CM_SLAC_PARM | MMTYPE_REQ,
+    ): SlacEvseSession._on_later_slac_parm_req,
+    (
+        SlacEvseState.WAIT_SLAC_MATCH_REQ,
+        CM_SLAC_PARM | MMTYPE_REQ,
+    ): SlacEvseSession._on_later_slac_parm_req,
+    (
+        SlacEvseState.WAIT_SLAC_MATCH_REQ,
+        CM_SLAC_MATCH | MMTYPE_REQ,
+    ): SlacEvseSession._on_slac_match_req,
+    (SlacEvseState.WAIT_SLAC_MATCH_REQ, SLAC_TIMER_EVENT): SlacEvseSession._on_timeout,
+    (
+        SlacEvseState.WAIT_SLAC_MATCH_REQ,
+        CM_VALIDATE | MMTYPE_REQ,
+    ): SlacEvseSession._on_validate_req,
+    (
+        SlacEvseState.WAIT_VALIDATE_REQ,
+        CM_VALIDATE | MMTYPE_REQ,
+    ): SlacEvseSession._on_validate_toggles_req,
+    (
+        SlacEvseState.WAIT_VALIDATE_REQ,
+        CM_SLAC_MATCH | MMTYPE_REQ,
+    ): SlacEvseSession._on_slac_match_req,
+    (SlacEvseState.WAIT_VALIDATE_REQ, SLAC_TIMER_EVENT): SlacEvseSession._on_timeout,
+}
+
+
+@dataclass
+class PlcInitResult:
+    """Outcome of the PLC node initialization of an EVSE"""
+
+    evse_id: str
+    iface: str
+    # Time taken, in seconds, to create the session and set the key
+    duration: float
+    # Session ready to be used, if the initialization succeeded
+    session: Optional["SlacEvseSession"] = None
+    error: Optional[BaseException] = None
+    # True if the key saved before a restart was reused (check
+    # SlacEvseSession.evse_restore_key)
+    key_restored: bool = False
+
+    @property
+    def is_ready(self) -> bool:
+        return self.session is not None
+
+
+class CpToggleCounter:
+    """Counts the B-C-B toggles among the CP states it is fed with"""
+
+    def __init__(self):
+        self.toggles = 0
+        self._in_state_c = False
+
+    def feed(self, cp_state: str) -> None:
+        if cp_state == "C":
+            self._in_state_c = True
+        elif cp_state == "B" and self._in_state_c:
+            self._in_state_c = False
+            self.toggles += 1
 
 
 class SlacSessionController:
@@ -840,6 +1734,200 @@ class SlacSessionController:
             f"\n ###### Starting PySlac version: {__version__} #######"
             f"\n#################################################\n"
         )
+        # Sessions handled by the controller, by EVSE ID
+        self.sessions: Dict[str, "SlacEvseSession"] = {}
+        self.metrics_server: Optional[MetricsServer] = None
+        self.arbiter: Optional[AttenuationArbiter] = None
+        # Counters of the CP toggles of the validations ongoing, by EVSE ID
+        self._cp_toggle_counters: Dict[str, CpToggleCounter] = {}
+        # Last Config given to init_plc_nodes or reload_config
+        self.config: Optional[Config] = None
+
+    def enable_attenuation_arbitration(
+        self, window: float = ARBITRATION_WINDOW
+    ) -> AttenuationArbiter:
+        """
+        Makes the sessions of the controller arbitrate their attenuation
+        profiles, so that, when several EVSEs hear the same EV (PLC
+        crosstalk), only the one with the lowest attenuation sends
+        CM_ATTEN_CHAR.IND and may be matched. Sessions of the EVSEs that lose
+        the arbitration wait for the next CM_SLAC_PARM.REQ.
+
+        :param window: max time, in seconds, to wait for the profiles of the
+        other EVSEs once the sounding of a session is over
+        """
+        self.arbiter = AttenuationArbiter(window)
+        for slac_session in self.sessions.values():
+            slac_session.arbiter = self.arbiter
+        return self.arbiter
+
+    def _register_session(self, slac_session: "SlacEvseSession") -> None:
+        self.sessions[slac_session.evse_id] = slac_session
+        slac_session.arbiter = self.arbiter
+        slac_session.count_cp_toggles = self.count_cp_toggles
+
+    def reload_config(self, config: Config) -> Dict[str, Tuple[Any, Any]]:
+        """
+        Applies a new Config to the sessions without restarting them: idle
+        sessions use it right away and the others once their current SLAC
+        phase is over. The log level, if set, is applied to the root logger.
+
+        :return: the settings changed, as {name: (old value, new value)}
+        """
+        changes: Dict[str, Tuple[Any, Any]] = (
+            self.config.diff(config) if self.config else {}
+        )
+        for slac_session in self.sessions.values():
+            for name, change in slac_session.update_config(config).items():
+                changes.setdefault(name, change)
+        if config.log_level and "log_level" in changes:
+            logging.getLogger().setLevel(config.log_level)
+        self.config = config
+        if changes:
+            logger.info(
+                "Config reloaded: %s",
+                ", ".join(
+                    f"{name} {old!r} -> {new!r}" for name, (old, new) in changes.items()
+                ),
+            )
+        else:
+            logger.info("Config reloaded, no setting changed")
+        return changes
+
+    def reload_envs(self, env_path: Optional[str] = None) -> Dict[str, Tuple[Any, Any]]:
+        """
+        Reads the .env file and the environment again (check Config.load_envs)
+        and applies the resulting Config with reload_config. If any setting is
+        invalid, the current Config is kept
+
+        :raises ValueError: if the new settings are invalid
+        """
+        config = Config()
+        try:
+            config.load_envs(env_path, override=True)
+        except ValueError as e:
+            logger.error("Config not reloaded, invalid settings: %s", e)
+            raise
+        return self.reload_config(config)
+
+    def install_reload_handler(
+        self, env_path: Optional[str] = None, sig: int = signal.SIGHUP
+    ) -> None:
+        """
+        Reloads the settings (check reload_envs) when the process receives
+        `sig`, e.g. with `kill -HUP <pid>`. Unix only
+        """
+
+        def on_signal():
+            try:
+                self.reload_envs(env_path)
+            except ValueError:
+                pass
+
+        asyncio.get_event_loop().add_signal_handler(sig, on_signal)
+
+    def get_metrics(self) -> Dict[str, dict]:
+        """Latency histograms and frame counters of the sessions, by EVSE ID"""
+        return {
+            evse_id: slac_session.metrics.as_dict()
+            for evse_id, slac_session in self.sessions.items()
+        }
+
+    async def start_metrics_server(
+        self,
+        host: str = "127.0.0.1",
+        port: int = METRICS_SERVER_PORT,
+        path: Optional[str] = None,
+    ) -> MetricsServer:
+        """
+        Starts serving the metrics of the sessions in the Prometheus text
+        format, over HTTP on host:port or, if `path` is given, on that Unix
+        socket
+        """
+        self.metrics_server = MetricsServer(lambda: self.sessions)
+        await self.metrics_server.start(host, port, path)
+        return self.metrics_server
+
+    async def init_plc_nodes(
+        self,
+        evses_params: List[dict],
+        config: Config,
+        max_concurrency: int = PLC_INIT_MAX_CONCURRENCY,
+        timeout: Union[float, int] = PLC_INIT_TIMEOUT,
+    ) -> List[PlcInitResult]:
+        """
+        Creates a SlacEvseSession and sets the NMK and NID of the PLC node of
+        every EVSE concurrently, so that the startup time of the charging
+        station does not grow with the number of EVSEs.
+        The failure or timeout of an EVSE does not affect the other ones.
+        If the sessions save their state (Config.state_dir), the key saved
+        before a restart is reused when the PLC node still has it.
+
+        :param evses_params: list of dicts, with the keys "evse_id" and
+        "network_interface", as in the "parameters" of cs_configuration.json
+        :param config: Config used by the sessions
+        :param max_concurrency: max number of PLC nodes initialized at once
+        :param timeout: max time, in seconds, for the initialization of each EVSE
+        :return: list with the PlcInitResult of each EVSE, in the same order
+        as evses_params
+        """
+        self.config = config
+        semaphore = asyncio.Semaphore(max_concurrency)
+        loop = asyncio.get_event_loop()
+
+        async def init_plc_node(evse_id: str, iface: str) -> PlcInitResult:
+            async with semaphore:
+                time_start = loop.time()
+                slac_session: Optional[SlacEvseSession] = None
+                initialized = False
+                try:
+                    slac_session = SlacEvseSession(evse_id, iface, config)
+                    key_restored = await asyncio.wait_for(
+                        slac_session.evse_init_key(), timeout
+                    )
+                    initialized = True
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Any error, e.g. a malformed confirmation of the PLC
+                    # node, only fails the initialization of this EVSE
+                    logger.error(
+                        "PLC chip initialization failed for EVSE %s, interface %s: %r",
+                        evse_id,
+                        iface,
+                        e,
+                    )
+                    return PlcInitResult(
+                        evse_id, iface, loop.time() - time_start, error=e
+                    )
+                finally:
+                    # The socket of a session that did not come up is not
+                    # left open
+                    if slac_session is not None and not initialized:
+                        slac_session.socket.close()
+                duration = loop.time() - time_start
+                logger.info(
+                    "PLC chip initialized for EVSE %s in %.2f s", evse_id, duration
+                )
+                slac_session.metrics.plc_init_time = duration
+                self._register_session(slac_session)
+                return PlcInitResult(
+                    evse_id,
+                    iface,
+                    duration,
+                    session=slac_session,
+                    key_restored=key_restored,
+                )
+
+        results = await asyncio.gather(
+            *(
+                init_plc_node(params["evse_id"], params["network_interface"])
+                for params in evses_params
+            )
+        )
+        ready = sum(result.is_ready for result in results)
+        logger.info("PLC chips initialized: %s/%s", ready, len(results))
+        return list(results)
 
     async def notify_matching_ongoing(self, evse_id: str):
         """
@@ -853,6 +1941,27 @@ class SlacSessionController:
         """
         pass
 
+    async def notify_link_lost(self, evse_id: str):
+        """
+        Used to Notify an external service that the link with the EV was lost
+        after the match. The session then leaves the logical network
+        """
+        pass
+
+    async def count_cp_toggles(self, evse_id: str, duration: float) -> int:
+        """
+        Used to count the B-C-B toggles of the Control Pilot done by the EV
+        during the validation (CM_VALIDATE). By default, the CP states
+        reported with process_cp_state during `duration` seconds are counted;
+        it can be overridden, e.g. to read the counter of the CP circuit
+        """
+        counter = self._cp_toggle_counters[evse_id] = CpToggleCounter()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            del self._cp_toggle_counters[evse_id]
+        return counter.toggles
+
     async def enable_hlc_charging(self, evse_id: str):
         """
         Used to interface with an external service that controls the PWM of the
@@ -875,7 +1984,10 @@ class SlacSessionController:
         # or not (e.g. A1 - it cant, A2 it can); so we get only the first character
         # from the string, since is that what we are interested here.
         cp_state = state[0]
-        logger.debug(f"CP State Received: {state}")
+        logger.debug("CP State Received: %s", state)
+        toggle_counter = self._cp_toggle_counters.get(slac_session.evse_id)
+        if toggle_counter is not None:
+            toggle_counter.feed(cp_state)
         if cp_state in ["A", "E", "F"] and slac_session.matching_process_task:
             if cp_state == "A" or slac_session.state == STATE_MATCHED:
                 # We kill the task if a direct transition to state A is detected
@@ -889,6 +2001,10 @@ class SlacSessionController:
                 slac_session.matching_process_task = None
                 logger.debug("Leaving Logical Network")
         elif cp_state in ["B", "C", "D"] and slac_session.matching_process_task is None:
+            # Sessions not created by init_plc_nodes are registered on their
+            # first matching; the hooks of a session matching are never reset
+            if self.sessions.get(slac_session.evse_id) is not slac_session:
+                self._register_session(slac_session)
             slac_session.matching_process_task = asyncio.create_task(
                 self.start_matching(slac_session)
             )
@@ -902,70 +2018,110 @@ class SlacSessionController:
             slac_session.matching_process_task.add_done_callback(task_callback)
 
     async def start_matching(
-        self, slac_session: "SlacEvseSession", number_of_retries=3
+        self, slac_session: "SlacEvseSession", number_of_retries: Optional[int] = None
     ) -> None:
         """
         Task that is spawned once a state change is detected from A, E or F to
         B, C or D. This task is responsible to run the right methods defined in
         session.py, which as a whole comprise the SLAC protocol.
-        In case SLAC fails, it retries up to 3 times to get a match, and
-        in case it fails again, it gives up and just with a transition to B, C or D,
-        SLAC will restart.
+        In case SLAC fails, it is retried as defined by the retry policy of the
+        session (check pyslac.retry); once the policy gives up, SLAC only
+        restarts with a new transition to B, C or D.
 
         :param slac_session: Instance of SlacEvseSession
         :param number_of_retries: number of trials before SLAC Mathing is defined
-        as a failure
+        as a failure, overrides the max_attempts of the retry policy
         :return: None
         """
-        while number_of_retries:
-            number_of_retries -= 1
-            await slac_session.evse_slac_parm()
-            if slac_session.state == STATE_MATCHING:
-                logger.info(
-                    f"Matching ongoing (EVSE ID: {slac_session.evse_id}. Run ID: {slac_session.run_id})."
-                )
-                await self.notify_matching_ongoing(slac_session.evse_id)
-                try:
-                    await slac_session.atten_charac_routine()
-                except Exception as e:
-                    slac_session.state = STATE_UNMATCHED
-                    logger.debug(
-                        f"Exception Occurred during Attenuation Charc Routine:"
-                        f"{e} \n"
-                        f"Number of retries left {number_of_retries}"
+        policy = slac_session.retry_policy
+        if number_of_retries is not None:
+            policy = replace(policy, max_attempts=number_of_retries)
+        await slac_session.wait_key_rotation()
+        attempt = 0
+        failed_attempts = 0
+        started_at = None
+        try:
+            while True:
+                attempt += 1
+                slac_session.start_trace(attempt)
+                await slac_session.evse_slac_parm()
+                if started_at is None:
+                    # TT_matching_repetition runs from the first CM_SLAC_PARM.REQ
+                    started_at = policy.clock()
+                error = None
+                if slac_session.state == STATE_MATCHING:
+                    slac_session.metrics.matchings_attempted += 1
+                    logger.info(
+                        "Matching ongoing (EVSE ID: %s. Run ID: %s).",
+                        slac_session.evse_id,
+                        slac_session.run_id,
                     )
-            if slac_session.state == STATE_MATCHED:
-                logger.info(
-                    f"PEV-EVSE MATCHED Successfully, Link Established (EVSE ID: {slac_session.evse_id}. Run ID: {slac_session.run_id})."
+                    await self.notify_matching_ongoing(slac_session.evse_id)
+                    try:
+                        await slac_session.atten_charac_routine()
+                    except ArbitrationLost as e:
+                        # The EV is plugged into another EVSE, so this attempt
+                        # does not count as a failed one
+                        slac_session.state = STATE_UNMATCHED
+                        slac_session.end_trace(e)
+                        logger.info("%s, awaiting a new CM_SLAC_PARM.REQ", e)
+                        continue
+                    except Exception as e:
+                        error = e
+                        slac_session.state = STATE_UNMATCHED
+                        slac_session.end_trace(e)
+                        logger.debug(
+                            "Exception Occurred during Attenuation Charc Routine: %r", e
+                        )
+                if slac_session.state == STATE_MATCHED:
+                    slac_session.metrics.matchings_succeeded += 1
+                    slac_session.metrics.observe_matching(
+                        "matched", (policy.clock() - started_at) * 1000
+                    )
+                    slac_session.end_trace()
+                    logger.info(
+                        "PEV-EVSE MATCHED Successfully, Link Established "
+                        "(EVSE ID: %s. Run ID: %s).",
+                        slac_session.evse_id,
+                        slac_session.run_id,
+                    )
+                    await slac_session.monitor_link()
+                    await self.notify_link_lost(slac_session.evse_id)
+                    # leaving the logical network, done once the loop is left
+                    break
+                if slac_session.state != STATE_UNMATCHED:
+                    logger.error("SLAC State not recognized %s", slac_session.state)
+                    break
+                slac_session.end_trace()
+                failed_attempts += 1
+                if policy.should_retry(failed_attempts, started_at, error):
+                    slac_session.metrics.matching_retries += 1
+                    logger.warning(
+                        "PEV-EVSE MATCHED Failed (attempt %s); Retrying..", attempt
+                    )
+                    await policy.sleep(policy.pause)
+                    continue
+                slac_session.metrics.matchings_failed += 1
+                slac_session.metrics.observe_matching(
+                    "given_up", (policy.clock() - started_at) * 1000
                 )
-                while True:
-                    await asyncio.sleep(2.0)
-
-                # The check of the link status wont be done using the message
-                # LINK_STATUS, because it is not a proper way to check it since
-                # it only provides a confirmation to the message
-                # Instead, NW_INFO message is a better one
-
-                # logger.debug("PEV-EVSE Link Lost")
-                # leaving the logical network
-                # In order to avoid writing too many times to the device,
-                # we dont reset the NID and NMK between charging sessions for now
-                # await slac_session.leave_logical_network()
-                # slac_session.matching_process_task = None
-                # break
-            if slac_session.state == STATE_UNMATCHED:
-                number_of_retries -= 1
-                if number_of_retries > 0:
-                    logger.warning("PEV-EVSE MATCHED Failed; Retrying..")
-                else:
-                    logger.error("PEV-EVSE MATCHED Failed: No more retries " "possible")
-                    await self.notify_matching_failed(slac_session.evse_id)
-            else:
-                logger.error(f"SLAC State not recognized {slac_session.state}")
+                logger.error(
+                    "PEV-EVSE MATCHED Failed: No more retries possible "
+                    "(%s failed attempts in %.1f s)",
+                    failed_attempts,
+                    policy.clock() - started_at,
+                )
+                await self.notify_matching_failed(slac_session.evse_id)
+                break
+        except BaseException as e:
+            # e.g. cancelled by the unplug of the EV: the trace of the attempt
+            # in progress, if any, is exported all the same
+            slac_session.end_trace(e)
+            raise
 
         logger.debug("SLAC Protocol Concluded...")
         # TODO: May need to communicate to HLE that the link is lost (check section
         # 7.5 Loss of communication in -3). Send Unmatched
         # TODO: May need to communicate to CS that the link is gone, so that
         # Basic Charging can be tried
-        await slac_session.leave_logical_network()
+        slac_session.leave_logical_network_nowait()
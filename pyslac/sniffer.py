@@ -0,0 +1,478 @@
+"""
+HomePlug/SLAC sniffer
+
+Decodes the HomePlug AV frames captured live from one or more interfaces, or
+read from a pcap file, using the pyslac codecs, and prints them one per line,
+as text or JSON.
+
+The live capture reuses the socket and BPF filter of create_socket. To keep up
+with a sound burst on several interfaces at once, the sockets are drained in
+batches of up to `batch_size` frames each time they are ready to be read, and
+the lines of each batch are written to the output with a single write.
+
+Usage examples:
+$ pyslac -i eth0 -i eth1 --mm-type CM_MNBC_SOUND --json
+$ pyslac -r capture.pcap --mac 00:b0:52:00:00:01 --run-id fafafafafafafafa
+"""
+import argparse
+import json
+import os
+import selectors
+import struct
+import sys
+import time
+from dataclasses import fields, is_dataclass
+from itertools import islice
+from socket import SO_RCVBUF, SOL_SOCKET
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+)
+
+from pyslac.enums import (
+    CM_ATTEN_CHAR,
+    CM_ATTEN_PROFILE,
+    CM_MNBC_SOUND,
+    CM_SET_KEY,
+    CM_SLAC_MATCH,
+    CM_SLAC_PARM,
+    CM_START_ATTEN_CHAR,
+    CM_VALIDATE,
+    ETH_FRAME_MAX_SIZE,
+    ETH_TYPE_HPAV,
+    LINK_STATUS,
+    MMTYPE_CNF,
+    MMTYPE_IND,
+    MMTYPE_REQ,
+    MMTYPE_RSP,
+    VS_NW_INFO,
+    VS_RESET,
+    VS_SW_VER,
+)
+from pyslac.fragmentation import MmeReassembler
+from pyslac.frame_validator import FRAME_SHAPES, FrameShape, FrameValidator
+from pyslac.sockets.async_linux_socket import create_socket
+from pyslac.vendor_messages import (
+    LinkStatusReq,
+    VsNwInfoReq,
+    VsResetReq,
+    VsSwVerReq,
+)
+
+MM_TYPE_BASE_NAMES = {
+    CM_SET_KEY: "CM_SET_KEY",
+    CM_SLAC_PARM: "CM_SLAC_PARM",
+    CM_START_ATTEN_CHAR: "CM_START_ATTEN_CHAR",
+    CM_MNBC_SOUND: "CM_MNBC_SOUND",
+    CM_ATTEN_PROFILE: "CM_ATTEN_PROFILE",
+    CM_ATTEN_CHAR: "CM_ATTEN_CHAR",
+    CM_VALIDATE: "CM_VALIDATE",
+    CM_SLAC_MATCH: "CM_SLAC_MATCH",
+    VS_SW_VER: "VS_SW_VER",
+    VS_RESET: "VS_RESET",
+    VS_NW_INFO: "VS_NW_INFO",
+    LINK_STATUS: "LINK_STATUS",
+}
+MM_TYPE_KIND_NAMES = {
+    MMTYPE_REQ: "REQ",
+    MMTYPE_CNF: "CNF",
+    MMTYPE_IND: "IND",
+    MMTYPE_RSP: "RSP",
+}
+MM_TYPE_KIND_MASK = 0x0003
+
+# Besides the MMEs received by the EVSE, the sniffer also decodes the vendor
+# specific requests sent by the host to its PLC chip
+SNIFFER_SHAPES: Dict[int, FrameShape] = {
+    **FRAME_SHAPES,
+    VS_SW_VER | MMTYPE_REQ: FrameShape(VsSwVerReq, 20, mmv=0x00),
+    VS_RESET | MMTYPE_REQ: FrameShape(VsResetReq, 20, mmv=0x00),
+    VS_NW_INFO | MMTYPE_REQ: FrameShape(VsNwInfoReq, 20, mmv=0x00),
+    LINK_STATUS | MMTYPE_REQ: FrameShape(LinkStatusReq, 20, mmv=0x00),
+}
+
+# Max number of frames read from a socket, or from a pcap file, per batch
+SNIFFER_BATCH_SIZE = 64
+# Size requested for the socket receive buffer, so that bursts are absorbed
+# by the kernel while the previous batch is decoded
+SNIFFER_RCVBUF_SIZE = 4 * 1024 * 1024
+
+# pcap magic numbers and the resolution of their timestamps
+PCAP_MAGIC = {0xA1B2C3D4: 1e-6, 0xA1B23C4D: 1e-9}
+PCAP_LINKTYPE_ETHERNET = 1
+
+
+def format_mac(mac: bytes) -> str:
+    return ":".join(f"{byte:02x}" for byte in mac)
+
+
+def mm_type_name(mm_type: int) -> str:
+    """Returns the name of the MMTYPE, e.g. CM_SLAC_PARM.REQ"""
+    base_name = MM_TYPE_BASE_NAMES.get(mm_type & ~MM_TYPE_KIND_MASK)
+    if base_name is None:
+        return f"{mm_type:#06x}"
+    return f"{base_name}.{MM_TYPE_KIND_NAMES[mm_type & MM_TYPE_KIND_MASK]}"
+
+
+def parse_mm_type(value: str) -> Tuple[int, bool]:
+    """
+    Parses a MMTYPE given in the command line, either as a number
+    (e.g. 0x6065) or as a name (e.g. CM_SLAC_PARM.CNF).
+
+    :return: tuple with the MMTYPE and a flag which is True if just the base
+    code was given by name (e.g. CM_SLAC_PARM), matching all of its kinds
+    """
+    name, _, kind = value.upper().partition(".")
+    names = {base_name: base for base, base_name in MM_TYPE_BASE_NAMES.items()}
+    if name in names:
+        if not kind:
+            return names[name], True
+        kinds = {kind_name: kind for kind, kind_name in MM_TYPE_KIND_NAMES.items()}
+        if kind not in kinds:
+            raise ValueError(f"Unknown MMTYPE kind: {value}")
+        return names[name] | kinds[kind], False
+    try:
+        return int(value, 0), False
+    except ValueError:
+        raise ValueError(f"Unknown MMTYPE: {value}") from None
+
+
+def parse_mac(value: str) -> bytes:
+    mac = bytes.fromhex(value.replace(":", "").replace("-", ""))
+    if len(mac) != 6:
+        raise ValueError(f"Invalid MAC address: {value}")
+    return mac
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    if is_dataclass(value):
+        return message_fields(value)
+    return value
+
+
+def message_fields(message) -> Dict[str, Any]:
+    """Returns the fields of a decoded message, with bytes as hex strings"""
+    return {
+        field.name: _json_value(getattr(message, field.name))
+        for field in fields(message)
+    }
+
+
+class FrameFilter:
+    """
+    Selects the frames to print. All the criteria given must match:
+
+    :param mm_types: MMTYPEs accepted (e.g. CM_SLAC_PARM | MMTYPE_CNF)
+    :param mm_type_bases: MMTYPE base codes accepted, of any kind
+    :param macs: MAC addresses accepted, either as source or destination
+    :param run_id: run_id the frame must carry
+    """
+
+    def __init__(
+        self,
+        mm_types: Optional[Set[int]] = None,
+        mm_type_bases: Optional[Set[int]] = None,
+        macs: Optional[Set[bytes]] = None,
+        run_id: Optional[bytes] = None,
+    ):
+        self.mm_types = mm_types or set()
+        self.mm_type_bases = mm_type_bases or set()
+        self.macs = macs or set()
+        self.run_id = run_id
+
+    def match_header(self, frame: bytes, mm_type: int) -> bool:
+        """Checks the criteria that do not require the frame to be decoded"""
+        if (self.mm_types or self.mm_type_bases) and not (
+            mm_type in self.mm_types
+            or mm_type & ~MM_TYPE_KIND_MASK in self.mm_type_bases
+        ):
+            return False
+        if self.macs and frame[0:6] not in self.macs and frame[6:12] not in self.macs:
+            return False
+        return True
+
+    def match_message(self, message) -> bool:
+        if self.run_id is None:
+            return True
+        return getattr(message, "run_id", None) == self.run_id
+
+
+class Sniffer:
+    """
+    Decodes the frames captured and writes one line per frame, that passes the
+    filter, to the output.
+
+    Fragmented MMEs are reassembled before being decoded, using one
+    MmeReassembler per interface.
+    """
+
+    def __init__(
+        self,
+        output: Optional[TextIO] = None,
+        frame_filter: Optional[FrameFilter] = None,
+        json_output: bool = False,
+    ):
+        self.output = output or sys.stdout
+        self.frame_filter = frame_filter or FrameFilter()
+        self.json_output = json_output
+        self.frame_validator = FrameValidator(SNIFFER_SHAPES)
+        self.reassemblers: Dict[str, MmeReassembler] = {}
+        # Statistics
+        self.frames_rcvd = 0
+        self.frames_printed = 0
+        self.frames_malformed = 0
+
+    def decode(self, frame: bytes, iface: str, timestamp: float) -> Optional[dict]:
+        """
+        Decodes a frame into a record with the Ethernet and HomePlug header
+        fields and, if pyslac has a codec for its MMTYPE, the message fields.
+
+        :return: the record, or None if the frame is not a (complete)
+        HomePlug AV frame or does not pass the filter
+        """
+        if len(frame) < 17 or frame[12:14] != ETH_TYPE_HPAV.to_bytes(2, "big"):
+            return None
+        reassembler = self.reassemblers.get(iface)
+        if reassembler is None:
+            reassembler = self.reassemblers[iface] = MmeReassembler()
+        frame = reassembler.feed(frame)
+        if frame is None:
+            return None
+
+        mm_type = frame[15] | frame[16] << 8
+        if not self.frame_filter.match_header(frame, mm_type):
+            return None
+        record = {
+            "timestamp": timestamp,
+            "iface": iface,
+            "src": format_mac(frame[6:12]),
+            "dst": format_mac(frame[0:6]),
+            "mmv": frame[14],
+            "mm_type": mm_type,
+            "name": mm_type_name(mm_type),
+            "message": None,
+        }
+
+        shape = SNIFFER_SHAPES.get(mm_type)
+        message = None
+        if shape is not None:
+            try:
+                if not self.frame_validator.validate(frame):
+                    raise ValueError("Malformed frame")
+                message = shape.message_cls.from_bytes(frame)
+            except (ValueError, IndexError) as e:
+                self.frames_malformed += 1
+                record["error"] = str(e)
+        if not self.frame_filter.match_message(message):
+            return None
+        if message is not None:
+            record["message"] = message_fields(message)
+        return record
+
+    def format_record(self, record: dict) -> str:
+        if self.json_output:
+            return json.dumps(record, separators=(",", ":"))
+        line = (
+            f"{record['timestamp']:.6f} {record['iface']} {record['src']} > "
+            f"{record['dst']} {record['name']}"
+        )
+        if record["message"] is not None:
+            line += "".join(
+                f" {name}={value}" for name, value in record["message"].items()
+            )
+        if "error" in record:
+            line += f" error={record['error']!r}"
+        return line
+
+    def process_batch(self, frames: Iterable[Tuple[float, str, bytes]]) -> int:
+        """
+        Decodes a batch of frames and writes the resulting lines to the output
+        with a single write.
+
+        :param frames: iterable of (timestamp, interface, frame)
+        :return: number of lines written
+        """
+        lines = []
+        for timestamp, iface, frame in frames:
+            self.frames_rcvd += 1
+            record = self.decode(frame, iface, timestamp)
+            if record is not None:
+                lines.append(self.format_record(record))
+        if lines:
+            self.output.write("\n".join(lines) + "\n")
+            self.output.flush()
+        self.frames_printed += len(lines)
+        return len(lines)
+
+    def sniff_interfaces(
+        self, ifaces: List[str], batch_size: int = SNIFFER_BATCH_SIZE
+    ) -> None:
+        """Captures and decodes the frames of the interfaces, until interrupted"""
+        selector = selectors.DefaultSelector()
+        sockets = []
+        try:
+            for iface in ifaces:
+                s = create_socket(iface)
+                sockets.append(s)
+                try:
+                    s.setsockopt(SOL_SOCKET, SO_RCVBUF, SNIFFER_RCVBUF_SIZE)
+                except OSError:
+                    pass
+                selector.register(s, selectors.EVENT_READ, iface)
+            while True:
+                batch = []
+                for key, _ in selector.select():
+                    s, iface = key.fileobj, key.data
+                    for _ in range(batch_size):
+                        try:
+                            frame = s.recv(ETH_FRAME_MAX_SIZE)
+                        except BlockingIOError:
+                            break
+                        batch.append((time.time(), iface, frame))
+                self.process_batch(batch)
+        finally:
+            selector.close()
+            for s in sockets:
+                s.close()
+
+    def read_pcap(
+        self, pcap_file: BinaryIO, batch_size: int = SNIFFER_BATCH_SIZE
+    ) -> None:
+        """Decodes all the frames of a pcap file"""
+        frames = ((ts, "pcap", frame) for ts, frame in read_pcap(pcap_file))
+        while True:
+            batch = list(islice(frames, batch_size))
+            if not batch:
+                return
+            self.process_batch(batch)
+
+
+def read_pcap(pcap_file: BinaryIO) -> Iterator[Tuple[float, bytes]]:
+    """
+    Reads the frames of a pcap file (pcapng is not supported), whose link
+    type must be Ethernet
+
+    :return: iterator of (timestamp, frame)
+    """
+    header = pcap_file.read(24)
+    if len(header) < 24:
+        raise ValueError("File is not in pcap format")
+    for endianness in "<>":
+        magic = struct.unpack(endianness + "I", header[:4])[0]
+        if magic in PCAP_MAGIC:
+            resolution = PCAP_MAGIC[magic]
+            break
+    else:
+        raise ValueError("File is not in pcap format (pcapng is not supported)")
+    link_type = struct.unpack(endianness + "I", header[20:24])[0]
+    if link_type != PCAP_LINKTYPE_ETHERNET:
+        raise ValueError(f"Unsupported pcap link type: {link_type}")
+    record_header = struct.Struct(endianness + "IIII")
+    while True:
+        header = pcap_file.read(record_header.size)
+        if len(header) < record_header.size:
+            return
+        ts_sec, ts_frac, captured_size, _ = record_header.unpack(header)
+        frame = pcap_file.read(captured_size)
+        if len(frame) < captured_size:
+            return
+        yield ts_sec + ts_frac * resolution, frame
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="pyslac", description="Decodes HomePlug AV and SLAC frames"
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "-i",
+        "--iface",
+        action="append",
+        help="interface to capture from; can be given several times",
+    )
+    source.add_argument("-r", "--read", metavar="PCAP", help="pcap file to read")
+    parser.add_argument(
+        "-t",
+        "--mm-type",
+        action="append",
+        default=[],
+        help="MMTYPE to show, by name (CM_SLAC_PARM, CM_SLAC_PARM.CNF) or "
+        "number (0x6065); can be given several times",
+    )
+    parser.add_argument(
+        "-m",
+        "--mac",
+        action="append",
+        default=[],
+        help="source or destination MAC to show; can be given several times",
+    )
+    parser.add_argument("--run-id", help="run_id to show, in hex")
+    parser.add_argument(
+        "--json", action="store_true", help="print one JSON object per frame"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=SNIFFER_BATCH_SIZE,
+        help="max number of frames read per batch",
+    )
+    namespace = parser.parse_args(args)
+    try:
+        namespace.frame_filter = build_filter(
+            namespace.mm_type, namespace.mac, namespace.run_id
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    return namespace
+
+
+def build_filter(
+    mm_types: List[str], macs: List[str], run_id: Optional[str]
+) -> FrameFilter:
+    frame_filter = FrameFilter(macs={parse_mac(mac) for mac in macs})
+    for value in mm_types:
+        mm_type, is_base = parse_mm_type(value)
+        if is_base:
+            frame_filter.mm_type_bases.add(mm_type)
+        else:
+            frame_filter.mm_types.add(mm_type)
+    if run_id is not None:
+        frame_filter.run_id = bytes.fromhex(run_id)
+    return frame_filter
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    namespace = parse_args(args)
+    sniffer = Sniffer(frame_filter=namespace.frame_filter, json_output=namespace.json)
+    try:
+        if namespace.read:
+            with open(namespace.read, "rb") as pcap_file:
+                sniffer.read_pcap(pcap_file, namespace.batch_size)
+        else:
+            sniffer.sniff_interfaces(namespace.iface, namespace.batch_size)
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        # The output was closed, e.g. when piped to `head`. Redirect stdout to
+        # devnull, so that the flush done at exit does not fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except (OSError, ValueError) as e:
+        print(f"pyslac: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
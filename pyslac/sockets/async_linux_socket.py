@@ -16,7 +16,8 @@ from socket import (
 from struct import pack
 from typing import Optional
 
-from pyslac.enums import BUFF_MAX_SIZE, Timers
+from pyslac.clock import now_ms
+from pyslac.enums import ETH_FRAME_MAX_SIZE, Timers
 from pyslac.sockets.enums import (
     BPF_ABS,
     BPF_H,
@@ -29,9 +30,8 @@ from pyslac.sockets.enums import (
     ETH_P_HPAV,
     SO_ATTACH_FILTER,
 )
-from pyslac.utils import time_now_ms
+from pyslac.sockets.loopback import LoopbackSocket
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger("async_linux_socket")
 
 
@@ -124,7 +124,15 @@ def create_socket(iface: str, port=0) -> socket:
 async def sendeth(
     frame_to_send: bytes, iface: Optional[str] = None, port: int = 0, s: socket = None
 ):
-    """Send raw Ethernet packet on interface."""
+    """
+    Send raw Ethernet packet on interface, or to the LoopbackNetwork of `s`
+    if it is a LoopbackSocket
+    """
+    padding_bytes = b"\x00" * (60 - len(frame_to_send))
+    frame_to_send = frame_to_send + padding_bytes
+    if isinstance(s, LoopbackSocket):
+        return s.send(frame_to_send)
+
     loop = asyncio.get_event_loop()
 
     if not iface:
@@ -133,9 +141,6 @@ async def sendeth(
     if not s or not isinstance(s, socket):
         s = create_socket(iface, port)
 
-    padding_bytes = b"\x00" * (60 - len(frame_to_send))
-    frame_to_send = frame_to_send + padding_bytes
-
     return await loop.sock_sendall(s, frame_to_send)
 
 
@@ -155,11 +160,15 @@ async def readeth(
     s: socket = None,
     iface: str = None,
     port: int = 0,
-    rcv_frame_size: int = BUFF_MAX_SIZE,
-    time_start: int = time_now_ms(),
+    rcv_frame_size: int = ETH_FRAME_MAX_SIZE,
+    time_start: Optional[int] = None,
 ) -> bytes:
+    if isinstance(s, LoopbackSocket):
+        return await s.recv()
 
     loop = asyncio.get_event_loop()
+    if time_start is None:
+        time_start = now_ms()
 
     if not iface:
         iface = gethostbyname(gethostname())
@@ -173,8 +182,8 @@ async def readeth(
     # NOTE: awaiting for the exact number of bytes expected will just be done,
     # if the rcv frame size is a number below the max ETH PDU possible
     bytes_left = rcv_frame_size - len(bytes_rcvd)
-    if bytes_left > 0 and rcv_frame_size < BUFF_MAX_SIZE:
-        time_elapsed = time_now_ms() - time_start
+    if bytes_left > 0 and rcv_frame_size < ETH_FRAME_MAX_SIZE:
+        time_elapsed = now_ms() - time_start
         if time_elapsed > Timers.SLAC_INIT_TIMEOUT * 1000:  # in ms
             raise asyncio.TimeoutError
         bytes_rcvd = bytes_rcvd + await readeth(s=s, iface=iface, time_start=time_start)
@@ -185,7 +194,7 @@ async def send_recv_eth(
     frame_to_send: bytes,
     s: socket = None,
     iface: str = None,
-    rcv_frame_size: int = BUFF_MAX_SIZE,
+    rcv_frame_size: int = ETH_FRAME_MAX_SIZE,
 ):
     # pylint: disable=lost-exception
     data_rcvd = None
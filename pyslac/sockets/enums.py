@@ -44,3 +44,8 @@ SIOCSIFFLAGS = 0x8914
 
 class ifreq(ctypes.Structure):
     _fields_ = [("ifr_ifrn", ctypes.c_char * 16), ("ifr_flags", ctypes.c_short)]
+
+
+# Attenuation, in dB, of every carrier group of the links of a LoopbackNetwork,
+# unless another one is given
+LOOPBACK_ATTENUATION = 20
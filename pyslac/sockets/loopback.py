@@ -0,0 +1,224 @@
+"""
+In-process loopback transport
+
+Frames sent through a LoopbackSocket are handed, without going through the
+network stack, to the other sockets attached to the same LoopbackNetwork.
+This allows to run many simulated EVs (check pyslac.ev_session) against EVSE
+sessions in one process, without root privileges nor PLC nodes.
+
+The network emulates, as far as SLAC is concerned, the PLC medium and the PLC
+nodes of the EVSEs:
+* frames only travel between hosts that are linked (check
+  LoopbackNetwork.link); broadcast frames reach every host linked to the
+  sender and unicast ones the linked host with the destination MAC
+* each CM_MNBC_SOUND.IND received by an EVSE host is followed by the
+  CM_ATTEN_PROFILE.IND its PLC node would send, with the attenuation of the link
+* the MMEs sent by an EVSE host to its PLC node (CM_SET_KEY.REQ, VS_NW_INFO.REQ
+  and LINK_STATUS.REQ) are answered by the network
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from pyslac.enums import (
+    BROADCAST_ADDR,
+    CM_ATTEN_PROFILE,
+    CM_MNBC_SOUND,
+    CM_SET_CCO_CAPAB,
+    CM_SET_KEY,
+    CM_SET_KEY_MY_NONCE,
+    CM_SET_KEY_PID,
+    CM_SET_KEY_PMN,
+    CM_SET_KEY_PRN,
+    CM_SET_KEY_YOUR_NONCE,
+    EVSE_PLC_MAC,
+    LINK_STATUS,
+    LINK_STATUS_CONNECTED,
+    LINK_STATUS_DISCONNECTED,
+    MMTYPE_CNF,
+    MMTYPE_IND,
+    MMTYPE_REQ,
+    SLAC_GROUPS,
+    VS_MSTATUS_SUCCESS,
+    VS_NW_INFO,
+)
+from pyslac.layer_2_headers import (
+    EthernetHeader,
+    HomePlugHeader,
+    HomePlugVendorHeader,
+)
+from pyslac.messages import AttenProfile, SetKeyCnf
+from pyslac.sockets.enums import LOOPBACK_ATTENUATION
+from pyslac.vendor_messages import LinkStatusCnf, NetworkInfo, VsNwInfoCnf
+
+logger = logging.getLogger("loopback_socket")
+
+# Position of the NID within CM_SET_KEY.REQ
+SET_KEY_NID_OFFSET = 33
+
+
+class LoopbackSocket:
+    """
+    Host attached to a LoopbackNetwork. It is used in place of the raw socket
+    by sendeth and readeth
+    """
+
+    def __init__(self, network: "LoopbackNetwork", mac: bytes, plc_node: bool):
+        self.network = network
+        self.mac = mac
+        # If set, the network answers the MMEs sent to the PLC node of the
+        # host, as the PLC node of an EVSE would
+        self.plc_node = plc_node
+        # NID set in the PLC node of the host by the last CM_SET_KEY.REQ
+        self.nid = b""
+        self._frames: "asyncio.Queue[bytes]" = asyncio.Queue()
+
+    def send(self, frame: bytes) -> int:
+        self.network.deliver(self, frame)
+        return len(frame)
+
+    async def recv(self) -> bytes:
+        return await self._frames.get()
+
+    def put(self, frame: bytes) -> None:
+        self._frames.put_nowait(frame)
+
+    def flush(self) -> None:
+        """Drops the frames received but not read yet"""
+        while not self._frames.empty():
+            self._frames.get_nowait()
+
+    def close(self) -> None:
+        self.network.detach(self.mac)
+
+
+class LoopbackNetwork:
+    """In-process PLC medium shared by the EV and EVSE hosts attached to it"""
+
+    def __init__(self):
+        self._sockets: Dict[bytes, LoopbackSocket] = {}
+        # Attenuation, in dB, of the links of each host, by MAC of the other
+        # end of the link
+        self._links: Dict[bytes, Dict[bytes, int]] = defaultdict(dict)
+        # CM_ATTEN_PROFILE.IND frames, by (PEV MAC, EVSE MAC)
+        self._profiles: Dict[Tuple[bytes, bytes], bytes] = {}
+
+    def attach(self, mac: bytes, plc_node: bool = False) -> LoopbackSocket:
+        """
+        :param mac: MAC of the host
+        :param plc_node: True for EVSE hosts, whose PLC node is emulated
+        """
+        loopback_socket = LoopbackSocket(self, mac, plc_node)
+        self._sockets[mac] = loopback_socket
+        return loopback_socket
+
+    def detach(self, mac: bytes) -> None:
+        self._sockets.pop(mac, None)
+
+    def link(
+        self, mac: bytes, other_mac: bytes, attenuation: int = LOOPBACK_ATTENUATION
+    ):
+        """
+        Links two hosts, e.g. plugs an EV into an EVSE or, with a higher
+        attenuation, lets an EVSE hear an EV plugged into a neighbour one
+        (crosstalk)
+
+        :param attenuation: attenuation of every carrier group, in dB
+        """
+        self._links[mac][other_mac] = attenuation
+        self._links[other_mac][mac] = attenuation
+        self._profiles.pop((mac, other_mac), None)
+        self._profiles.pop((other_mac, mac), None)
+
+    def unlink(self, mac: bytes, other_mac: bytes) -> None:
+        self._links[mac].pop(other_mac, None)
+        self._links[other_mac].pop(mac, None)
+
+    def deliver(self, sender: LoopbackSocket, frame: bytes) -> None:
+        dst_mac = frame[:6]
+        if sender.plc_node and dst_mac == EVSE_PLC_MAC:
+            self._answer_plc_node_mme(sender, frame)
+            return
+        if dst_mac == BROADCAST_ADDR:
+            receivers = self._links[sender.mac]
+        elif dst_mac in self._links[sender.mac]:
+            receivers = (dst_mac,)
+        else:
+            logger.debug("Frame to %s dropped, no link", dst_mac.hex())
+            return
+        is_sound = frame[15] | frame[16] << 8 == CM_MNBC_SOUND | MMTYPE_IND
+        for mac in receivers:
+            receiver = self._sockets.get(mac)
+            if receiver is None:
+                continue
+            receiver.put(frame)
+            if is_sound and receiver.plc_node:
+                receiver.put(self._atten_profile(sender.mac, mac))
+
+    def _atten_profile(self, pev_mac: bytes, evse_mac: bytes) -> bytes:
+        frame = self._profiles.get((pev_mac, evse_mac))
+        if frame is None:
+            attenuation = self._links[evse_mac][pev_mac]
+            frame = (
+                EthernetHeader(dst_mac=evse_mac, src_mac=EVSE_PLC_MAC).pack_big()
+                + HomePlugHeader(CM_ATTEN_PROFILE | MMTYPE_IND).pack_big()
+                + AttenProfile(
+                    pev_mac=pev_mac, aag=[attenuation] * SLAC_GROUPS
+                ).pack_big()
+            )
+            self._profiles[(pev_mac, evse_mac)] = frame
+        return frame
+
+    def _answer_plc_node_mme(self, host: LoopbackSocket, frame: bytes) -> None:
+        mm_type = frame[15] | frame[16] << 8
+        response: Optional[bytes] = None
+        if mm_type == CM_SET_KEY | MMTYPE_REQ:
+            host.nid = frame[SET_KEY_NID_OFFSET : SET_KEY_NID_OFFSET + 7]
+            response = (
+                HomePlugHeader(CM_SET_KEY | MMTYPE_CNF).pack_big()
+                + SetKeyCnf(
+                    result=0x00,
+                    my_nonce=CM_SET_KEY_MY_NONCE,
+                    your_nonce=CM_SET_KEY_YOUR_NONCE,
+                    pid=CM_SET_KEY_PID,
+                    prn=CM_SET_KEY_PRN,
+                    pmn=CM_SET_KEY_PMN,
+                    cco_capab=CM_SET_CCO_CAPAB,
+                ).pack_big()
+            )
+        elif mm_type == VS_NW_INFO | MMTYPE_REQ:
+            networks = ()
+            if host.nid:
+                networks = (
+                    NetworkInfo(
+                        nid=host.nid,
+                        snid=0x01,
+                        tei=0x01,
+                        role=0x02,
+                        cco_mac=EVSE_PLC_MAC,
+                        cco_tei=0x01,
+                    ),
+                )
+            response = (
+                HomePlugVendorHeader(VS_NW_INFO | MMTYPE_CNF).pack_big()
+                + VsNwInfoCnf(networks=networks).pack_big()
+            )
+        elif mm_type == LINK_STATUS | MMTYPE_REQ:
+            # The link is up while the EVSE is linked to any EV
+            link_status = (
+                LINK_STATUS_CONNECTED
+                if self._links[host.mac]
+                else LINK_STATUS_DISCONNECTED
+            )
+            response = (
+                HomePlugVendorHeader(LINK_STATUS | MMTYPE_CNF).pack_big()
+                + LinkStatusCnf(
+                    status=VS_MSTATUS_SUCCESS, link_status=link_status
+                ).pack_big()
+            )
+        if response is None:
+            logger.debug("MME %#06x to the PLC node ignored", mm_type)
+            return
+        ether_header = EthernetHeader(dst_mac=host.mac, src_mac=EVSE_PLC_MAC)
+        host.put(ether_header.pack_big() + response)
@@ -0,0 +1,139 @@
+"""
+On-disk state of the EVSE sessions, for a warm restart
+
+When the process restarts (deploy, crash), the PLC node of an EVSE still holds
+the last NMK and NID set. If that key was never sent to an EV, there is no
+need to set a new one, which takes a CM_SET_KEY and the settle time of the PLC
+node: the session reuses it once a single VS_NW_INFO.REQ confirms that the PLC
+node is still member of that network (check
+SlacEvseSession.evse_restore_key).
+
+SessionStateStore keeps, per EVSE, a small JSON file with the key and the MACs
+of the host and of its PLC node. The file is only written when the key is set
+or sent to an EV, by a single writer thread, so that the disk I/O never blocks
+the event loop. It is replaced atomically, so a crash never leaves it half
+written, and is only readable by its owner, as it holds the NMK.
+"""
+import json
+import logging
+import os
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from time import time
+from typing import Optional
+
+logger = logging.getLogger("state_store")
+
+# Writes the state files of all the stores, in the order they were requested
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state_store")
+
+
+@dataclass
+class PersistedSession:
+    """
+    :param nmk_sent: True once the NMK was sent to an EV, in
+    CM_SLAC_MATCH.CNF; such a key must not be reused
+    :param saved_at: time, in seconds since the epoch, of the last change
+    """
+
+    evse_id: str
+    evse_mac: bytes
+    plc_node_mac: bytes
+    nmk: bytes
+    nid: bytes
+    nmk_sent: bool = False
+    saved_at: float = 0.0
+
+    def to_json(self) -> str:
+        record = asdict(self)
+        for name in ("evse_mac", "plc_node_mac", "nmk", "nid"):
+            record[name] = record[name].hex()
+        return json.dumps(record)
+
+    @classmethod
+    def from_json(cls, text: str) -> "PersistedSession":
+        """:raises ValueError: if the text is not a valid record"""
+        try:
+            record = json.loads(text)
+            for name in ("evse_mac", "plc_node_mac", "nmk", "nid"):
+                record[name] = bytes.fromhex(record[name])
+            return cls(**record)
+        except (TypeError, KeyError, AttributeError) as e:
+            raise ValueError(f"Invalid session state: {e!r}") from e
+
+
+class SessionStateStore:
+    """State file of one EVSE, within the state directory given"""
+
+    def __init__(self, directory: str, evse_id: str):
+        self.directory = directory
+        self.evse_id = evse_id
+        # EVSE IDs, like DE*12*122333, may have characters not allowed in a
+        # file name
+        file_name = re.sub(r"[^A-Za-z0-9._-]", "_", evse_id)
+        self.path = os.path.join(directory, f"{file_name}.json")
+
+    def load(self) -> Optional[PersistedSession]:
+        """
+        :return: the state saved, or None if there is none or it can not be
+        used, e.g. it is corrupted or belongs to another EVSE
+        """
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                saved = PersistedSession.from_json(file.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Session state %s ignored: %s", self.path, e)
+            return None
+        if saved.evse_id != self.evse_id:
+            logger.warning(
+                "Session state %s belongs to EVSE %s", self.path, saved.evse_id
+            )
+            return None
+        return saved
+
+    def save(self, session_state: PersistedSession) -> None:
+        """
+        Writes the state to a temporary file, which then replaces the
+        previous one
+
+        :raises OSError: if the state could not be written
+        """
+        session_state.saved_at = time()
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(session_state.to_json())
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def save_nowait(self, session_state: PersistedSession) -> "Future[None]":
+        """
+        Same as save, but the state is written by the writer thread; an error
+        is logged instead of raised
+
+        :return: the future of the write
+        """
+        write = _writer.submit(self.save, session_state)
+        write.add_done_callback(self._log_error)
+        return write
+
+    def _log_error(self, write: "Future[None]") -> None:
+        error = write.exception()
+        if error is not None:
+            # The session does not depend on the state saved
+            logger.error("Session state %s not saved: %s", self.path, error)
+
+    def clear(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
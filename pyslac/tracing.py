@@ -0,0 +1,206 @@
+"""
+Tracing of the matching processes
+
+Each matching attempt is a trace, whose root span carries the EVSE ID and
+the run_id, with a child span per SLAC phase (state of the state machine) and
+per frame exchange (request received -> response sent). Finished spans are
+handed to an exporter; JsonLinesExporter, which appends one JSON object per
+span to a file, is the default one. A matching cancelled (e.g. the EV was
+unplugged) still ends its spans, with the status "cancelled".
+
+When tracing is disabled, NOOP_TRACER is used: it returns a shared span that
+ignores everything, so the instrumentation costs a few attribute lookups.
+"""
+import asyncio
+import json
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import urandom
+from time import perf_counter, time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("tracing")
+
+# Writes the spans of all the exporters, in the order they were ended
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tracing")
+
+
+class Span:
+    """
+    Operation of a trace. Times are seconds since the epoch
+
+    :param trace_id: ID, in hex, of the trace the span belongs to
+    :param parent_id: ID of the parent span, None for the root span
+    """
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_time",
+        "end_time",
+        "attributes",
+        "status",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        start_time: float,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_time = start_time
+        self.end_time: Optional[float] = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        if isinstance(error, asyncio.CancelledError):
+            self.status = "cancelled"
+        else:
+            self.status = "error"
+        self.attributes["error"] = repr(error)
+
+    def end(self, end_time: Optional[float] = None) -> None:
+        """Ends the span and exports it. Further calls are ignored"""
+        if self.end_time is not None:
+            return
+        self.end_time = time() if end_time is None else end_time
+        self.tracer.exporter.export(self)
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": (self.end_time - self.start_time) * 1000,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class JsonLinesExporter:
+    """
+    Appends each finished span, as a JSON object, to a file. The span is
+    serialized right away, but written by a writer thread, so that the file
+    I/O does not block the event loop
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.closed = False
+        self._file = open(path, "a", buffering=1)
+
+    def export(self, span: Span) -> None:
+        if self.closed:
+            # Span of a matching that was in progress when the tracing was
+            # reconfigured
+            return
+        _writer.submit(
+            self._write, span.name, json.dumps(span.as_dict(), default=str) + "\n"
+        )
+
+    def _write(self, name: str, line: str) -> None:
+        try:
+            self._file.write(line)
+        except (OSError, ValueError) as e:
+            logger.warning("Span %s could not be exported: %s", name, e)
+
+    def close(self) -> "Future[None]":
+        """
+        Closes the file, once the spans exported so far are written
+
+        :return: the future of the close
+        """
+        self.closed = True
+        return _writer.submit(self._file.close)
+
+
+class Tracer:
+    """
+    Creates the spans of the matching processes
+
+    :param exporter: any object with an `export(span)` method and,
+    optionally, a `close()` one
+    """
+
+    enabled = True
+
+    def __init__(self, exporter):
+        self.exporter = exporter
+
+    def close(self) -> None:
+        """Closes the exporter; the spans ended afterwards are dropped"""
+        close = getattr(self.exporter, "close", None)
+        if close is not None:
+            close()
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+        start_perf_counter: Optional[float] = None,
+    ) -> Span:
+        """
+        Starts a span, child of `parent` or, without parent, the root span of
+        a new trace
+
+        :param start_perf_counter: perf_counter() value when the operation
+        started, if it was before the call
+        """
+        start_time = time()
+        if start_perf_counter is not None:
+            start_time -= perf_counter() - start_perf_counter
+        if parent is None or parent is NOOP_SPAN:
+            return Span(self, name, urandom(16).hex(), None, start_time, attributes)
+        return Span(self, name, parent.trace_id, parent.span_id, start_time, attributes)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, error: BaseException) -> None:
+        pass
+
+    def end(self, end_time: Optional[float] = None) -> None:
+        pass
+
+
+class _NoopTracer:
+    enabled = False
+
+    def close(self) -> None:
+        pass
+
+    def start_span(
+        self,
+        name: str,
+        parent=None,
+        attributes: Optional[Dict[str, Any]] = None,
+        start_perf_counter: Optional[float] = None,
+    ) -> _NoopSpan:
+        return NOOP_SPAN
+
+
+NOOP_SPAN = _NoopSpan()
+NOOP_TRACER = _NoopTracer()
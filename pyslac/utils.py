@@ -7,9 +7,8 @@ from fcntl import ioctl
 from hashlib import sha256
 from math import copysign
 from sys import platform
-from typing import Coroutine, List
+from typing import Coroutine, List, Optional, Union
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger("slac_utils")
 
 # commands
@@ -154,11 +153,25 @@ def get_if_raw_hwaddr_linux(iff: str, siocgifhwaddr: int = SIOCGIFHWADDR):
     return struct.unpack("16xh6s8x", raw_addr)
 
 
+# Interval, in seconds, after which cancel_task cancels again a task that is
+# not done yet
+CANCEL_RETRY_INTERVAL = 0.1
+
+
 async def cancel_task(task):
-    """Cancel the task safely"""
+    """
+    Cancel the task safely.
+    Before Python 3.12, asyncio.wait_for drops the cancellation if the
+    awaitable completes in the same iteration of the loop (bpo-42130), so the
+    task, e.g. a link monitoring polling its PLC node, would go on; thus, it is
+    cancelled again until it is done
+    """
     task.cancel()
+    while not task.done():
+        await asyncio.wait({task}, timeout=CANCEL_RETRY_INTERVAL)
+        task.cancel()
     try:
-        await task
+        task.result()
     except asyncio.CancelledError:
         pass
 
@@ -176,7 +189,7 @@ def task_callback(task: asyncio.Task):
     except asyncio.CancelledError:
         pass  # Task cancellation should not be logged as an error.
     except Exception as e:
-        logger.error(f"Exception raised by task: {task.get_name()}", e)
+        logger.error("Exception raised by task: %s", task.get_name(), exc_info=e)
 
 
 async def wait_for_tasks(
@@ -214,3 +227,41 @@ async def wait_for_tasks(
             task.result()
         except Exception as e:
             logger.exception(e)
+
+
+def setup_logging(
+    level: Union[int, str] = logging.INFO,
+    handler: Optional[logging.Handler] = None,
+) -> "logging.handlers.QueueListener":
+    """
+    Configures the root logger to hand the log records to a queue, whose
+    records are formatted and written by `handler` (a StreamHandler by
+    default) in a separate thread, so that no log I/O happens in the event
+    loop. pyslac modules never configure logging themselves, this is meant
+    to be called once by the application.
+
+    :param level: level of the root logger, e.g. the LOG_LEVEL of Config
+    :param handler: handler doing the actual I/O
+    :return: the listener started, which shall be stopped on exit to flush
+    the records still in the queue
+    """
+    # Only needed by the application, so not imported with pyslac
+    import logging.handlers
+    import queue
+
+    if handler is None:
+        handler = logging.StreamHandler()
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    for old_handler in root_logger.handlers[:]:
+        root_logger.removeHandler(old_handler)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    root_logger.setLevel(level)
+    listener = logging.handlers.QueueListener(
+        log_queue, handler, respect_handler_level=True
+    )
+    listener.start()
+    return listener
@@ -0,0 +1,501 @@
+"""
+Qualcomm Atheros Vendor Specific MMEs
+
+These MMEs are exchanged between the host and its own PLC chip and are used,
+for example, to check if the chip is alive, to which logical networks (AVLN)
+it belongs or if the link to other stations is up.
+
+All of them use the HomePlugVendorHeader (MMV = 0x00, no fragmentation fields)
+and their payload starts with the Qualcomm OUI. As a consequence, in the
+from_bytes methods the OUI is found at bytes 17 to 20 and the fields of the
+message start at byte 20.
+
+The layout of the messages follows the one used by the Qualcomm Open PLC
+utils: https://github.com/qca/open-plc-utils
+"""
+from typing import Tuple
+
+from pyslac.codec import slotted_dataclass
+from pyslac.enums import (
+    LINK_STATUS_CONNECTED,
+    QUALCOMM_OUI,
+    VS_MSTATUS_SUCCESS,
+    VS_SW_VER_VERSION_SIZE,
+)
+
+# Size in bytes of each network and station entry of VS_NW_INFO.CNF
+NETWORK_INFO_SIZE = 18
+STATION_INFO_SIZE = 15
+
+
+@slotted_dataclass
+class VsSwVerReq:
+    """
+    Associated with VS_SW_VER.REQ, used to request the firmware version of the
+    PLC chip. It is also a cheap way of checking if the chip is responsive.
+
+    Host -> PLC Node
+
+    This payload is defined as follows:
+    |OUI|Cookie|
+
+    OUI [3 bytes] = 0x00B052: Qualcomm OUI
+    Cookie [4 bytes]: Value echoed by the PLC Node in the confirmation (only
+                      by the more recent chips)
+
+    Message size is = 7 bytes
+    """
+
+    cookie: int = 0x00
+    oui: bytes = QUALCOMM_OUI
+
+    def __bytes__(self, endianess: str = "big"):
+        frame = bytearray(self.oui + self.cookie.to_bytes(4, "little"))
+        if endianess == "big":
+            return frame
+        frame.reverse()
+        return frame
+
+    def pack_big(self):
+        return self.__bytes__()
+
+    def pack_little(self):
+        return self.__bytes__("little")
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "VsSwVerReq":
+        return cls(oui=payload[17:20], cookie=int.from_bytes(payload[20:24], "little"))
+
+
+@slotted_dataclass
+class VsSwVerCnf:
+    """
+    Associated with VS_SW_VER.CNF
+
+    PLC Node -> Host
+
+    This payload is defined as follows:
+    |OUI|MStatus|DeviceID|VersionLength|Version|Upgradeable|Cookie|
+
+    OUI [3 bytes] = 0x00B052: Qualcomm OUI
+    MStatus [1 byte]: 0x00 - Success
+    DeviceID [1 byte]: Chipset identifier (e.g. 0x21 for QCA7000)
+    VersionLength [1 byte]: Number of bytes used by the version string
+    Version [128 bytes]: Firmware version string, padded with 0x00
+    Upgradeable [1 byte]: 0x00 - Not upgradeable
+    Cookie [4 bytes]: Cookie sent in VS_SW_VER.REQ
+
+    Upgradeable and Cookie are not sent by older chips; in that case they are
+    decoded as 0x00
+
+    Message size is = 139 bytes
+    """
+
+    status: int
+    device_id: int
+    version: str
+    upgradeable: int = 0x00
+    cookie: int = 0x00
+    oui: bytes = QUALCOMM_OUI
+
+    @property
+    def is_success(self) -> bool:
+        return self.status == VS_MSTATUS_SUCCESS
+
+    def __bytes__(self, endianess: str = "big"):
+        version = self.version.encode("ascii")
+        frame = bytearray(
+            self.oui
+            + self.status.to_bytes(1, "big")
+            + self.device_id.to_bytes(1, "big")
+            + len(version).to_bytes(1, "big")
+            + version.ljust(VS_SW_VER_VERSION_SIZE, b"\x00")
+            + self.upgradeable.to_bytes(1, "big")
+            + self.cookie.to_bytes(4, "little")
+        )
+        if endianess == "big":
+            return frame
+        frame.reverse()
+        return frame
+
+    def pack_big(self):
+        return self.__bytes__()
+
+    def pack_little(self):
+        return self.__bytes__("little")
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "VsSwVerCnf":
+        version_length = min(payload[22], VS_SW_VER_VERSION_SIZE)
+        upgradeable_offset = 23 + VS_SW_VER_VERSION_SIZE
+        return cls(
+            oui=payload[17:20],
+            status=payload[20],
+            device_id=payload[21],
+            version=bytes(payload[23 : 23 + version_length])
+            .rstrip(b"\x00")
+            .decode("ascii", errors="replace"),
+            upgradeable=(
+                payload[upgradeable_offset]
+                if len(payload) > upgradeable_offset
+                else 0x00
+            ),
+            cookie=int.from_bytes(
+                payload[upgradeable_offset + 1 : upgradeable_offset + 5], "little"
+            ),
+        )
+
+
+@slotted_dataclass
+class VsResetReq:
+    """
+    Associated with VS_RESET.REQ, used to reset the PLC chip
+
+    Host -> PLC Node
+
+    This payload is defined as follows:
+    |OUI|
+
+    OUI [3 bytes] = 0x00B052: Qualcomm OUI
+
+    Message size is = 3 bytes
+    """
+
+    oui: bytes = QUALCOMM_OUI
+
+    def __bytes__(self, endianess: str = "big"):
+        frame = bytearray(self.oui)
+        if endianess == "big":
+            return frame
+        frame.reverse()
+        return frame
+
+    def pack_big(self):
+        return self.__bytes__()
+
+    def pack_little(self):
+        return self.__bytes__("little")
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "VsResetReq":
+        return cls(oui=payload[17:20])
+
+
+@slotted_dataclass
+class VsResetCnf:
+    """
+    Associated with VS_RESET.CNF, sent by the PLC chip before resetting
+
+    PLC Node -> Host
+
+    This payload is defined as follows:
+    |OUI|MStatus|
+
+    OUI [3 bytes] = 0x00B052: Qualcomm OUI
+    MStatus [1 byte]: 0x00 - Success
+
+    Message size is = 4 bytes
+    """
+
+    status: int
+    oui: bytes = QUALCOMM_OUI
+
+    @property
+    def is_success(self) -> bool:
+        return self.status == VS_MSTATUS_SUCCESS
+
+    def __bytes__(self, endianess: str = "big"):
+        frame = bytearray(self.oui + self.status.to_bytes(1, "big"))
+        if endianess == "big":
+            return frame
+        frame.reverse()
+        return frame
+
+    def pack_big(self):
+        return self.__bytes__()
+
+    def pack_little(self):
+        return self.__bytes__("little")
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "VsResetCnf":
+        return cls(oui=payload[17:20], status=payload[20])
+
+
+@slotted_dataclass
+class VsNwInfoReq:
+    """
+    Associated with VS_NW_INFO.REQ, used to request the logical networks (AVLN)
+    the PLC chip is member of and the stations of each one of them
+
+    Host -> PLC Node
+
+    This payload is defined as follows:
+    |OUI|
+
+    OUI [3 bytes] = 0x00B052: Qualcomm OUI
+
+    Message size is = 3 bytes
+    """
+
+    oui: bytes = QUALCOMM_OUI
+
+    def __bytes__(self, endianess: str = "big"):
+        frame = bytearray(self.oui)
+        if endianess == "big":
+            return frame
+        frame.reverse()
+        return frame
+
+    def pack_big(self):
+        return self.__bytes__()
+
+    def pack_little(self):
+        return self.__bytes__("little")
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "VsNwInfoReq":
+        return cls(oui=payload[17:20])
+
+
+@slotted_dataclass
+class StationInfo:
+    """
+    Station entry of a network in VS_NW_INFO.CNF
+
+    |MAC|TEI|BDA|AvgPhyTxRate|AvgPhyRxRate|
+
+    MAC [6 bytes]: MAC address of the station
+    TEI [1 byte]: Terminal Equipment Identifier of the station
+    BDA [6 bytes]: MAC address of the host bridged by the station
+    AvgPhyTxRate [1 byte]: Average PHY Tx rate to the station, in Mbps
+    AvgPhyRxRate [1 byte]: Average PHY Rx rate from the station, in Mbps
+
+    Entry size is = 15 bytes
+    """
+
+    mac: bytes
+    tei: int
+    bridged_mac: bytes
+    avg_phy_tx_rate: int
+    avg_phy_rx_rate: int
+
+    def __bytes__(self):
+        return (
+            self.mac
+            + self.tei.to_bytes(1, "big")
+            + self.bridged_mac
+            + self.avg_phy_tx_rate.to_bytes(1, "big")
+            + self.avg_phy_rx_rate.to_bytes(1, "big")
+        )
+
+    @classmethod
+    def from_bytes(cls, payload: bytes, offset: int) -> "StationInfo":
+        return cls(
+            mac=payload[offset : offset + 6],
+            tei=payload[offset + 6],
+            bridged_mac=payload[offset + 7 : offset + 13],
+            avg_phy_tx_rate=payload[offset + 13],
+            avg_phy_rx_rate=payload[offset + 14],
+        )
+
+
+@slotted_dataclass
+class NetworkInfo:
+    """
+    Network (AVLN) entry of VS_NW_INFO.CNF
+
+    |NID|SNID|TEI|Role|CCoMAC|CCoTEI|NumStations|Stations...|
+
+    NID [7 bytes]: Network Identifier
+    SNID [1 byte]: Short Network Identifier
+    TEI [1 byte]: Terminal Equipment Identifier of the PLC Node in the network
+    Role [1 byte]: Role of the PLC Node: 0x00 - STA, 0x01 - Proxy, 0x02 - CCo
+    CCoMAC [6 bytes]: MAC address of the Central Coordinator
+    CCoTEI [1 byte]: Terminal Equipment Identifier of the Central Coordinator
+    NumStations [1 byte]: Number of StationInfo entries that follow
+
+    Entry size is = 18 bytes + NumStations * 15 bytes
+    """
+
+    nid: bytes
+    snid: int
+    tei: int
+    role: int
+    cco_mac: bytes
+    cco_tei: int
+    stations: Tuple[StationInfo, ...] = ()
+
+    def __bytes__(self):
+        return (
+            self.nid
+            + self.snid.to_bytes(1, "big")
+            + self.tei.to_bytes(1, "big")
+            + self.role.to_bytes(1, "big")
+            + self.cco_mac
+            + self.cco_tei.to_bytes(1, "big")
+            + len(self.stations).to_bytes(1, "big")
+            + b"".join(bytes(station) for station in self.stations)
+        )
+
+    @classmethod
+    def from_bytes(cls, payload: bytes, offset: int) -> "NetworkInfo":
+        num_stations = payload[offset + 17]
+        stations_offset = offset + NETWORK_INFO_SIZE
+        if len(payload) < stations_offset + num_stations * STATION_INFO_SIZE:
+            raise ValueError("VS_NW_INFO.CNF is truncated")
+        return cls(
+            nid=payload[offset : offset + 7],
+            snid=payload[offset + 7],
+            tei=payload[offset + 8],
+            role=payload[offset + 9],
+            cco_mac=payload[offset + 10 : offset + 16],
+            cco_tei=payload[offset + 16],
+            stations=tuple(
+                StationInfo.from_bytes(
+                    payload, stations_offset + station * STATION_INFO_SIZE
+                )
+                for station in range(num_stations)
+            ),
+        )
+
+
+@slotted_dataclass
+class VsNwInfoCnf:
+    """
+    Associated with VS_NW_INFO.CNF
+
+    PLC Node -> Host
+
+    This payload is defined as follows:
+    |OUI|NumNetworks|Networks...|
+
+    OUI [3 bytes] = 0x00B052: Qualcomm OUI
+    NumNetworks [1 byte]: Number of NetworkInfo entries that follow
+    Networks: NetworkInfo entries, each one followed by its StationInfo ones
+
+    Message size is = 4 bytes + size of the network entries
+    """
+
+    networks: Tuple[NetworkInfo, ...] = ()
+    oui: bytes = QUALCOMM_OUI
+
+    def has_nid(self, nid: bytes) -> bool:
+        """Checks if the PLC Node is member of the network with the NID given"""
+        return any(network.nid == nid for network in self.networks)
+
+    def __bytes__(self, endianess: str = "big"):
+        frame = bytearray(
+            self.oui
+            + len(self.networks).to_bytes(1, "big")
+            + b"".join(bytes(network) for network in self.networks)
+        )
+        if endianess == "big":
+            return frame
+        frame.reverse()
+        return frame
+
+    def pack_big(self):
+        return self.__bytes__()
+
+    def pack_little(self):
+        return self.__bytes__("little")
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "VsNwInfoCnf":
+        num_networks = payload[20]
+        networks = []
+        offset = 21
+        for _ in range(num_networks):
+            if len(payload) < offset + NETWORK_INFO_SIZE:
+                raise ValueError("VS_NW_INFO.CNF is truncated")
+            network = NetworkInfo.from_bytes(payload, offset)
+            networks.append(network)
+            offset += NETWORK_INFO_SIZE + len(network.stations) * STATION_INFO_SIZE
+        return cls(oui=payload[17:20], networks=tuple(networks))
+
+
+@slotted_dataclass
+class LinkStatusReq:
+    """
+    Associated with LINK_STATUS.REQ, used to check if the PLC chip has a link
+    with, at least, another station
+
+    Host -> PLC Node
+
+    This payload is defined as follows:
+    |OUI|
+
+    OUI [3 bytes] = 0x00B052: Qualcomm OUI
+
+    Message size is = 3 bytes
+    """
+
+    oui: bytes = QUALCOMM_OUI
+
+    def __bytes__(self, endianess: str = "big"):
+        frame = bytearray(self.oui)
+        if endianess == "big":
+            return frame
+        frame.reverse()
+        return frame
+
+    def pack_big(self):
+        return self.__bytes__()
+
+    def pack_little(self):
+        return self.__bytes__("little")
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "LinkStatusReq":
+        return cls(oui=payload[17:20])
+
+
+@slotted_dataclass
+class LinkStatusCnf:
+    """
+    Associated with LINK_STATUS.CNF
+
+    PLC Node -> Host
+
+    This payload is defined as follows:
+    |OUI|MStatus|LinkStatus|
+
+    OUI [3 bytes] = 0x00B052: Qualcomm OUI
+    MStatus [1 byte]: 0x00 - Success
+    LinkStatus [1 byte]: 0x00 - Disconnected, 0x01 - Connected
+
+    Message size is = 5 bytes
+    """
+
+    status: int
+    link_status: int
+    oui: bytes = QUALCOMM_OUI
+
+    @property
+    def is_link_active(self) -> bool:
+        return (
+            self.status == VS_MSTATUS_SUCCESS
+            and self.link_status == LINK_STATUS_CONNECTED
+        )
+
+    def __bytes__(self, endianess: str = "big"):
+        frame = bytearray(
+            self.oui
+            + self.status.to_bytes(1, "big")
+            + self.link_status.to_bytes(1, "big")
+        )
+        if endianess == "big":
+            return frame
+        frame.reverse()
+        return frame
+
+    def pack_big(self):
+        return self.__bytes__()
+
+    def pack_little(self):
+        return self.__bytes__("little")
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "LinkStatusCnf":
+        return cls(oui=payload[17:20], status=payload[20], link_status=payload[21])
@@ -0,0 +1,81 @@
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from inspect import isawaitable
+
+import pytest
+
+from pyslac import __version__
+
+ROUNDS = 5
+
+
+class BenchmarkRecorder:
+    """
+    Times the code under benchmark and collects the results, which are dumped
+    as JSON at the end of the test session, so that they can be compared
+    across releases and hardware
+    """
+
+    def __init__(self):
+        self.results = []
+
+    def record(self, name: str, **metrics):
+        self.results.append({"name": name, **metrics})
+
+    def _record_timings(self, name: str, iterations: int, timings: list):
+        best = min(timings) / iterations
+        self.record(
+            name,
+            iterations=iterations,
+            rounds=len(timings),
+            best_s=best,
+            mean_s=sum(timings) / len(timings) / iterations,
+            ops_per_s=1 / best if best else None,
+        )
+
+    def __call__(self, name: str, func, iterations: int, rounds: int = ROUNDS):
+        """Runs `func` `iterations` times per round and records the timings"""
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            timings.append(time.perf_counter() - start)
+        self._record_timings(name, iterations, timings)
+
+    async def run_async(
+        self, name: str, coro_func, iterations: int, rounds: int = ROUNDS
+    ):
+        """Same as calling the recorder, but `coro_func` returns an awaitable"""
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                result = coro_func()
+                if isawaitable(result):
+                    await result
+            timings.append(time.perf_counter() - start)
+        self._record_timings(name, iterations, timings)
+
+    def to_json(self) -> dict:
+        return {
+            "pyslac_version": __version__,
+            "python_version": platform.python_version(),
+            "implementation": sys.implementation.name,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "results": self.results,
+        }
+
+
+@pytest.fixture(scope="session")
+def bench(request):
+    recorder = BenchmarkRecorder()
+    yield recorder
+    if recorder.results:
+        with open(request.config.getoption("--benchmark-json"), "w") as json_file:
+            json.dump(recorder.to_json(), json_file, indent=2)
@@ -0,0 +1,137 @@
+import pytest
+
+from pyslac.enums import (
+    CM_ATTEN_PROFILE,
+    CM_SET_CCO_CAPAB,
+    CM_SET_KEY_MY_NONCE,
+    CM_SET_KEY_PID,
+    CM_SET_KEY_PMN,
+    CM_SET_KEY_PRN,
+    CM_SET_KEY_YOUR_NONCE,
+    MMTYPE_IND,
+    QUALCOMM_NID,
+    QUALCOMM_NMK,
+    SLAC_ATTEN_TIMEOUT,
+    SLAC_GROUPS,
+    SLAC_MSOUNDS,
+)
+from pyslac.frame_validator import FrameValidator
+from pyslac.layer_2_headers import EthernetHeader, HomePlugHeader
+from pyslac.messages import (
+    AtennChar,
+    AtennCharRsp,
+    AttenProfile,
+    MatchCnf,
+    MatchReq,
+    MnbcSound,
+    SetKeyCnf,
+    SetKeyReq,
+    SlacParmCnf,
+    SlacParmReq,
+    StartAtennChar,
+)
+from pyslac.utils import generate_nid
+
+ITERATIONS = 10_000
+PRE_PADDING = b"\x00" * 19
+PEV_MAC = b"\xBB" * 6
+EVSE_MAC = b"\xAB" * 6
+RUN_ID = b"\xFA" * 8
+
+MESSAGES = [
+    SetKeyReq(nid=QUALCOMM_NID, new_key=QUALCOMM_NMK),
+    SetKeyCnf(
+        result=0x00,
+        my_nonce=CM_SET_KEY_MY_NONCE,
+        your_nonce=CM_SET_KEY_YOUR_NONCE,
+        pid=CM_SET_KEY_PID,
+        prn=CM_SET_KEY_PRN,
+        pmn=CM_SET_KEY_PMN,
+        cco_capab=CM_SET_CCO_CAPAB,
+    ),
+    SlacParmReq(run_id=RUN_ID),
+    SlacParmCnf(forwarding_sta=PEV_MAC, run_id=RUN_ID),
+    StartAtennChar(
+        num_sounds=SLAC_MSOUNDS,
+        time_out=SLAC_ATTEN_TIMEOUT,
+        forwarding_sta=PEV_MAC,
+        run_id=RUN_ID,
+    ),
+    MnbcSound(cnt=SLAC_MSOUNDS, run_id=RUN_ID),
+    AttenProfile(pev_mac=PEV_MAC, aag=[30] * SLAC_GROUPS),
+    AtennChar(
+        source_address=PEV_MAC,
+        run_id=RUN_ID,
+        num_sounds=SLAC_MSOUNDS,
+        num_groups=SLAC_GROUPS,
+        aag=[30] * SLAC_GROUPS,
+    ),
+    AtennCharRsp(
+        source_address=PEV_MAC, run_id=RUN_ID, source_id=0x00, resp_id=0x00, result=0
+    ),
+    MatchReq(pev_mac=PEV_MAC, evse_mac=EVSE_MAC, run_id=RUN_ID),
+    MatchCnf(
+        pev_mac=PEV_MAC,
+        evse_mac=EVSE_MAC,
+        run_id=RUN_ID,
+        nid=QUALCOMM_NID,
+        nmk=QUALCOMM_NMK,
+    ),
+]
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("message", MESSAGES, ids=lambda m: type(m).__name__)
+def test_message_pack(bench, message):
+    bench(f"pack.{type(message).__name__}", message.pack_big, ITERATIONS)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    "message",
+    [message for message in MESSAGES if hasattr(message, "from_bytes")],
+    ids=lambda m: type(m).__name__,
+)
+def test_message_unpack(bench, message):
+    frame = bytes(PRE_PADDING + message.pack_big())
+    message_cls = type(message)
+    bench(
+        f"unpack.{message_cls.__name__}",
+        lambda: message_cls.from_bytes(frame),
+        ITERATIONS,
+    )
+
+
+@pytest.mark.benchmark
+def test_headers(bench):
+    ethernet_header = EthernetHeader(dst_mac=EVSE_MAC, src_mac=PEV_MAC)
+    homeplug_header = HomePlugHeader(CM_ATTEN_PROFILE | MMTYPE_IND)
+    frame = ethernet_header.pack_big() + homeplug_header.pack_big()
+
+    bench("pack.EthernetHeader", ethernet_header.pack_big, ITERATIONS)
+    bench("pack.HomePlugHeader", homeplug_header.pack_big, ITERATIONS)
+    bench("unpack.EthernetHeader", lambda: EthernetHeader.from_bytes(frame), ITERATIONS)
+    bench("unpack.HomePlugHeader", lambda: HomePlugHeader.from_bytes(frame), ITERATIONS)
+
+
+@pytest.mark.benchmark
+def test_generate_nid(bench):
+    bench("generate_nid", lambda: generate_nid(QUALCOMM_NMK), ITERATIONS)
+
+
+@pytest.mark.benchmark
+def test_frame_rejection(bench):
+    """Number of malformed frames per second rejected before decoding"""
+    frame_validator = FrameValidator()
+    frame = (
+        EthernetHeader(dst_mac=EVSE_MAC, src_mac=PEV_MAC).pack_big()
+        + HomePlugHeader(CM_ATTEN_PROFILE | MMTYPE_IND).pack_big()
+        + AttenProfile(pev_mac=PEV_MAC, aag=[30] * SLAC_GROUPS).pack_big()
+    )
+    truncated_frame = frame[:40]
+    bench(
+        "frame_validator.reject",
+        lambda: frame_validator.validate(truncated_frame),
+        ITERATIONS,
+    )
+    bench("frame_validator.accept", lambda: frame_validator.validate(frame), ITERATIONS)
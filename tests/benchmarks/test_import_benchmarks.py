@@ -0,0 +1,81 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+ROUNDS = 5
+MODULES = ["pyslac.session", "pyslac.environment", "pyslac.sniffer"]
+IMPORT_TIME = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| (\S+)")
+
+
+def import_time_us(statement: str, module: str) -> int:
+    """
+    Cumulative import time, in µs, of `module` while running `statement` in
+    a new interpreter, as reported by -X importtime. The bytecode cache is
+    written on the first run, as in a deployment
+    """
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match and match.group(2) == module:
+            return int(match.group(1))
+    raise AssertionError(f"{module} not imported")
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("module", MODULES)
+def test_import_time(bench, module):
+    timings = [import_time_us(f"import {module}", module) for _ in range(ROUNDS + 1)]
+    # The first round compiles the modules
+    timings = timings[1:]
+    bench.record(
+        f"import_{module}",
+        rounds=ROUNDS,
+        best_ms=min(timings) / 1000,
+        mean_ms=sum(timings) / len(timings) / 1000,
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("stdlib", [False, True])
+def test_config_load_time(bench, stdlib, tmp_path):
+    """Import of pyslac.environment and first load of the settings"""
+    env_path = tmp_path / ".env"
+    env_path.write_text("")
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        "from pyslac.environment import Config\n"
+        f"Config().load_envs({str(env_path)!r}, stdlib={stdlib})\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    timings = [
+        float(
+            subprocess.run(
+                [sys.executable, "-c", code],
+                check=True,
+                capture_output=True,
+                text=True,
+                env=env,
+            ).stdout
+        )
+        for _ in range(ROUNDS + 1)
+    ][1:]
+    bench.record(
+        "config_load_stdlib" if stdlib else "config_load_environs",
+        rounds=ROUNDS,
+        best_ms=min(timings) * 1000,
+        mean_ms=sum(timings) / len(timings) * 1000,
+    )
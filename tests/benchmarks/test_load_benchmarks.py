@@ -0,0 +1,24 @@
+import pytest
+
+from pyslac.load_harness import LoadHarness, LoadProfile
+
+PROFILES = {
+    "load_300_evs_100_evses_at_once": LoadProfile(num_evs=300, num_evses=100),
+    "load_500_evs_100_evses_poisson": LoadProfile(
+        num_evs=500, num_evses=100, arrival_rate=500
+    ),
+    "load_200_evs_50_evses_crosstalk": LoadProfile(
+        num_evs=200, num_evses=50, arrival_rate=400, crosstalk=True
+    ),
+}
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", PROFILES)
+async def test_load(bench, name):
+    """End-to-end matchings of simulated EVs over the loopback transport"""
+    report = await LoadHarness(PROFILES[name]).run()
+
+    bench.record(name, **report.as_dict())
+    assert report.failed == 0
@@ -0,0 +1,87 @@
+import gc
+import tracemalloc
+
+import pytest
+
+from pyslac.enums import CM_ATTEN_PROFILE, CM_MNBC_SOUND, MMTYPE_IND, SLAC_GROUPS
+from pyslac.layer_2_headers import EthernetHeader, HomePlugHeader
+from pyslac.messages import AttenProfile, MnbcSound
+
+NUM_FRAMES = 100_000
+PEV_MAC = b"\xBB" * 6
+EVSE_MAC = b"\xAB" * 6
+RUN_ID = b"\xFA" * 8
+# Upper bound of memory retained per parsed sound frame (headers + message)
+MAX_BYTES_PER_FRAME = 1024
+
+
+def build_sound_frames():
+    atten_profile_frame = (
+        EthernetHeader(dst_mac=EVSE_MAC, src_mac=PEV_MAC).pack_big()
+        + HomePlugHeader(CM_ATTEN_PROFILE | MMTYPE_IND).pack_big()
+        + AttenProfile(pev_mac=PEV_MAC, aag=[30] * SLAC_GROUPS).pack_big()
+    )
+    mnbc_sound_frame = (
+        EthernetHeader(dst_mac=EVSE_MAC, src_mac=PEV_MAC).pack_big()
+        + HomePlugHeader(CM_MNBC_SOUND | MMTYPE_IND).pack_big()
+        + MnbcSound(cnt=1, run_id=RUN_ID).pack_big()
+    )
+    # As in a real sound burst, both frames arrive alternated
+    return [
+        (AttenProfile, bytes(atten_profile_frame)),
+        (MnbcSound, bytes(mnbc_sound_frame)),
+    ]
+
+
+def parse_frames(frames, num_frames):
+    parsed = []
+    for index in range(num_frames):
+        message_cls, frame = frames[index % 2]
+        parsed.append(
+            (
+                EthernetHeader.from_bytes(frame),
+                HomePlugHeader.from_bytes(frame),
+                message_cls.from_bytes(frame),
+            )
+        )
+    return parsed
+
+
+@pytest.mark.benchmark
+def test_sound_frames_memory(bench):
+    """
+    Parses 100k sound frames, keeping all of them alive, and measures the
+    memory retained and the number of allocations done while parsing
+    """
+    frames = build_sound_frames()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        snapshot_start = tracemalloc.take_snapshot()
+        parsed = parse_frames(frames, NUM_FRAMES)
+        retained, peak = tracemalloc.get_traced_memory()
+        snapshot_end = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    allocations = sum(
+        stat.count_diff for stat in snapshot_end.compare_to(snapshot_start, "filename")
+    )
+    bytes_per_frame = retained / NUM_FRAMES
+    print(
+        f"\n{NUM_FRAMES} sound frames parsed: {retained / 1024 ** 2:.2f} MiB "
+        f"retained, {peak / 1024 ** 2:.2f} MiB peak, "
+        f"{bytes_per_frame:.0f} bytes/frame, {allocations} allocations"
+    )
+    bench.record(
+        "memory.sound_frames",
+        frames=NUM_FRAMES,
+        retained_bytes=retained,
+        peak_bytes=peak,
+        bytes_per_frame=bytes_per_frame,
+        allocations=allocations,
+    )
+    assert len(parsed) == NUM_FRAMES
+    for message in parsed[0]:
+        assert not hasattr(message, "__dict__")
+    assert bytes_per_frame < MAX_BYTES_PER_FRAME
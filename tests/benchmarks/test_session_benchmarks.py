@@ -0,0 +1,179 @@
+import logging
+import os
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from pyslac.enums import (
+    BROADCAST_ADDR,
+    CM_ATTEN_CHAR,
+    CM_ATTEN_PROFILE,
+    CM_MNBC_SOUND,
+    CM_SLAC_MATCH,
+    CM_START_ATTEN_CHAR,
+    EVSE_PLC_MAC,
+    MMTYPE_IND,
+    MMTYPE_REQ,
+    MMTYPE_RSP,
+    QUALCOMM_NID,
+    QUALCOMM_NMK,
+    SLAC_ATTEN_TIMEOUT,
+    SLAC_GROUPS,
+    SLAC_MSOUNDS,
+)
+from pyslac.layer_2_headers import EthernetHeader, HomePlugHeader
+from pyslac.messages import (
+    AtennCharRsp,
+    AttenProfile,
+    MatchReq,
+    MnbcSound,
+    StartAtennChar,
+)
+
+PEV_MAC = b"\xBB" * 6
+RUN_ID = b"\xFA" * 8
+
+
+def build_frame(dst_mac, src_mac, mm_type, message) -> bytes:
+    return (
+        EthernetHeader(dst_mac=dst_mac, src_mac=src_mac).pack_big()
+        + HomePlugHeader(mm_type).pack_big()
+        + message.pack_big()
+    )
+
+
+def build_matching_frames(evse_mac):
+    """Frames received by the EVSE during a complete and successful matching"""
+    frames = [
+        build_frame(
+            BROADCAST_ADDR,
+            PEV_MAC,
+            CM_START_ATTEN_CHAR | MMTYPE_IND,
+            StartAtennChar(
+                num_sounds=SLAC_MSOUNDS,
+                time_out=SLAC_ATTEN_TIMEOUT,
+                forwarding_sta=PEV_MAC,
+                run_id=RUN_ID,
+            ),
+        )
+    ]
+    for cnt in range(SLAC_MSOUNDS - 1, -1, -1):
+        frames.append(
+            build_frame(
+                BROADCAST_ADDR,
+                PEV_MAC,
+                CM_MNBC_SOUND | MMTYPE_IND,
+                MnbcSound(cnt=cnt, run_id=RUN_ID),
+            )
+        )
+        frames.append(
+            build_frame(
+                evse_mac,
+                EVSE_PLC_MAC,
+                CM_ATTEN_PROFILE | MMTYPE_IND,
+                AttenProfile(pev_mac=PEV_MAC, aag=[30] * SLAC_GROUPS),
+            )
+        )
+    frames.append(
+        build_frame(
+            evse_mac,
+            PEV_MAC,
+            CM_ATTEN_CHAR | MMTYPE_RSP,
+            AtennCharRsp(
+                source_address=PEV_MAC,
+                run_id=RUN_ID,
+                source_id=0x00,
+                resp_id=0x00,
+                result=0x00,
+            ),
+        )
+    )
+    frames.append(
+        build_frame(
+            evse_mac,
+            PEV_MAC,
+            CM_SLAC_MATCH | MMTYPE_REQ,
+            MatchReq(pev_mac=PEV_MAC, evse_mac=evse_mac, run_id=RUN_ID),
+        )
+    )
+    return frames
+
+
+@pytest.mark.benchmark
+def test_process_sound_frame(bench, evse_slac_session, evse_mac):
+    frames = build_matching_frames(evse_mac)[1:3]
+    parsed_frames = [
+        (HomePlugHeader.from_bytes(frame), EthernetHeader.from_bytes(frame), frame)
+        for frame in frames
+    ]
+    evse_slac_session.pev_mac = PEV_MAC
+    evse_slac_session.run_id = RUN_ID
+    aag = [0] * SLAC_GROUPS
+
+    def process_sound_frames():
+        for homeplug_frame, ether_frame, frame in parsed_frames:
+            evse_slac_session.process_sound_frame(
+                homeplug_frame, ether_frame, frame, 0, aag
+            )
+
+    bench("session.process_sound_frame", process_sound_frames, 5_000)
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_atten_charac_routine(bench, evse_slac_session, evse_mac):
+    frames = build_matching_frames(evse_mac)
+    evse_slac_session.send_frame = AsyncMock()
+    evse_slac_session.nid = QUALCOMM_NID
+    evse_slac_session.nmk = QUALCOMM_NMK
+    # The timeout is only used if frames are lost, which does not happen here
+    evse_slac_session.config.slac_atten_results_timeout = 1000
+
+    async def matching():
+        evse_slac_session.reset()
+        evse_slac_session.evse_mac = evse_mac
+        evse_slac_session.pev_mac = PEV_MAC
+        evse_slac_session.run_id = RUN_ID
+        with patch("pyslac.session.readeth", new=AsyncMock(side_effect=frames)):
+            await evse_slac_session.atten_charac_routine()
+
+    await bench.run_async("session.atten_charac_routine", matching, 200)
+
+
+@pytest.fixture(params=[logging.INFO, logging.DEBUG], ids=["INFO", "DEBUG"])
+def log_level(request):
+    """
+    Sets the level of the session logger, whose records are formatted and
+    written to os.devnull, so that the cost of the logging calls is measured
+    """
+    session_logger = logging.getLogger("slac_session")
+    level, propagate = session_logger.level, session_logger.propagate
+    with open(os.devnull, "w") as devnull:
+        handler = logging.StreamHandler(devnull)
+        session_logger.addHandler(handler)
+        session_logger.setLevel(request.param)
+        session_logger.propagate = False
+        yield logging.getLevelName(request.param)
+        session_logger.removeHandler(handler)
+    session_logger.setLevel(level)
+    session_logger.propagate = propagate
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_sounds_loop_log_level(bench, evse_slac_session, evse_mac, log_level):
+    frames = build_matching_frames(evse_mac)[1:-2]
+    evse_slac_session.send_frame = AsyncMock()
+    evse_slac_session.config.slac_atten_results_timeout = 1000
+
+    async def sounds_loop():
+        evse_slac_session.reset()
+        evse_slac_session.evse_mac = evse_mac
+        evse_slac_session.pev_mac = PEV_MAC
+        evse_slac_session.run_id = RUN_ID
+        evse_slac_session.num_expected_sounds = SLAC_MSOUNDS
+        evse_slac_session.time_out_ms = 1000
+        with patch("pyslac.session.readeth", new=AsyncMock(side_effect=frames)):
+            await evse_slac_session.cm_sounds_loop()
+
+    await bench.run_async(f"session.cm_sounds_loop[{log_level}]", sounds_loop, 200)
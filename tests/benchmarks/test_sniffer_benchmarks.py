@@ -0,0 +1,23 @@
+import io
+
+import pytest
+
+from pyslac.sniffer import Sniffer
+from tests.benchmarks.test_session_benchmarks import build_matching_frames
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("json_output", [False, True], ids=["text", "json"])
+def test_sniffer_sound_burst(bench, evse_mac, json_output):
+    """Decoding and output of the frames of a complete matching, in one batch"""
+    batch = [(0.0, "eth0", frame) for frame in build_matching_frames(evse_mac)]
+    output = io.StringIO()
+    sniffer = Sniffer(output=output, json_output=json_output)
+
+    def process_burst():
+        output.seek(0)
+        output.truncate()
+        sniffer.process_batch(batch)
+
+    name = "json" if json_output else "text"
+    bench(f"sniffer.process_batch[{name}]", process_burst, 200)
@@ -1,12 +1,83 @@
+import asyncio
+import logging
+import os
 from unittest.mock import Mock, patch
 
 import pytest
 
+from pyslac import environment
+from pyslac.clock import VirtualClockEventLoop
 from pyslac.environment import Config
 from pyslac.session import SlacEvseSession
 
 EVSE_ID = "DE*12*122333"
 IFACE = "en0"
+# Variables read by Config.load_envs
+ENV_NAMES = (
+    "SLAC_INIT_TIMEOUT",
+    "ATTEN_RESULTS_TIMEOUT",
+    "LOG_LEVEL",
+    "SLAC_TRACE_FILE",
+    "SLAC_VALIDATION",
+    "SLAC_STATE_DIR",
+)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        default=False,
+        help="run the benchmarks found in tests/benchmarks",
+    )
+    parser.addoption(
+        "--benchmark-json",
+        action="store",
+        default="benchmark_results.json",
+        help="file where the benchmark results are written, in JSON format",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    The benchmarks take longer than the regular tests and are skipped, unless
+    the --benchmark option is provided
+    """
+    if config.getoption("--benchmark"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="use --benchmark to run benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
+@pytest.fixture
+def event_loop(request):
+    """
+    Tests marked with virtual_clock run in a VirtualClockEventLoop, so that
+    the SLAC timers expire as soon as there is nothing else to run
+    """
+    if request.node.get_closest_marker("virtual_clock"):
+        loop = VirtualClockEventLoop()
+    else:
+        loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def env_file(tmp_path):
+    """
+    The .env file of the test. The settings are removed from the environment,
+    which is restored afterwards along with the level of the root logger, as
+    reloading the settings changes both
+    """
+    root_level = logging.getLogger().level
+    with patch.dict(os.environ), patch.dict(environment._dotenv_variables):
+        for name in ENV_NAMES:
+            os.environ.pop(name, None)
+        yield tmp_path / ".env"
+    logging.getLogger().setLevel(root_level)
 
 
 @pytest.fixture
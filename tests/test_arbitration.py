@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from pyslac.arbitration import AttenuationArbiter
+from pyslac.enums import SLAC_GROUPS
+
+PEV_MAC = b"\xBB" * 6
+RUN_ID = b"\xFA" * 8
+
+
+@pytest.mark.asyncio
+async def test_lowest_attenuation_wins():
+    arbiter = AttenuationArbiter(window=1)
+    for evse_id in ("EVSE1", "EVSE2", "EVSE3"):
+        arbiter.join(evse_id, RUN_ID, PEV_MAC)
+
+    results = await asyncio.gather(
+        arbiter.submit("EVSE1", RUN_ID, PEV_MAC, [40] * SLAC_GROUPS, SLAC_GROUPS),
+        arbiter.submit("EVSE2", RUN_ID, PEV_MAC, [20] * SLAC_GROUPS, SLAC_GROUPS),
+        arbiter.submit("EVSE3", RUN_ID, PEV_MAC, [20] * SLAC_GROUPS, SLAC_GROUPS),
+    )
+
+    # The tie between EVSE2 and EVSE3 is won by the first to submit
+    assert results == [False, True, False]
+    assert (arbiter.won, arbiter.lost) == (1, 2)
+    # The contest is dropped once every session got the decision
+    assert not arbiter._contests
+
+
+@pytest.mark.asyncio
+async def test_decision_at_window_expiry():
+    """
+    A session that joined but never submits its profile (e.g. its sounding
+    failed) does not hold the other ones longer than the window
+    """
+    arbiter = AttenuationArbiter(window=0.05)
+    arbiter.join("EVSE1", RUN_ID, PEV_MAC)
+    arbiter.join("EVSE2", RUN_ID, PEV_MAC)
+
+    # Only the groups in use are taken into account
+    aag = [10] * 10 + [90] * (SLAC_GROUPS - 10)
+    assert await arbiter.submit("EVSE1", RUN_ID, PEV_MAC, aag, 10)
+
+
+@pytest.mark.asyncio
+async def test_sessions_without_contest_win():
+    arbiter = AttenuationArbiter()
+    arbiter.join("EVSE1", RUN_ID, PEV_MAC)
+    # Other run_id, so EVSE2 hears another EV
+    assert await arbiter.submit(
+        "EVSE2", b"\x01" * 8, PEV_MAC, [50] * SLAC_GROUPS, SLAC_GROUPS
+    )
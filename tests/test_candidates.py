@@ -0,0 +1,43 @@
+import pytest
+
+from pyslac.candidates import CandidateTable, SlacCandidate
+from pyslac.enums import SLAC_GROUPS
+
+
+def candidate(index: int) -> SlacCandidate:
+    return SlacCandidate(bytes([index]) * 8, bytes([index]) * 6, 0x00, 0x00)
+
+
+@pytest.mark.asyncio
+async def test_candidate_table():
+    table = CandidateTable(size=2)
+    first, second, third = candidate(1), candidate(2), candidate(3)
+    table.add(first)
+    table.add(second)
+    assert table.get(first.run_id) is first
+    assert table.get_by_pev_mac(second.pev_mac) is second
+
+    # The oldest candidate is dropped to make room for a new one
+    table.add(third)
+    assert len(table) == 2
+    assert table.get(first.run_id) is None
+    assert list(table) == [second, third]
+
+    assert table.pop(second.run_id) is second
+    table.clear()
+    assert not table
+
+
+@pytest.mark.asyncio
+async def test_candidate_sounding():
+    slac_candidate = candidate(1)
+    slac_candidate.num_expected_sounds = 2
+    slac_candidate.add_profile([20] * SLAC_GROUPS, SLAC_GROUPS)
+    assert not slac_candidate.sounding_done.is_set()
+    slac_candidate.add_profile([31] * 10, 10)
+    assert slac_candidate.sounding_done.is_set()
+
+    slac_candidate.average()
+    assert slac_candidate.num_groups == 10
+    assert slac_candidate.aag[:10] == [26] * 10
+    assert slac_candidate.aag[10:] == [10] * (SLAC_GROUPS - 10)
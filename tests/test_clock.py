@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+
+from pyslac.clock import VirtualClockEventLoop, now, now_ms, run_virtual
+from pyslac.enums import STATE_MATCHED, Timers
+from pyslac.environment import Config
+from pyslac.ev_session import SlacEvSession
+from pyslac.session import SlacEvseSession, SlacSessionController
+from pyslac.sockets.loopback import LoopbackNetwork
+
+EVSE_MAC = b"\xAB" * 6
+PEV_MAC = b"\xBB" * 6
+
+
+def test_now_outside_event_loop():
+    assert abs(now() - time.monotonic()) < 1
+
+
+def test_run_virtual():
+    async def main():
+        await asyncio.sleep(Timers.SLAC_INIT_TIMEOUT)
+        return now()
+
+    started = time.perf_counter()
+
+    assert run_virtual(main(), start=100.0) == 100.0 + Timers.SLAC_INIT_TIMEOUT
+    assert time.perf_counter() - started < 1
+
+
+def test_virtual_clock_keeps_the_order_of_the_timers():
+    loop = VirtualClockEventLoop()
+    fired = []
+    for delay in (3.0, 1.0, 2.0):
+        loop.call_later(delay, fired.append, delay)
+    loop.call_later(4.0, loop.stop)
+
+    loop.run_forever()
+    loop.close()
+
+    assert fired == [1.0, 2.0, 3.0]
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_wait_for_in_virtual_time():
+    assert now_ms() == 0
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(asyncio.Event().wait(), Timers.SLAC_MATCH_TIMEOUT)
+    assert now() == Timers.SLAC_MATCH_TIMEOUT
+
+
+async def start_evse(network: LoopbackNetwork) -> SlacEvseSession:
+    socket = network.attach(EVSE_MAC, plc_node=True)
+    slac_session = SlacEvseSession(
+        "EVSE", "loop", Config(slac_init_timeout=Timers.SLAC_INIT_TIMEOUT), socket
+    )
+    await slac_session.evse_set_key()
+    return slac_session
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_slac_init_timeout_in_virtual_time():
+    """No EV sends CM_SLAC_PARM.REQ within TT_EVSE_SLAC_init"""
+    slac_session = await start_evse(LoopbackNetwork())
+    started_at = now()
+
+    with pytest.raises(asyncio.TimeoutError):
+        await SlacSessionController().start_matching(slac_session)
+
+    assert now() - started_at == pytest.approx(Timers.SLAC_INIT_TIMEOUT, abs=0.01)
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_matching_with_retry_in_virtual_time():
+    """
+    The EV stops after CM_SLAC_PARM, so the first attempt of the EVSE fails
+    once TT_match_sequence expires and the EV is matched on the second one,
+    after TT_matching_rate
+    """
+    network = LoopbackNetwork()
+    controller = SlacSessionController()
+    slac_session = await start_evse(network)
+    network.link(PEV_MAC, EVSE_MAC)
+    await controller.process_cp_state(slac_session, "B")
+    await asyncio.sleep(0)
+    ev = SlacEvSession("loop", network.attach(PEV_MAC), num_evses=1)
+
+    await ev.ev_slac_parm()
+    await asyncio.sleep(Timers.SLAC_REQ_TIMEOUT + Timers.SLAC_REPETITION_TIMEOUT + 0.1)
+    assert await ev.matching_process() == EVSE_MAC
+
+    assert slac_session.state == STATE_MATCHED
+    assert slac_session.metrics.matching_retries == 1
+    await asyncio.sleep(0.01)
+    await controller.process_cp_state(slac_session, "A")
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+import signal
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from pyslac.enums import (
+    BROADCAST_ADDR,
+    CM_SLAC_PARM,
+    MMTYPE_REQ,
+    SlacEvseState,
+    Timers,
+)
+from pyslac.environment import Config
+from pyslac.layer_2_headers import EthernetHeader, HomePlugHeader
+from pyslac.messages import SlacParmReq
+from pyslac.session import SlacSessionController
+from pyslac.tracing import NOOP_TRACER
+
+PEV_MAC = b"\xBB" * 6
+RUN_ID = b"\xFA" * 8
+
+
+def test_config_diff():
+    config = Config(slac_init_timeout=50, slac_validation=False)
+
+    assert config.diff(Config(slac_init_timeout=50)) == {}
+    assert config.diff(Config(slac_init_timeout=20, slac_validation=True)) == {
+        "slac_init_timeout": (50, 20),
+        "slac_validation": (False, True),
+    }
+
+
+def test_idle_session_updated_right_away(evse_slac_session, tmp_path):
+    config = Config(slac_init_timeout=20, state_dir=str(tmp_path))
+
+    changes = evse_slac_session.update_config(config)
+
+    assert changes == {
+        "slac_init_timeout": (1, 20),
+        "state_dir": (None, str(tmp_path)),
+    }
+    assert evse_slac_session.config is config
+    assert evse_slac_session.state_store.directory == str(tmp_path)
+
+
+def test_trace_file_closed_on_reload(evse_slac_session, tmp_path):
+    evse_slac_session.update_config(Config(trace_file=str(tmp_path / "a.jsonl")))
+    exporter = evse_slac_session.tracer.exporter
+
+    evse_slac_session.update_config(Config(trace_file=str(tmp_path / "a.jsonl")))
+    assert evse_slac_session.tracer.exporter is exporter
+    evse_slac_session.update_config(Config(trace_file=str(tmp_path / "b.jsonl")))
+
+    assert exporter.closed
+    exporter.close().result()
+    assert exporter._file.closed
+    assert evse_slac_session.tracer.exporter.path == str(tmp_path / "b.jsonl")
+    evse_slac_session.update_config(Config())
+    assert evse_slac_session.tracer is NOOP_TRACER
+
+
+@pytest.mark.asyncio
+async def test_active_session_updated_after_the_phase(evse_slac_session, evse_mac):
+    """
+    The Config reloaded while waiting for CM_SLAC_PARM.REQ does not change the
+    timer of that phase, but applies from the next one
+    """
+    config = Config(slac_init_timeout=20)
+    slac_parm_req = (
+        EthernetHeader(dst_mac=BROADCAST_ADDR, src_mac=PEV_MAC).pack_big()
+        + HomePlugHeader(CM_SLAC_PARM | MMTYPE_REQ).pack_big()
+        + SlacParmReq(run_id=RUN_ID).pack_big()
+    )
+
+    async def readeth(*args):
+        assert evse_slac_session.update_config(config) == {"slac_init_timeout": (1, 20)}
+        assert evse_slac_session.config is not config
+        return slac_parm_req
+
+    evse_slac_session.send_frame = AsyncMock()
+    with patch("pyslac.session.readeth", new=readeth):
+        await evse_slac_session.evse_slac_parm()
+
+    assert evse_slac_session.fsm_state == SlacEvseState.WAIT_START_ATTEN_CHAR
+    assert evse_slac_session.config is config
+
+
+def test_reload_envs(evse_slac_session, env_file):
+    controller = SlacSessionController()
+    controller._register_session(evse_slac_session)
+    env_file.write_text("SLAC_INIT_TIMEOUT=20\nLOG_LEVEL=WARNING\n")
+
+    changes = controller.reload_envs(str(env_file))
+
+    assert changes["slac_init_timeout"] == (1, 20.0)
+    assert changes["log_level"] == (None, "WARNING")
+    assert evse_slac_session.config.slac_init_timeout == 20.0
+    assert logging.getLogger().level == logging.WARNING
+
+    env_file.write_text("SLAC_INIT_TIMEOUT=25\nATTEN_RESULTS_TIMEOUT=2000\n")
+    with pytest.raises(ValueError):
+        controller.reload_envs(str(env_file))
+    assert evse_slac_session.config.slac_init_timeout == 20.0
+
+    env_file.write_text("SLAC_INIT_TIMEOUT=20\nLOG_LEVEL=WARNING\n")
+    assert controller.reload_envs(str(env_file)) == {}
+
+
+def test_setting_removed_from_env_file(evse_slac_session, env_file):
+    """A setting removed from the .env file gets its default value back"""
+    controller = SlacSessionController()
+    controller._register_session(evse_slac_session)
+    env_file.write_text("SLAC_INIT_TIMEOUT=20\nLOG_LEVEL=WARNING\n")
+    controller.reload_envs(str(env_file))
+
+    env_file.write_text("LOG_LEVEL=WARNING\n")
+    changes = controller.reload_envs(str(env_file))
+
+    assert changes == {"slac_init_timeout": (20, Timers.SLAC_INIT_TIMEOUT)}
+    assert "SLAC_INIT_TIMEOUT" not in os.environ
+
+
+@pytest.mark.asyncio
+async def test_reload_on_signal(evse_slac_session, env_file):
+    controller = SlacSessionController()
+    controller._register_session(evse_slac_session)
+    env_file.write_text("SLAC_INIT_TIMEOUT=30\n")
+    controller.install_reload_handler(str(env_file), signal.SIGUSR1)
+    try:
+        os.kill(os.getpid(), signal.SIGUSR1)
+        await asyncio.sleep(0.01)
+    finally:
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR1)
+
+    assert evse_slac_session.config.slac_init_timeout == 30.0
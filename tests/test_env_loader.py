@@ -0,0 +1,103 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from pyslac.enums import Timers
+from pyslac.env_loader import parse_env_file
+from pyslac.environment import Config
+
+
+def test_parse_env_file(env_file):
+    env_file.write_text(
+        "# comment\n"
+        "\n"
+        "SLAC_INIT_TIMEOUT=20 # seconds\n"
+        "export LOG_LEVEL = DEBUG\n"
+        "SLAC_TRACE_FILE='/tmp/slac traces.jsonl'\n"
+        'SLAC_STATE_DIR="/var/lib/pyslac" # state\n'
+        "NOT A SETTING\n"
+    )
+
+    assert parse_env_file(str(env_file)) == {
+        "SLAC_INIT_TIMEOUT": "20",
+        "LOG_LEVEL": "DEBUG",
+        "SLAC_TRACE_FILE": "/tmp/slac traces.jsonl",
+        "SLAC_STATE_DIR": "/var/lib/pyslac",
+    }
+
+
+@pytest.mark.parametrize(
+    "env",
+    [
+        "",
+        "SLAC_INIT_TIMEOUT=20\nATTEN_RESULTS_TIMEOUT=900\nLOG_LEVEL=DEBUG\n",
+        "SLAC_VALIDATION=yes\nSLAC_TRACE_FILE=traces.jsonl\nSLAC_STATE_DIR=state\n",
+        "SLAC_VALIDATION=Off\n",
+    ],
+)
+def test_stdlib_loader_same_as_environs(env_file, env):
+    env_file.write_text(env)
+    config = Config()
+    config.load_envs(str(env_file), override=True)
+    stdlib_config = Config()
+    stdlib_config.load_envs(str(env_file), override=True, stdlib=True)
+
+    assert stdlib_config == config
+
+
+@pytest.mark.parametrize(
+    "env, invalid",
+    [
+        ("ATTEN_RESULTS_TIMEOUT=2000\n", {"ATTEN_RESULTS_TIMEOUT"}),
+        (
+            "SLAC_INIT_TIMEOUT=soon\nSLAC_VALIDATION=maybe\n",
+            {"SLAC_INIT_TIMEOUT", "SLAC_VALIDATION"},
+        ),
+        ("ATTEN_RESULTS_TIMEOUT=900.5\n", {"ATTEN_RESULTS_TIMEOUT"}),
+    ],
+)
+def test_stdlib_loader_validation(env_file, env, invalid):
+    env_file.write_text(env)
+
+    with pytest.raises(ValueError) as environs_error:
+        Config().load_envs(str(env_file), override=True)
+    with pytest.raises(ValueError) as stdlib_error:
+        Config().load_envs(str(env_file), override=True, stdlib=True)
+
+    assert set(stdlib_error.value.error_messages) == invalid
+    assert stdlib_error.value.error_messages == environs_error.value.error_messages
+
+
+@pytest.mark.parametrize("stdlib", [False, True])
+def test_setting_removed_from_env_file(env_file, monkeypatch, stdlib):
+    """
+    Once removed from the .env file, a setting gets the value it had before
+    the file was loaded, or its default
+    """
+    monkeypatch.setenv("LOG_LEVEL", "ERROR")
+    env_file.write_text("SLAC_INIT_TIMEOUT=20\nLOG_LEVEL=DEBUG\nSLAC_VALIDATION=true\n")
+    Config().load_envs(str(env_file), override=True, stdlib=stdlib)
+
+    env_file.write_text("SLAC_VALIDATION=true\n")
+    config = Config()
+    config.load_envs(str(env_file), override=True, stdlib=stdlib)
+
+    assert config.slac_init_timeout == Timers.SLAC_INIT_TIMEOUT
+    assert config.log_level == "ERROR"
+    assert config.slac_validation
+    assert "SLAC_INIT_TIMEOUT" not in os.environ
+
+
+def test_no_import_side_effects():
+    """Importing pyslac neither configures logging nor imports environs"""
+    code = (
+        "import logging, sys\n"
+        "import pyslac.session, pyslac.ev_session, pyslac.sniffer\n"
+        "assert not logging.getLogger().handlers\n"
+        "assert logging.getLogger().level == logging.WARNING\n"
+        "assert 'environs' not in sys.modules\n"
+        "assert 'marshmallow' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
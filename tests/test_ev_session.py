@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+from pyslac.enums import CM_SLAC_MATCH, MMTYPE_REQ, STATE_MATCHED, STATE_UNMATCHED
+from pyslac.environment import Config
+from pyslac.ev_session import SlacEvSession
+from pyslac.session import SlacEvseSession, SlacSessionController
+from pyslac.sockets.loopback import LoopbackNetwork
+
+pytestmark = pytest.mark.virtual_clock
+
+
+def evse_mac(number: int) -> bytes:
+    return b"\xAB\x00" + number.to_bytes(4, "big")
+
+
+def ev_mac(number: int) -> bytes:
+    return b"\xBB\x00" + number.to_bytes(4, "big")
+
+
+async def start_evse(
+    network: LoopbackNetwork, controller: SlacSessionController, number: int
+) -> SlacEvseSession:
+    """Sets the key of a simulated EVSE and plugs an EV in (state B)"""
+    socket = network.attach(evse_mac(number), plc_node=True)
+    slac_session = SlacEvseSession(
+        f"EVSE{number}", "loop", Config(slac_init_timeout=5), socket=socket
+    )
+    await slac_session.evse_set_key()
+    await controller.process_cp_state(slac_session, "B")
+    # The session waits for CM_SLAC_PARM.REQ before the EV sends it
+    await asyncio.sleep(0)
+    return slac_session
+
+
+def simulated_ev(network: LoopbackNetwork, number: int, num_evses: int = 1):
+    ev = SlacEvSession("loop", network.attach(ev_mac(number)), num_evses)
+    ev.pause = 0
+    ev.sound_batch = ev.sounds
+    return ev
+
+
+async def unplug(controller: SlacSessionController, evse_sessions) -> None:
+    # The sessions handle the last frames sent by the EVs first
+    await asyncio.sleep(0.01)
+    for slac_session in evse_sessions:
+        await controller.process_cp_state(slac_session, "A")
+        if slac_session.key_rotation_task is not None:
+            await slac_session.key_rotation_task
+
+
+@pytest.mark.asyncio
+async def test_ev_matched_with_evse():
+    network = LoopbackNetwork()
+    controller = SlacSessionController()
+    evse = await start_evse(network, controller, 1)
+    network.link(ev_mac(1), evse_mac(1))
+    ev = SlacEvSession("loop", network.attach(ev_mac(1)), num_evses=1)
+
+    assert await ev.matching_process() == evse.evse_mac
+
+    assert ev.state == STATE_MATCHED
+    assert (ev.nid, ev.nmk) == (evse.nid, evse.nmk)
+    assert evse.state == STATE_MATCHED
+    assert evse.pev_mac == ev.pev_mac
+    assert ev.atten_chars[evse.evse_mac].num_sounds == ev.sounds
+    await unplug(controller, [evse])
+
+
+@pytest.mark.asyncio
+async def test_ev_rematched_with_evse_after_lost_match_req():
+    """The first CM_SLAC_MATCH.REQ of the second matching is lost"""
+    network = LoopbackNetwork()
+    controller = SlacSessionController()
+    evse = await start_evse(network, controller, 1)
+    network.link(ev_mac(1), evse_mac(1))
+    ev = simulated_ev(network, 1)
+    await ev.matching_process()
+    await unplug(controller, [evse])
+
+    await controller.process_cp_state(evse, "B")
+    await asyncio.sleep(0)
+    ev.reset()
+    send = ev.socket.send
+    lost = []
+
+    def lose_first_match_req(frame: bytes) -> int:
+        if frame[15] | frame[16] << 8 == CM_SLAC_MATCH | MMTYPE_REQ and not lost:
+            lost.append(frame)
+            return len(frame)
+        return send(frame)
+
+    ev.socket.send = lose_first_match_req
+
+    assert await ev.matching_process() == evse_mac(1)
+
+    assert lost
+    assert evse.state == STATE_MATCHED
+    await unplug(controller, [evse])
+
+
+@pytest.mark.asyncio
+async def test_ev_matched_with_the_evse_heard_best():
+    """The EV also hears the neighbour EVSE (crosstalk), with more attenuation"""
+    network = LoopbackNetwork()
+    controller = SlacSessionController()
+    evses = [await start_evse(network, controller, number) for number in (1, 2)]
+    network.link(ev_mac(1), evse_mac(1), attenuation=35)
+    network.link(ev_mac(1), evse_mac(2), attenuation=15)
+    ev = simulated_ev(network, 1, num_evses=2)
+
+    assert await ev.matching_process() == evse_mac(2)
+
+    assert len(ev.atten_chars) == 2
+    assert evses[1].state == STATE_MATCHED
+    await unplug(controller, evses)
+
+
+@pytest.mark.asyncio
+async def test_ev_not_matched_above_threshold():
+    network = LoopbackNetwork()
+    controller = SlacSessionController()
+    evse = await start_evse(network, controller, 1)
+    network.link(ev_mac(1), evse_mac(1), attenuation=60)
+    ev = simulated_ev(network, 1)
+
+    with pytest.raises(ValueError):
+        await ev.matching_process()
+
+    assert ev.state == STATE_UNMATCHED
+    await unplug(controller, [evse])
+
+
+@pytest.mark.asyncio
+async def test_ev_without_evse_times_out():
+    ev = simulated_ev(LoopbackNetwork(), 1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await ev.matching_process()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_evs():
+    network = LoopbackNetwork()
+    controller = SlacSessionController()
+    evses = [await start_evse(network, controller, number) for number in range(100)]
+    evs = []
+    for number in range(100):
+        network.link(ev_mac(number), evse_mac(number))
+        evs.append(simulated_ev(network, number))
+
+    matched = await asyncio.gather(*(ev.matching_process() for ev in evs))
+
+    assert matched == [evse_mac(number) for number in range(100)]
+    assert all(evse.state == STATE_MATCHED for evse in evses)
+    await unplug(controller, evses)
@@ -0,0 +1,167 @@
+import asyncio
+import socket
+
+import pytest
+
+from pyslac.enums import ETH_FRAME_MAX_SIZE, MME_REASSEMBLY_TIMEOUT, MMTYPE_CNF
+from pyslac.fragmentation import MmeReassembler, fragment_frame
+from pyslac.layer_2_headers import EthernetHeader, HomePlugHeader
+from pyslac.sockets.async_linux_socket import readeth
+
+PEV_MAC = b"\xBB" * 6
+EVSE_MAC = b"\xAB" * 6
+VS_NW_INFO = 0xA038
+MAX_FRAGMENT_SIZE = 100
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def build_mme(mme_entry: bytes, src_mac: bytes = PEV_MAC) -> bytes:
+    return (
+        EthernetHeader(dst_mac=EVSE_MAC, src_mac=src_mac).pack_big()
+        + HomePlugHeader(VS_NW_INFO | MMTYPE_CNF).pack_big()
+        + mme_entry
+    )
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def reassembler(clock):
+    return MmeReassembler(
+        slots=2, timeout=1.0, max_fragment_size=MAX_FRAGMENT_SIZE, time_func=clock
+    )
+
+
+def test_fragment_frame():
+    mme_entry = bytes(range(250))
+    fragments = fragment_frame(build_mme(mme_entry), fmsn=7, max_fragment_size=100)
+
+    assert len(fragments) == 3
+    for fragment_number, fragment in enumerate(fragments):
+        homeplug_header = HomePlugHeader.from_bytes(fragment)
+        assert homeplug_header.mm_type == VS_NW_INFO | MMTYPE_CNF
+        assert homeplug_header.num_fragments == 3
+        assert homeplug_header.fragment_number == fragment_number
+        assert homeplug_header.fmsn == b"\x07"
+    assert b"".join(fragment[19:] for fragment in fragments) == mme_entry
+
+    # A MME that fits in one frame is not touched
+    small_mme = build_mme(b"\x01" * 10)
+    assert fragment_frame(small_mme, fmsn=7) == [small_mme]
+
+
+@pytest.mark.asyncio
+async def test_full_size_fragments_through_the_socket():
+    """
+    Fragments of the default size fill a whole Ethernet frame, which readeth
+    must receive without truncating it
+    """
+    mme = build_mme(bytes(range(256)) * 12)
+    fragments = fragment_frame(mme, fmsn=1)
+    assert len(fragments) == 3
+    assert len(fragments[0]) == ETH_FRAME_MAX_SIZE
+    reassembler = MmeReassembler()
+
+    sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    with sender, receiver:
+        receiver.setblocking(False)
+        for fragment in fragments:
+            sender.send(fragment)
+        for fragment in fragments[:-1]:
+            frame = await readeth(receiver, "lo")
+            assert frame == fragment
+            assert reassembler.feed(frame) is None
+        assert reassembler.feed(await readeth(receiver, "lo")) == mme
+    assert reassembler.discarded == 0
+
+
+def test_reassembly_out_of_order(reassembler):
+    mme = build_mme(bytes(range(250)))
+    fragments = fragment_frame(mme, fmsn=1, max_fragment_size=MAX_FRAGMENT_SIZE)
+
+    assert reassembler.feed(fragments[2]) is None
+    assert reassembler.feed(fragments[0]) is None
+    assert reassembler.pending == 1
+    assert reassembler.feed(fragments[1]) == mme
+    assert reassembler.pending == 0
+    assert reassembler.completed == 1
+
+
+def test_non_fragmented_frames_pass_through(reassembler):
+    mme = build_mme(b"\x01" * 41)
+    assert reassembler.feed(mme) is mme
+    # Vendor specific MMEs (MMV = 0x00) do not have the FMI field
+    vendor_mme = mme[:14] + b"\x00" + mme[15:17] + b"\x00\xb0\x52"
+    assert reassembler.feed(vendor_mme) is vendor_mme
+
+
+def test_reassembly_timeout(reassembler, clock):
+    mme = build_mme(bytes(range(250)))
+    fragments = fragment_frame(mme, fmsn=1, max_fragment_size=MAX_FRAGMENT_SIZE)
+
+    reassembler.feed(fragments[0])
+    reassembler.feed(fragments[1])
+    clock.now = 1.5
+    # The incomplete MME expired, so the last fragment alone is not enough
+    assert reassembler.feed(fragments[2]) is None
+    assert reassembler.timed_out == 1
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_reassembly_timeout_on_loop_time():
+    """By default, incomplete MMEs expire with the clock of the event loop"""
+    reassembler = MmeReassembler(max_fragment_size=MAX_FRAGMENT_SIZE)
+    fragments = fragment_frame(
+        build_mme(bytes(range(250))), fmsn=1, max_fragment_size=MAX_FRAGMENT_SIZE
+    )
+
+    reassembler.feed(fragments[0])
+    reassembler.feed(fragments[1])
+    await asyncio.sleep(MME_REASSEMBLY_TIMEOUT + 0.5)
+
+    assert reassembler.feed(fragments[2]) is None
+    assert reassembler.timed_out == 1
+
+
+def test_reassembly_memory_cap(reassembler):
+    mmes = [
+        fragment_frame(
+            build_mme(bytes([index]) * 150, src_mac=bytes([index]) * 6),
+            fmsn=index,
+            max_fragment_size=MAX_FRAGMENT_SIZE,
+        )
+        for index in range(3)
+    ]
+    for fragments in mmes:
+        reassembler.feed(fragments[0])
+
+    # Only 2 slots are available, so the oldest MME was evicted
+    assert reassembler.pending == 2
+    assert reassembler.evicted == 1
+    assert reassembler.feed(mmes[0][1]) is None
+    assert reassembler.feed(mmes[2][1]) == build_mme(
+        bytes([2]) * 150, src_mac=bytes([2]) * 6
+    )
+
+
+def test_invalid_fragment_is_discarded(reassembler):
+    mme = build_mme(bytes(range(250)))
+    fragment = bytearray(
+        fragment_frame(mme, fmsn=1, max_fragment_size=MAX_FRAGMENT_SIZE)[0]
+    )
+    # Fragment number 3 of a MME with only 2 fragments
+    fragment[17] = 0x31
+    assert reassembler.feed(bytes(fragment)) is None
+    assert reassembler.discarded == 1
+    assert reassembler.pending == 0
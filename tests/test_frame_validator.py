@@ -0,0 +1,205 @@
+import random
+
+import pytest
+
+from pyslac.enums import (
+    CM_ATTEN_PROFILE,
+    CM_SET_CCO_CAPAB,
+    CM_SET_KEY_MY_NONCE,
+    CM_SET_KEY_PID,
+    CM_SET_KEY_PMN,
+    CM_SET_KEY_PRN,
+    CM_SET_KEY_YOUR_NONCE,
+    CM_SLAC_PARM,
+    CM_VALIDATE_RESULT_SUCCESS,
+    LINK_STATUS_CONNECTED,
+    MMTYPE_IND,
+    MMTYPE_REQ,
+    QUALCOMM_NID,
+    QUALCOMM_NMK,
+    SLAC_ATTEN_TIMEOUT,
+    SLAC_GROUPS,
+    SLAC_MSOUNDS,
+)
+from pyslac.frame_validator import FRAME_SHAPES, FrameValidator
+from pyslac.layer_2_headers import (
+    EthernetHeader,
+    HomePlugHeader,
+    HomePlugVendorHeader,
+)
+from pyslac.messages import (
+    AtennChar,
+    AtennCharRsp,
+    AttenProfile,
+    MatchCnf,
+    MatchReq,
+    MnbcSound,
+    SetKeyCnf,
+    SlacParmCnf,
+    SlacParmReq,
+    StartAtennChar,
+    ValidateCnf,
+    ValidateReq,
+)
+from pyslac.vendor_messages import (
+    LinkStatusCnf,
+    NetworkInfo,
+    StationInfo,
+    VsNwInfoCnf,
+    VsResetCnf,
+    VsSwVerCnf,
+)
+
+PEV_MAC = b"\xBB" * 6
+EVSE_MAC = b"\xAB" * 6
+RUN_ID = b"\xFA" * 8
+FUZZ_SEED = 15118
+FUZZ_ITERATIONS = 300
+
+VALID_MESSAGES = {
+    SetKeyCnf: SetKeyCnf(
+        result=0x00,
+        my_nonce=CM_SET_KEY_MY_NONCE,
+        your_nonce=CM_SET_KEY_YOUR_NONCE,
+        pid=CM_SET_KEY_PID,
+        prn=CM_SET_KEY_PRN,
+        pmn=CM_SET_KEY_PMN,
+        cco_capab=CM_SET_CCO_CAPAB,
+    ),
+    SlacParmReq: SlacParmReq(run_id=RUN_ID),
+    SlacParmCnf: SlacParmCnf(forwarding_sta=PEV_MAC, run_id=RUN_ID),
+    StartAtennChar: StartAtennChar(
+        num_sounds=SLAC_MSOUNDS,
+        time_out=SLAC_ATTEN_TIMEOUT,
+        forwarding_sta=PEV_MAC,
+        run_id=RUN_ID,
+    ),
+    MnbcSound: MnbcSound(cnt=SLAC_MSOUNDS, run_id=RUN_ID),
+    AttenProfile: AttenProfile(pev_mac=PEV_MAC, aag=[30] * SLAC_GROUPS),
+    AtennChar: AtennChar(
+        source_address=PEV_MAC,
+        run_id=RUN_ID,
+        num_sounds=SLAC_MSOUNDS,
+        num_groups=SLAC_GROUPS,
+        aag=[30] * SLAC_GROUPS,
+    ),
+    AtennCharRsp: AtennCharRsp(
+        source_address=PEV_MAC, run_id=RUN_ID, source_id=0x00, resp_id=0x00, result=0
+    ),
+    ValidateReq: ValidateReq(timer=0x09),
+    ValidateCnf: ValidateCnf(result=CM_VALIDATE_RESULT_SUCCESS, toggle_num=3),
+    MatchReq: MatchReq(pev_mac=PEV_MAC, evse_mac=EVSE_MAC, run_id=RUN_ID),
+    MatchCnf: MatchCnf(
+        pev_mac=PEV_MAC,
+        evse_mac=EVSE_MAC,
+        run_id=RUN_ID,
+        nid=QUALCOMM_NID,
+        nmk=QUALCOMM_NMK,
+    ),
+    VsSwVerCnf: VsSwVerCnf(status=0x00, device_id=0x21, version="QCA7000-MAC-1.0"),
+    VsResetCnf: VsResetCnf(status=0x00),
+    VsNwInfoCnf: VsNwInfoCnf(
+        networks=(
+            NetworkInfo(
+                nid=QUALCOMM_NID,
+                snid=0x01,
+                tei=0x02,
+                role=0x00,
+                cco_mac=PEV_MAC,
+                cco_tei=0x01,
+                stations=(StationInfo(PEV_MAC, 0x01, b"\x00" * 6, 9, 9),),
+            ),
+        )
+    ),
+    LinkStatusCnf: LinkStatusCnf(status=0x00, link_status=LINK_STATUS_CONNECTED),
+}
+
+
+def build_frame(mm_type: int) -> bytes:
+    shape = FRAME_SHAPES[mm_type]
+    message = VALID_MESSAGES[shape.message_cls]
+    if shape.mmv == 0x00:
+        homeplug_header = HomePlugVendorHeader(mm_type)
+    else:
+        homeplug_header = HomePlugHeader(mm_type)
+    return bytes(
+        EthernetHeader(dst_mac=EVSE_MAC, src_mac=PEV_MAC).pack_big()
+        + homeplug_header.pack_big()
+        + message.pack_big()
+    )
+
+
+def fuzz_frames(mm_type: int, rnd: random.Random):
+    """
+    Generates malformed variations of a valid frame: truncated frames, frames
+    with random bytes changed and random payloads with a valid header
+    """
+    valid_frame = build_frame(mm_type)
+    for _ in range(FUZZ_ITERATIONS):
+        yield valid_frame[: rnd.randrange(len(valid_frame))]
+
+        mutated_frame = bytearray(valid_frame)
+        for _ in range(rnd.randint(1, 8)):
+            mutated_frame[rnd.randrange(len(mutated_frame))] = rnd.randrange(256)
+        yield bytes(mutated_frame)
+
+        payload_size = rnd.randrange(128)
+        yield valid_frame[:19] + bytes(rnd.randrange(256) for _ in range(payload_size))
+
+
+@pytest.mark.parametrize("mm_type", FRAME_SHAPES, ids=hex)
+def test_valid_frames_are_accepted(mm_type):
+    frame_validator = FrameValidator()
+    assert frame_validator.validate(build_frame(mm_type))
+    assert frame_validator.accepted == 1
+    assert frame_validator.rejected == 0
+
+
+@pytest.mark.parametrize("mm_type", FRAME_SHAPES, ids=hex)
+def test_fuzz_parsers(mm_type):
+    """
+    Every frame accepted by the validator must be decoded by the headers and
+    message parsers without raising. The only exception is VS_NW_INFO.CNF,
+    whose nested entries are checked by its parser, which raises ValueError
+    """
+    rnd = random.Random(FUZZ_SEED + mm_type)
+    frame_validator = FrameValidator()
+    for frame in fuzz_frames(mm_type, rnd):
+        if not frame_validator.validate(frame):
+            continue
+        EthernetHeader.from_bytes(frame)
+        homeplug_header = HomePlugHeader.from_bytes(frame)
+        # The MMTYPE may have been mutated, so a different shape may apply
+        shape = FRAME_SHAPES.get(homeplug_header.mm_type)
+        if shape is None:
+            continue
+        if shape.message_cls is VsNwInfoCnf:
+            try:
+                VsNwInfoCnf.from_bytes(frame)
+            except ValueError:
+                pass
+            continue
+        message = shape.message_cls.from_bytes(frame)
+        if hasattr(message, "aag"):
+            assert len(message.aag) == message.num_groups <= SLAC_GROUPS
+
+    assert frame_validator.rejected > 0
+    assert frame_validator.rejected + frame_validator.accepted == 3 * FUZZ_ITERATIONS
+
+
+def test_rejections_are_counted_per_mm_type():
+    frame_validator = FrameValidator()
+    slac_parm_req = build_frame(CM_SLAC_PARM | MMTYPE_REQ)
+    atten_profile = bytearray(build_frame(CM_ATTEN_PROFILE | MMTYPE_IND))
+    # More groups announced than the ones present in the frame
+    atten_profile[25] = SLAC_GROUPS + 1
+
+    assert not frame_validator.validate(slac_parm_req[:20])
+    assert not frame_validator.validate(bytes(atten_profile))
+    assert not frame_validator.validate(b"\x00" * 10)
+    assert frame_validator.rejected == 3
+    assert frame_validator.rejected_by_mm_type == {
+        CM_SLAC_PARM | MMTYPE_REQ: 1,
+        CM_ATTEN_PROFILE | MMTYPE_IND: 1,
+        None: 1,
+    }
@@ -0,0 +1,24 @@
+from pyslac.key_pool import KeyPool, generate_key_pair
+from pyslac.utils import generate_nid
+
+
+def test_generate_key_pair():
+    nmk, nid = generate_key_pair()
+    assert len(nmk) == 16
+    assert nid == generate_nid(nmk)
+
+
+def test_key_pool_take_and_fill():
+    key_pool = KeyPool(size=3)
+    assert len(key_pool) == 3
+    pairs = [key_pool.take() for _ in range(3)]
+    assert len(key_pool) == 0
+    # Each pair is used only once
+    assert len(set(pairs)) == 3
+
+    # An empty pool still provides a valid pair
+    nmk, nid = key_pool.take()
+    assert nid == generate_nid(nmk)
+
+    key_pool.fill()
+    assert len(key_pool) == 3
@@ -0,0 +1,49 @@
+import pytest
+
+from pyslac.load_harness import LoadHarness, LoadProfile, percentile
+
+
+def test_percentile():
+    values = [float(value) for value in range(100, 0, -1)]
+
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile(values, 100) == 100.0
+    assert percentile([], 95) == 0.0
+
+
+def test_arrival_times():
+    times = LoadHarness(LoadProfile(num_evs=50, arrival_rate=100)).arrival_times()
+
+    assert times == sorted(times)
+    assert len(times) == 50
+    assert (
+        times == LoadHarness(LoadProfile(num_evs=50, arrival_rate=100)).arrival_times()
+    )
+    assert LoadHarness(LoadProfile(num_evs=3)).arrival_times() == [0.0] * 3
+
+
+@pytest.mark.asyncio
+async def test_load_run():
+    """More EVs than EVSEs, so that each EVSE is used by several EVs in turn"""
+    profile = LoadProfile(num_evs=20, num_evses=5, arrival_rate=200)
+
+    report = await LoadHarness(profile).run()
+
+    assert (report.matched, report.failed) == (20, 0)
+    assert report.ev_retries == report.evse_retries == 0
+    assert len(report.times_to_match) == 20
+    assert report.as_dict()["time_to_match_ms"]["p99"] > 0
+    assert report.cpu_per_matching_ms > 0
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_load_run_with_crosstalk():
+    """Each EVSE also hears the EV plugged into the previous one"""
+    profile = LoadProfile(num_evs=6, num_evses=3, crosstalk=True)
+
+    report = await LoadHarness(profile).run()
+
+    assert (report.matched, report.failed) == (6, 0)
+    assert report.ev_retries == 0
@@ -0,0 +1,48 @@
+from pyslac.metrics import Histogram, SessionMetrics
+
+
+def test_histogram():
+    histogram = Histogram(bounds=(10, 100, 1000))
+    for value in (1, 5, 10, 50, 150, 2000):
+        histogram.observe(value)
+
+    # A value equal to a bound falls in the bucket of that bound
+    assert histogram.buckets == [3, 1, 1, 1]
+    assert histogram.count == 6
+    assert histogram.max == 2000
+    assert histogram.mean == 2216 / 6
+    assert histogram.quantile(0.5) == 10
+    assert histogram.quantile(0.75) == 1000
+    # Values above the last bound are reported by the max
+    assert histogram.quantile(1) == 2000
+    assert histogram.count_above(100) == 2
+
+
+def test_empty_histogram():
+    histogram = Histogram()
+    assert histogram.mean == 0.0
+    assert histogram.quantile(0.99) == 0.0
+
+
+def test_session_metrics():
+    metrics = SessionMetrics(bounds=(10, 100))
+    metrics.observe_phase("SOUNDING", 50)
+    metrics.observe_phase("SOUNDING", 500)
+    metrics.observe_response("CM_SLAC_PARM.CNF", 5)
+    metrics.count_frames("SOUNDING", processed=3)
+    metrics.count_frames("SOUNDING", processed=1, discarded=2)
+    metrics.count_socket_drops("malformed")
+    metrics.count_socket_drops("reassembly", 3)
+    metrics.count_socket_drops("malformed")
+
+    snapshot = metrics.as_dict()
+    assert snapshot["phase_durations_ms"]["SOUNDING"]["count"] == 2
+    assert snapshot["phase_durations_ms"]["SOUNDING"]["buckets"] == {
+        10: 0,
+        100: 1,
+        float("inf"): 1,
+    }
+    assert snapshot["response_times_ms"]["CM_SLAC_PARM.CNF"]["max"] == 5
+    assert snapshot["frames_processed"] == {"SOUNDING": 4}
+    assert snapshot["frames_discarded"] == {"SOUNDING": 2}
+    assert snapshot["socket_drops"] == {"malformed": 2, "reassembly": 3}
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from pyslac.metrics_server import MetricsServer, render_metrics
+
+
+def test_render_metrics(evse_slac_session):
+    metrics = evse_slac_session.metrics
+    metrics.matchings_attempted = 2
+    metrics.matchings_succeeded = 1
+    metrics.observe_phase("SOUNDING", 150)
+    metrics.count_frames("SOUNDING", processed=10, discarded=1)
+    metrics.count_socket_drops("malformed", 3)
+
+    page = render_metrics({'EVSE "1"': evse_slac_session})
+    assert "# TYPE pyslac_matchings_attempted_total counter" in page
+    assert 'pyslac_matchings_attempted_total{evse_id="EVSE \\"1\\""} 2' in page
+    assert 'pyslac_matchings_succeeded_total{evse_id="EVSE \\"1\\""} 1' in page
+    assert (
+        'pyslac_frames_processed_total{evse_id="EVSE \\"1\\"",phase="SOUNDING"} 10'
+        in page
+    )
+    assert (
+        'pyslac_socket_drops_total{evse_id="EVSE \\"1\\"",reason="malformed"} 3' in page
+    )
+    # The buckets are cumulative
+    assert (
+        'pyslac_phase_duration_milliseconds_bucket{evse_id="EVSE \\"1\\"",'
+        'phase="SOUNDING",le="100"} 0' in page
+    )
+    assert (
+        'pyslac_phase_duration_milliseconds_bucket{evse_id="EVSE \\"1\\"",'
+        'phase="SOUNDING",le="200"} 1' in page
+    )
+    assert (
+        'pyslac_phase_duration_milliseconds_bucket{evse_id="EVSE \\"1\\"",'
+        'phase="SOUNDING",le="+Inf"} 1' in page
+    )
+    assert page.count("# TYPE pyslac_phase_duration_milliseconds histogram") == 1
+
+
+async def scrape(port: int) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+@pytest.mark.asyncio
+async def test_metrics_server(evse_slac_session):
+    server = MetricsServer(lambda: {"EVSE1": evse_slac_session}, render_interval=60)
+    await server.start(port=0)
+    try:
+        port = server.sockname[1]
+        response = await scrape(port)
+        assert response.startswith(b"HTTP/1.0 200 OK\r\n")
+        assert b'pyslac_matchings_attempted_total{evse_id="EVSE1"} 0' in response
+
+        # Scrapes within the render interval get the cached page
+        evse_slac_session.metrics.matchings_attempted = 1
+        response = await scrape(port)
+        assert b'pyslac_matchings_attempted_total{evse_id="EVSE1"} 0' in response
+        assert server.renderings == 1
+    finally:
+        await server.stop()
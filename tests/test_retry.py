@@ -0,0 +1,118 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from pyslac.enums import STATE_MATCHED, STATE_MATCHING
+from pyslac.retry import RetryPolicy
+from pyslac.session import SlacSessionController
+
+
+class VirtualClock:
+    """Clock whose time only advances when it is slept on or advanced"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.now += delay
+
+
+def test_should_retry():
+    clock = VirtualClock()
+    policy = RetryPolicy(
+        max_attempts=3,
+        pause=0.4,
+        repetition_window=10,
+        fail_fast_errors=(ValueError,),
+        clock=clock.time,
+    )
+    assert policy.should_retry(1, 0, asyncio.TimeoutError())
+    # Protocol errors are not retried
+    assert not policy.should_retry(1, 0, ValueError())
+    assert not policy.should_retry(3, 0)
+    # The next attempt would start after TT_matching_repetition
+    clock.now = 9.7
+    assert not policy.should_retry(1, 0)
+    clock.now = 9.6
+    assert policy.should_retry(1, 0)
+
+
+def failing_session(evse_slac_session, clock: VirtualClock, error: Exception):
+    """Session whose attempts fail with `error` after 3 s"""
+
+    async def evse_slac_parm():
+        evse_slac_session.state = STATE_MATCHING
+
+    async def atten_charac_routine():
+        clock.now += 3
+        raise error
+
+    evse_slac_session.evse_slac_parm = evse_slac_parm
+    evse_slac_session.atten_charac_routine = AsyncMock(side_effect=atten_charac_routine)
+    evse_slac_session.leave_logical_network_nowait = Mock()
+    return evse_slac_session
+
+
+@pytest.mark.asyncio
+async def test_matching_given_up_after_repetition_window(evse_slac_session):
+    clock = VirtualClock()
+    slac_session = failing_session(evse_slac_session, clock, asyncio.TimeoutError())
+    slac_session.retry_policy = RetryPolicy(
+        max_attempts=5, clock=clock.time, sleep=clock.sleep
+    )
+    controller = SlacSessionController()
+    controller.notify_matching_failed = AsyncMock()
+
+    await controller.start_matching(slac_session)
+
+    # Attempts start at 0, 3.4 and 6.8 s; a 4th one would start after 10 s
+    assert slac_session.atten_charac_routine.await_count == 3
+    assert clock.now == pytest.approx(9.8)
+    controller.notify_matching_failed.assert_awaited_once_with(slac_session.evse_id)
+    metrics = slac_session.metrics
+    assert metrics.matching_retries == 2
+    assert metrics.matchings_failed == 1
+    assert metrics.matching_times["given_up"].max == pytest.approx(9800)
+
+
+@pytest.mark.asyncio
+async def test_matching_fails_fast(evse_slac_session):
+    clock = VirtualClock()
+    slac_session = failing_session(evse_slac_session, clock, ValueError("run_id"))
+    slac_session.retry_policy = RetryPolicy(
+        fail_fast_errors=(ValueError,), clock=clock.time, sleep=clock.sleep
+    )
+    controller = SlacSessionController()
+    controller.notify_matching_failed = AsyncMock()
+
+    await controller.start_matching(slac_session)
+
+    assert slac_session.atten_charac_routine.await_count == 1
+    controller.notify_matching_failed.assert_awaited_once()
+    assert slac_session.metrics.matching_retries == 0
+
+
+@pytest.mark.asyncio
+async def test_matching_succeeds_after_retry(evse_slac_session):
+    clock = VirtualClock()
+    slac_session = failing_session(evse_slac_session, clock, asyncio.TimeoutError())
+
+    async def atten_charac_routine():
+        clock.now += 2
+        if slac_session.atten_charac_routine.await_count == 1:
+            raise asyncio.TimeoutError()
+        slac_session.state = STATE_MATCHED
+
+    slac_session.atten_charac_routine.side_effect = atten_charac_routine
+    slac_session.monitor_link = AsyncMock()
+    slac_session.retry_policy = RetryPolicy(clock=clock.time, sleep=clock.sleep)
+
+    await SlacSessionController().start_matching(slac_session)
+
+    # Time to success: two attempts of 2 s and the pause of TT_matching_rate
+    assert slac_session.metrics.matching_times["matched"].max == pytest.approx(4400)
+    assert slac_session.metrics.matchings_succeeded == 1
@@ -1,3 +1,5 @@
+import pytest
+
 from pyslac.enums import (
     BROADCAST_ADDR,
     CM_SET_CCO_CAPAB,
@@ -8,6 +10,9 @@ from pyslac.enums import (
     CM_SET_KEY_PRN,
     CM_SET_KEY_TYPE,
     CM_SET_KEY_YOUR_NONCE,
+    CM_VALIDATE_RESULT_READY,
+    CM_VALIDATE_RESULT_SUCCESS,
+    CM_VALIDATE_SIGNAL_TYPE,
     SLAC_APPLICATION_TYPE,
     SLAC_ATTEN_TIMEOUT,
     SLAC_MSOUNDS,
@@ -26,6 +31,8 @@ from pyslac.messages import (
     SlacParmCnf,
     SlacParmReq,
     StartAtennChar,
+    ValidateCnf,
+    ValidateReq,
 )
 
 PRE_PADDING = b"\x00" * 19
@@ -203,7 +210,7 @@ def test_atten_profile():
     atten_profile = AttenProfile.from_bytes(atten_profile_bytes)
 
     assert atten_profile.num_groups == num_groups
-    assert atten_profile.aag == aag_group
+    assert atten_profile.aag == bytes(aag_group)
     assert atten_profile.pev_mac == PEV_MAC
 
     #  AttenProfile Constructor
@@ -211,7 +218,7 @@ def test_atten_profile():
         pev_mac=PEV_MAC, aag=aag_group, num_groups=num_groups
     )
     assert atten_profile_req.num_groups == num_groups
-    assert atten_profile_req.aag == aag_group
+    assert atten_profile_req.aag == bytes(aag_group)
     assert atten_profile_req.pev_mac == PEV_MAC
 
 
@@ -244,7 +251,7 @@ def test_atten_char():
     assert atten_char.resp_id == source_id
     assert atten_char.num_sounds == SLAC_MSOUNDS
     assert atten_char.num_groups == num_groups
-    assert atten_char.aag == aag_group
+    assert atten_char.aag == bytes(aag_group)
 
     # Atten Characterisation Constructor
     atten_char_req = AtennChar(
@@ -264,7 +271,7 @@ def test_atten_char():
     assert atten_char_req.resp_id == resp_id
     assert atten_char_req.num_sounds == SLAC_MSOUNDS
     assert atten_char_req.num_groups == num_groups
-    assert atten_char_req.aag == aag_group
+    assert atten_char_req.aag == bytes(aag_group)
 
 
 def test_atten_char_resp():
@@ -312,6 +319,27 @@ def test_atten_char_resp():
     assert atten_char_resp_constr.result == result
 
 
+def test_validate_req():
+    validate_req_bytes = (
+        PRE_PADDING
+        + CM_VALIDATE_SIGNAL_TYPE.to_bytes(1, "big")
+        + b"\x09"
+        + CM_VALIDATE_RESULT_READY.to_bytes(1, "big")
+    )
+    validate_req = ValidateReq.from_bytes(validate_req_bytes)
+    assert validate_req == ValidateReq(timer=0x09)
+    assert validate_req.toggle_time == 1.0
+    assert PRE_PADDING + validate_req.pack_big() == validate_req_bytes
+    assert validate_req.pack_little() == b"\x01\x09\x00"
+
+
+def test_validate_cnf():
+    validate_cnf = ValidateCnf(result=CM_VALIDATE_RESULT_SUCCESS, toggle_num=3)
+    assert validate_cnf.pack_big() == b"\x00\x03\x02"
+    assert validate_cnf.pack_little() == b"\x02\x03\x00"
+    assert ValidateCnf.from_bytes(PRE_PADDING + validate_cnf.pack_big()) == validate_cnf
+
+
 def test_match_req():
     # Match Request from_bytes
     mvf_length = 0x003E
@@ -410,3 +438,19 @@ def test_match_conf():
     assert match_conf_req.nid == EVSE_NID
     assert match_conf_req.rsvd_2 == rsvd_2
     assert match_conf_req.nmk == EVSE_NMK
+
+
+def test_messages_are_slotted():
+    # Messages are created for every frame received, so they must not carry
+    # a per-instance __dict__
+    atten_profile = AttenProfile(pev_mac=PEV_MAC, aag=[20, 30, 10], num_groups=3)
+    match_req = MatchReq(pev_mac=PEV_MAC, evse_mac=EVSE_MAC, run_id=RUN_ID)
+    for message in [atten_profile, match_req]:
+        assert not hasattr(message, "__dict__")
+        with pytest.raises(AttributeError):
+            message.unknown_field = 0x00
+    # The AAG is kept as immutable bytes, regardless of the input type
+    assert isinstance(atten_profile.aag, bytes)
+    assert atten_profile == AttenProfile.from_bytes(
+        PRE_PADDING + atten_profile.pack_big()
+    )
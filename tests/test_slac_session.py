@@ -1,11 +1,14 @@
+import asyncio
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
+from pyslac.arbitration import ArbitrationLost, AttenuationArbiter
 from pyslac.enums import (
     BROADCAST_ADDR,
     CM_ATTEN_CHAR,
     CM_ATTEN_PROFILE,
+    CM_MNBC_SOUND,
     CM_SET_CCO_CAPAB,
     CM_SET_KEY,
     CM_SET_KEY_MY_NONCE,
@@ -16,6 +19,10 @@ from pyslac.enums import (
     CM_SLAC_MATCH,
     CM_SLAC_PARM,
     CM_START_ATTEN_CHAR,
+    CM_VALIDATE,
+    CM_VALIDATE_RESULT_NOT_REQUIRED,
+    CM_VALIDATE_RESULT_READY,
+    CM_VALIDATE_RESULT_SUCCESS,
     EVSE_PLC_MAC,
     MMTYPE_CNF,
     MMTYPE_IND,
@@ -31,21 +38,36 @@ from pyslac.enums import (
     STATE_MATCHED,
     STATE_MATCHING,
     STATE_UNMATCHED,
+    VS_NW_INFO,
+    FramesSizes,
+    SlacEvseState,
+)
+from pyslac.fragmentation import fragment_frame
+from pyslac.layer_2_headers import (
+    EthernetHeader,
+    HomePlugHeader,
+    HomePlugVendorHeader,
 )
-from pyslac.layer_2_headers import EthernetHeader, HomePlugHeader
 from pyslac.messages import AttenProfile  # MnbcSound,
 from pyslac.messages import (
     AtennChar,
     AtennCharRsp,
     MatchCnf,
     MatchReq,
+    MnbcSound,
     SetKeyCnf,
     SetKeyReq,
     SlacParmCnf,
     SlacParmReq,
     StartAtennChar,
+    ValidateCnf,
+    ValidateReq,
 )
+from pyslac.session import SlacEvent, SlacEvseSession, SlacSessionController
+from pyslac.state_store import SessionStateStore
+from pyslac.utils import cancel_task
 from pyslac.utils import half_round as hw
+from pyslac.vendor_messages import NetworkInfo, VsNwInfoCnf
 
 PEV_MAC = b"\xBB" * 6
 RUN_ID = b"\xFA" * 8
@@ -89,19 +111,118 @@ async def test_set_key(evse_slac_session, dummy_config, evse_mac):
         + homeplug_header.pack_big()
         + key_cnf_payload.pack_big()
     )
+    # VS_NW_INFO.CNF reporting that the PLC node joined the new network
+    nw_info_cnf_frame = nw_info_cnf(
+        evse_mac, NetworkInfo(QUALCOMM_NID, 1, 1, 0x02, EVSE_PLC_MAC, 1)
+    )
     # This first patch is to change the original SETTLE_TIME of 10 sec
-    # so that during tests we dont wait so long
+    # so that, if the readiness probe fails, the test does not wait so long
     evse_slac_session.send_frame = AsyncMock()
     with patch("pyslac.session.SLAC_SETTLE_TIME", 0.5):
-        with patch("pyslac.session.readeth", new=AsyncMock(return_value=key_cnf_frame)):
-            with patch("pyslac.session.urandom", new=Mock(return_value=QUALCOMM_NMK)):
+        with patch(
+            "pyslac.session.readeth",
+            new=AsyncMock(side_effect=[key_cnf_frame, nw_info_cnf_frame]),
+        ):
+            evse_slac_session.key_pool.clear()
+            with patch("pyslac.key_pool.urandom", new=Mock(return_value=QUALCOMM_NMK)):
                 data_rcvd = await evse_slac_session.evse_set_key()
 
                 assert data_rcvd == key_cnf_frame
+                assert evse_slac_session.nid == QUALCOMM_NID
+
+                # check that the first frame sent was the SetKey Request,
+                # followed by a single VS_NW_INFO.REQ of the readiness probe
+                assert evse_slac_session.send_frame.call_count == 2
+                assert evse_slac_session.send_frame.call_args_list[0].args == (
+                    key_req_frame,
+                )
 
-                # check that what was sent through the send_rcv command was the
-                # SetKey Request
-                evse_slac_session.send_frame.assert_called_with(key_req_frame)
+
+def nw_info_cnf(evse_mac: bytes, *networks: NetworkInfo) -> bytes:
+    return (
+        EthernetHeader(dst_mac=evse_mac, src_mac=EVSE_PLC_MAC).pack_big()
+        + HomePlugVendorHeader(VS_NW_INFO | MMTYPE_CNF).pack_big()
+        + VsNwInfoCnf(networks=networks).pack_big()
+    )
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_plc_readiness_timeout(evse_slac_session, evse_mac):
+    """
+    Tests that the readiness probe gives up once the timeout expires, if the
+    PLC node never reports the NID as active
+    """
+    evse_slac_session.send_frame = AsyncMock()
+    with patch(
+        "pyslac.session.readeth", new=AsyncMock(return_value=nw_info_cnf(evse_mac))
+    ):
+        with patch("pyslac.session.SLAC_READY_POLL_INTERVAL", 0.05):
+            assert not await evse_slac_session.wait_plc_ready(QUALCOMM_NID, timeout=0.2)
+    assert evse_slac_session.send_frame.call_count > 1
+
+
+def set_key_cnf(evse_mac: bytes) -> bytes:
+    return (
+        EthernetHeader(dst_mac=evse_mac, src_mac=EVSE_PLC_MAC).pack_big()
+        + HomePlugHeader(CM_SET_KEY | MMTYPE_CNF).pack_big()
+        + SetKeyCnf(
+            result=0x00,
+            my_nonce=CM_SET_KEY_MY_NONCE,
+            your_nonce=CM_SET_KEY_YOUR_NONCE,
+            pid=CM_SET_KEY_PID,
+            prn=CM_SET_KEY_PRN,
+            pmn=CM_SET_KEY_PMN,
+            cco_capab=CM_SET_CCO_CAPAB,
+        ).pack_big()
+    )
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_set_key_not_applied(evse_slac_session, evse_mac, tmp_path):
+    """
+    Tests that a key the PLC node does not report as active is neither used
+    nor saved: the previous key applies or, without one, the set key fails
+    """
+    evse_slac_session.state_store = SessionStateStore(str(tmp_path), "EVSE1")
+    evse_slac_session.send_frame = AsyncMock()
+    frames = [set_key_cnf(evse_mac)] + [nw_info_cnf(evse_mac)] * 1000
+
+    with patch("pyslac.session.readeth", new=AsyncMock(side_effect=frames)):
+        with pytest.raises(TimeoutError):
+            await evse_slac_session.evse_set_key()
+    assert (evse_slac_session.nmk, evse_slac_session.nid) == (b"", b"")
+
+    evse_slac_session.nmk, evse_slac_session.nid = QUALCOMM_NMK, QUALCOMM_NID
+    with patch("pyslac.session.readeth", new=AsyncMock(side_effect=frames)):
+        await evse_slac_session.evse_set_key()
+    await evse_slac_session.wait_state_saved()
+
+    assert (evse_slac_session.nmk, evse_slac_session.nid) == (
+        QUALCOMM_NMK,
+        QUALCOMM_NID,
+    )
+    assert evse_slac_session.state_store.load() is None
+
+
+@pytest.mark.asyncio
+async def test_set_key_cnf_invalid(evse_slac_session, evse_mac):
+    """
+    Tests that the readiness probe is skipped if the CM_SET_KEY.CNF can not be
+    decoded, as the previous key applies
+    """
+    evse_slac_session.nmk, evse_slac_session.nid = QUALCOMM_NMK, QUALCOMM_NID
+    evse_slac_session.send_frame = AsyncMock()
+    with patch(
+        "pyslac.session.readeth", new=AsyncMock(return_value=set_key_cnf(evse_mac))
+    ):
+        with patch.object(SetKeyCnf, "from_bytes", side_effect=ValueError("Bad")):
+            await evse_slac_session.evse_set_key()
+
+    assert evse_slac_session.nid == QUALCOMM_NID
+    # Only the CM_SET_KEY.REQ was sent, no VS_NW_INFO.REQ
+    assert evse_slac_session.send_frame.call_count == 1
 
 
 @pytest.mark.asyncio
@@ -309,20 +430,6 @@ async def test_cm_atten_charac(evse_slac_session, evse_mac):
             await evse_slac_session.cm_atten_char()
             assert evse_slac_session.state == STATE_UNMATCHED
 
-    # Force an Error by changing the run_id
-    atten_car_rsp.run_id = b"\xAA" * 8
-    atten_car_rsp_frame = (
-        ethernet_header.pack_big()
-        + homeplug_header.pack_big()
-        + atten_car_rsp.pack_big()
-    )
-    with patch(
-        "pyslac.session.readeth", new=AsyncMock(return_value=atten_car_rsp_frame)
-    ):
-        with pytest.raises(ValueError):
-            await evse_slac_session.cm_atten_char()
-            assert evse_slac_session.state == STATE_UNMATCHED
-
 
 @pytest.mark.asyncio
 async def test_slac_match(evse_slac_session, evse_mac):
@@ -376,8 +483,786 @@ async def test_slac_match(evse_slac_session, evse_mac):
         evse_slac_session.send_frame.assert_called_with(frame_to_send)
         assert evse_slac_session.state == STATE_MATCHED
 
-        #  Force an Error
-        with pytest.raises(ValueError):
-            # force a different run id to trigger an error
-            evse_slac_session.run_id = b"\xAA" * 8
-            await evse_slac_session.cm_slac_match()
+
+@pytest.mark.asyncio
+async def test_rcv_frame_reassembles_fragments(evse_slac_session, evse_mac):
+    """
+    Tests that a fragmented MME is only handed over once complete
+    """
+    ethernet_header = EthernetHeader(dst_mac=evse_mac, src_mac=PEV_MAC)
+    homeplug_header = HomePlugHeader(CM_SLAC_MATCH | MMTYPE_REQ)
+    slac_match_req = MatchReq(pev_mac=PEV_MAC, evse_mac=evse_mac, run_id=RUN_ID)
+    slac_match_req_frame = (
+        ethernet_header.pack_big()
+        + homeplug_header.pack_big()
+        + slac_match_req.pack_big()
+    )
+    fragments = fragment_frame(slac_match_req_frame, fmsn=3, max_fragment_size=30)
+    evse_slac_session.reassembler.max_fragment_size = 30
+    # Fragment number 3 of a MME with 3 fragments
+    invalid_fragment = bytearray(fragments[0])
+    invalid_fragment[17] = 0x32
+
+    with patch(
+        "pyslac.session.readeth",
+        new=AsyncMock(side_effect=[bytes(invalid_fragment)] + fragments),
+    ):
+        data_rcvd = await evse_slac_session.rcv_frame(
+            rcv_frame_size=FramesSizes.CM_SLAC_MATCH_REQ, timeout=1
+        )
+    assert len(fragments) == 3
+    assert data_rcvd == slac_match_req_frame
+    assert evse_slac_session.metrics.socket_drops == {"reassembly": 1}
+
+
+@pytest.mark.asyncio
+async def test_malformed_frame_is_rejected(evse_slac_session, evse_mac):
+    """
+    Tests that a truncated frame is dropped before being decoded, instead
+    of aborting the SLAC phase
+    """
+    ethernet_header = EthernetHeader(dst_mac=evse_mac, src_mac=PEV_MAC)
+    homeplug_header = HomePlugHeader(CM_SLAC_MATCH | MMTYPE_REQ)
+    slac_match_req = MatchReq(pev_mac=PEV_MAC, evse_mac=evse_mac, run_id=RUN_ID)
+    slac_match_req_frame = (
+        ethernet_header.pack_big()
+        + homeplug_header.pack_big()
+        + slac_match_req.pack_big()
+    )
+    frames = [slac_match_req_frame[:40], slac_match_req_frame]
+    evse_slac_session.send_frame = AsyncMock()
+    evse_slac_session.run_id = RUN_ID
+
+    with patch("pyslac.session.readeth", new=AsyncMock(side_effect=frames)):
+        await evse_slac_session.cm_slac_match()
+
+    assert evse_slac_session.state == STATE_MATCHED
+    assert evse_slac_session.frame_validator.rejected == 1
+    assert evse_slac_session.metrics.socket_drops == {"malformed": 1}
+
+
+def build_frame(dst_mac: bytes, src_mac: bytes, mm_type: int, message) -> bytes:
+    return (
+        EthernetHeader(dst_mac=dst_mac, src_mac=src_mac).pack_big()
+        + HomePlugHeader(mm_type).pack_big()
+        + message.pack_big()
+    )
+
+
+def sound_frames(evse_mac: bytes, cnt: int):
+    return [
+        build_frame(
+            BROADCAST_ADDR,
+            PEV_MAC,
+            CM_MNBC_SOUND | MMTYPE_IND,
+            MnbcSound(cnt=cnt, run_id=RUN_ID),
+        ),
+        build_frame(
+            evse_mac,
+            EVSE_PLC_MAC,
+            CM_ATTEN_PROFILE | MMTYPE_IND,
+            AttenProfile(pev_mac=PEV_MAC, aag=[30] * SLAC_GROUPS),
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_state_machine_tolerates_reordering(evse_slac_session, evse_mac):
+    """
+    Tests that frames arriving out of the expected order (sounds before
+    CM_START_ATTEN_CHAR.IND, retransmissions and late sounds) do not abort
+    the matching process
+    """
+    start_atten_char = build_frame(
+        BROADCAST_ADDR,
+        PEV_MAC,
+        CM_START_ATTEN_CHAR | MMTYPE_IND,
+        StartAtennChar(
+            num_sounds=3,
+            time_out=SLAC_ATTEN_TIMEOUT,
+            forwarding_sta=PEV_MAC,
+            run_id=RUN_ID,
+        ),
+    )
+    atten_char_rsp = build_frame(
+        evse_mac,
+        PEV_MAC,
+        CM_ATTEN_CHAR | MMTYPE_RSP,
+        AtennCharRsp(
+            source_address=PEV_MAC,
+            run_id=RUN_ID,
+            source_id=0x00,
+            resp_id=0x00,
+            result=0x00,
+        ),
+    )
+    slac_match_req = build_frame(
+        evse_mac,
+        PEV_MAC,
+        CM_SLAC_MATCH | MMTYPE_REQ,
+        MatchReq(pev_mac=PEV_MAC, evse_mac=evse_mac, run_id=RUN_ID),
+    )
+    frames = (
+        # The first sound arrives before CM_START_ATTEN_CHAR.IND
+        sound_frames(evse_mac, 2)
+        + [start_atten_char]
+        + sound_frames(evse_mac, 1)
+        # Retransmission of CM_START_ATTEN_CHAR.IND during the sounds
+        + [start_atten_char]
+        + sound_frames(evse_mac, 0)
+        # A late sound and a retransmission after the sounds are complete
+        + sound_frames(evse_mac, 0)
+        + [atten_char_rsp, atten_char_rsp, slac_match_req]
+    )
+    evse_slac_session.send_frame = AsyncMock()
+    evse_slac_session.evse_mac = evse_mac
+    evse_slac_session.pev_mac = PEV_MAC
+    evse_slac_session.run_id = RUN_ID
+    evse_slac_session.nid = QUALCOMM_NID
+    evse_slac_session.nmk = QUALCOMM_NMK
+
+    with patch("pyslac.session.readeth", new=AsyncMock(side_effect=frames)):
+        await evse_slac_session.atten_charac_routine()
+
+    assert evse_slac_session.state == STATE_MATCHED
+    assert evse_slac_session.fsm_state == SlacEvseState.MATCHED
+    assert evse_slac_session.num_start_attn_rcvd == 2
+    assert evse_slac_session.num_expected_sounds == 3
+    assert evse_slac_session.num_total_sounds == 3
+    assert evse_slac_session.aag == [30] * SLAC_GROUPS
+    sent_mm_types = [
+        HomePlugHeader.from_bytes(call.args[0]).mm_type
+        for call in evse_slac_session.send_frame.call_args_list
+    ]
+    assert sent_mm_types == [CM_ATTEN_CHAR | MMTYPE_IND, CM_SLAC_MATCH | MMTYPE_CNF]
+
+    # The late frames are counted as discarded by the phase they arrived in
+    metrics = evse_slac_session.metrics
+    assert set(metrics.phase_durations) == {
+        "WAIT_START_ATTEN_CHAR",
+        "SOUNDING",
+        "WAIT_ATTEN_CHAR_RSP",
+        "WAIT_SLAC_MATCH_REQ",
+    }
+    assert set(metrics.response_times) == {"CM_ATTEN_CHAR.IND", "CM_SLAC_MATCH.CNF"}
+    assert metrics.frames_processed == {
+        "WAIT_START_ATTEN_CHAR": 1,
+        "SOUNDING": 8,
+        "WAIT_ATTEN_CHAR_RSP": 1,
+        "WAIT_SLAC_MATCH_REQ": 1,
+    }
+    assert metrics.frames_discarded == {
+        "WAIT_ATTEN_CHAR_RSP": 2,
+        "WAIT_SLAC_MATCH_REQ": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_frames_of_another_run_ignored(evse_slac_session, evse_mac):
+    """
+    Tests that a CM_ATTEN_CHAR.RSP and a CM_SLAC_MATCH.REQ with a stale or
+    foreign run_id are discarded and the matching process still completes
+    """
+    other_run_id = b"\xAA" * 8
+
+    def atten_char_rsp(run_id: bytes) -> bytes:
+        return build_frame(
+            evse_mac,
+            PEV_MAC,
+            CM_ATTEN_CHAR | MMTYPE_RSP,
+            AtennCharRsp(
+                source_address=PEV_MAC,
+                run_id=run_id,
+                source_id=0x00,
+                resp_id=0x00,
+                result=0x00,
+            ),
+        )
+
+    def slac_match_req(run_id: bytes) -> bytes:
+        return build_frame(
+            evse_mac,
+            PEV_MAC,
+            CM_SLAC_MATCH | MMTYPE_REQ,
+            MatchReq(pev_mac=PEV_MAC, evse_mac=evse_mac, run_id=run_id),
+        )
+
+    frames = [
+        atten_char_rsp(other_run_id),
+        atten_char_rsp(RUN_ID),
+        slac_match_req(other_run_id),
+        slac_match_req(RUN_ID),
+    ]
+    evse_slac_session.send_frame = AsyncMock()
+    evse_slac_session.evse_mac = evse_mac
+    evse_slac_session.pev_mac = PEV_MAC
+    evse_slac_session.run_id = RUN_ID
+    evse_slac_session.nid = QUALCOMM_NID
+    evse_slac_session.nmk = QUALCOMM_NMK
+    evse_slac_session.num_total_sounds = SLAC_MSOUNDS
+    evse_slac_session.num_groups = SLAC_GROUPS
+    evse_slac_session.aag = [30] * SLAC_GROUPS
+
+    with patch("pyslac.session.readeth", new=AsyncMock(side_effect=frames)):
+        await evse_slac_session.cm_atten_char()
+        await evse_slac_session.cm_slac_match()
+
+    assert evse_slac_session.state == STATE_MATCHED
+    assert evse_slac_session.fsm_state == SlacEvseState.MATCHED
+    match_cnf = MatchCnf.from_bytes(evse_slac_session.send_frame.call_args.args[0])
+    assert match_cnf.run_id == RUN_ID
+    assert evse_slac_session.metrics.frames_discarded == {
+        "WAIT_ATTEN_CHAR_RSP": 1,
+        "WAIT_SLAC_MATCH_REQ": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_slac_parm_req_retransmission(evse_slac_session, evse_mac):
+    """
+    Tests that CM_SLAC_PARM.CNF is sent again if the EV repeats
+    CM_SLAC_PARM.REQ, while waiting for CM_START_ATTEN_CHAR.IND
+    """
+    slac_parm_req = build_frame(
+        evse_mac, PEV_MAC, CM_SLAC_PARM | MMTYPE_REQ, SlacParmReq(run_id=RUN_ID)
+    )
+    start_atten_char = build_frame(
+        BROADCAST_ADDR,
+        PEV_MAC,
+        CM_START_ATTEN_CHAR | MMTYPE_IND,
+        StartAtennChar(
+            num_sounds=SLAC_MSOUNDS,
+            time_out=SLAC_ATTEN_TIMEOUT,
+            forwarding_sta=PEV_MAC,
+            run_id=RUN_ID,
+        ),
+    )
+    evse_slac_session.send_frame = AsyncMock()
+    frames = [slac_parm_req, slac_parm_req, start_atten_char]
+
+    with patch("pyslac.session.readeth", new=AsyncMock(side_effect=frames)):
+        await evse_slac_session.evse_slac_parm()
+        await evse_slac_session.cm_start_atten_charac()
+
+    assert evse_slac_session.send_frame.call_count == 2
+    assert evse_slac_session.fsm_state == SlacEvseState.SOUNDING
+    assert evse_slac_session.num_expected_sounds == SLAC_MSOUNDS
+
+
+@pytest.mark.asyncio
+async def test_start_atten_char_of_another_run_ignored(evse_slac_session, evse_mac):
+    """
+    Tests that a CM_START_ATTEN_CHAR.IND of a run whose CM_SLAC_PARM.REQ was
+    not heard, e.g. from an EV plugged into a neighbour EVSE, is ignored
+    """
+
+    def start_atten_char(run_id: bytes) -> bytes:
+        return build_frame(
+            BROADCAST_ADDR,
+            PEV_MAC,
+            CM_START_ATTEN_CHAR | MMTYPE_IND,
+            StartAtennChar(
+                num_sounds=SLAC_MSOUNDS,
+                time_out=SLAC_ATTEN_TIMEOUT,
+                forwarding_sta=PEV_MAC,
+                run_id=run_id,
+            ),
+        )
+
+    evse_slac_session.run_id = RUN_ID
+    frames = [start_atten_char(b"\x0A" * 8), start_atten_char(RUN_ID)]
+
+    with patch("pyslac.session.readeth", new=AsyncMock(side_effect=frames)):
+        await evse_slac_session.cm_start_atten_charac()
+
+    assert evse_slac_session.fsm_state == SlacEvseState.SOUNDING
+    assert evse_slac_session.num_start_attn_rcvd == 1
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_sounding_timer(evse_slac_session, evse_mac):
+    """
+    Tests that the attenuation is averaged with the sounds received once the
+    sounding timer expires, and that a timeout is raised if none was received
+    """
+    evse_slac_session.pev_mac = PEV_MAC
+    evse_slac_session.run_id = RUN_ID
+    evse_slac_session.num_expected_sounds = SLAC_MSOUNDS
+    evse_slac_session.time_out_ms = 100
+    frames = sound_frames(evse_mac, 9)
+
+    async def readeth(*args):
+        if frames:
+            return frames.pop(0)
+        await asyncio.sleep(1)
+
+    with patch("pyslac.session.readeth", new=readeth):
+        await evse_slac_session.cm_sounds_loop()
+        assert evse_slac_session.num_total_sounds == 1
+        assert evse_slac_session.aag == [30] * SLAC_GROUPS
+        assert evse_slac_session.fsm_state == SlacEvseState.WAIT_ATTEN_CHAR_RSP
+
+        with pytest.raises(asyncio.TimeoutError):
+            await evse_slac_session.cm_sounds_loop()
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_init_plc_nodes(dummy_config, evse_mac):
+    """
+    Tests that the PLC nodes are initialized concurrently and that the failure
+    or timeout of one EVSE does not affect the others
+    """
+    evses_params = [
+        {"evse_id": "EVSE_OK", "network_interface": "eth0"},
+        {"evse_id": "EVSE_ERROR", "network_interface": "eth1"},
+        {"evse_id": "EVSE_TIMEOUT", "network_interface": "eth2"},
+        {"evse_id": "EVSE_OK_2", "network_interface": "eth3"},
+        {"evse_id": "EVSE_MALFORMED", "network_interface": "eth4"},
+    ]
+
+    async def evse_set_key(slac_session):
+        if slac_session.evse_id == "EVSE_ERROR":
+            raise ValueError("SetKeyCnf data parsing into the class failed")
+        if slac_session.evse_id == "EVSE_MALFORMED":
+            raise IndexError("index out of range")
+        await asyncio.sleep(10 if slac_session.evse_id == "EVSE_TIMEOUT" else 0.1)
+
+    sockets = {}
+
+    def create_socket(iface, port):
+        sockets[iface] = Mock()
+        return sockets[iface]
+
+    with patch("pyslac.session.get_if_hwaddr", new=Mock(return_value=evse_mac)):
+        with patch("pyslac.session.create_socket", new=create_socket):
+            with patch.object(SlacEvseSession, "evse_set_key", new=evse_set_key):
+                controller = SlacSessionController()
+                loop = asyncio.get_event_loop()
+                time_start = loop.time()
+                results = await controller.init_plc_nodes(
+                    evses_params, dummy_config, timeout=0.3
+                )
+                # The EVSEs were not initialized one after another
+                assert loop.time() - time_start < 0.5
+
+    assert [result.evse_id for result in results] == [
+        params["evse_id"] for params in evses_params
+    ]
+    assert [result.is_ready for result in results] == [True, False, False, True, False]
+    assert results[0].session.iface == "eth0"
+    assert isinstance(results[1].error, ValueError)
+    assert isinstance(results[2].error, asyncio.TimeoutError)
+    assert results[2].duration >= 0.3
+    assert isinstance(results[4].error, IndexError)
+    # The sockets of the sessions that did not come up are closed
+    assert [
+        sockets[params["network_interface"]].close.called for params in evses_params
+    ] == [False, True, True, False, True]
+    # Only the sessions that came up are handled by the controller
+    assert set(controller.get_metrics()) == {"EVSE_OK", "EVSE_OK_2"}
+
+
+@pytest.mark.asyncio
+async def test_key_rotation_in_background(evse_slac_session):
+    """
+    Tests that the key is set in the background once a session ends and that
+    a plug-in during the rotation waits for it
+    """
+    set_key_done = asyncio.Event()
+
+    async def evse_set_key():
+        await set_key_done.wait()
+
+    evse_slac_session.evse_set_key = evse_set_key
+    evse_slac_session.key_pool.clear()
+    task = evse_slac_session.leave_logical_network_nowait()
+    assert evse_slac_session.state == STATE_UNMATCHED
+    assert not task.done()
+
+    wait_task = asyncio.create_task(evse_slac_session.wait_key_rotation())
+    await asyncio.sleep(0.05)
+    assert not wait_task.done()
+    set_key_done.set()
+    await wait_task
+
+    # The pool was filled again after the rotation
+    assert len(evse_slac_session.key_pool) == evse_slac_session.key_pool.size
+    # A plug-in after the rotation does not wait
+    await evse_slac_session.wait_key_rotation()
+    stats = evse_slac_session.key_rotation_stats
+    assert stats.rotations == 1
+    assert stats.failed_rotations == 0
+    assert stats.plugins == 2
+    assert stats.plugins_waited == 1
+    assert stats.wait_ratio == 0.5
+    assert stats.total_wait_time > 0
+
+
+@pytest.mark.asyncio
+async def test_monitor_link(evse_slac_session):
+    """
+    Tests that the interval between polls backs off while the link is active
+    and that the link is lost after LINK_MONITOR_MAX_FAILURES failed polls
+    """
+    polls = [True, True, True, False, True, False, False, False]
+    evse_slac_session.is_link_status_active = AsyncMock(side_effect=polls)
+    sleep = AsyncMock()
+    with patch("pyslac.session.asyncio.sleep", new=sleep):
+        with patch("pyslac.session.LINK_MONITOR_MIN_INTERVAL", 1):
+            with patch("pyslac.session.LINK_MONITOR_MAX_INTERVAL", 4):
+                await evse_slac_session.monitor_link()
+
+    intervals = [call.args[0] for call in sleep.call_args_list]
+    assert intervals == [1, 2, 4, 4, 1, 2, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_link_lost_after_match(evse_slac_session):
+    """
+    Tests that, once the link is lost after the match, the controller is
+    notified and the session leaves the logical network
+    """
+
+    async def evse_slac_parm():
+        evse_slac_session.state = STATE_MATCHING
+
+    async def atten_charac_routine():
+        evse_slac_session.state = STATE_MATCHED
+
+    evse_slac_session.evse_slac_parm = evse_slac_parm
+    evse_slac_session.atten_charac_routine = atten_charac_routine
+    evse_slac_session.monitor_link = AsyncMock()
+    evse_slac_session.leave_logical_network_nowait = Mock()
+    controller = SlacSessionController()
+    controller.notify_link_lost = AsyncMock()
+
+    await controller.start_matching(evse_slac_session)
+
+    evse_slac_session.monitor_link.assert_awaited_once()
+    controller.notify_link_lost.assert_awaited_once_with(evse_slac_session.evse_id)
+    evse_slac_session.leave_logical_network_nowait.assert_called_once()
+    assert evse_slac_session.metrics.matchings_succeeded == 1
+
+
+@pytest.mark.asyncio
+async def test_attenuation_arbitration(evse_slac_session, evse_mac):
+    """
+    Tests that the session stops before CM_ATTEN_CHAR.IND if another EVSE
+    heard the EV with a lower attenuation
+    """
+    arbiter = AttenuationArbiter(window=1)
+    evse_slac_session.arbiter = arbiter
+    evse_slac_session.pev_mac = PEV_MAC
+    evse_slac_session.run_id = RUN_ID
+    evse_slac_session.num_expected_sounds = 1
+    evse_slac_session.time_out_ms = 1000
+    arbiter.join(evse_slac_session.evse_id, RUN_ID, PEV_MAC)
+    arbiter.join("OTHER_EVSE", RUN_ID, PEV_MAC)
+
+    with patch(
+        "pyslac.session.readeth", new=AsyncMock(side_effect=sound_frames(evse_mac, 0))
+    ):
+        results = await asyncio.gather(
+            evse_slac_session.cm_sounds_loop(),
+            arbiter.submit(
+                "OTHER_EVSE", RUN_ID, PEV_MAC, [20] * SLAC_GROUPS, SLAC_GROUPS
+            ),
+            return_exceptions=True,
+        )
+
+    assert isinstance(results[0], ArbitrationLost)
+    assert results[1] is True
+
+
+@pytest.mark.asyncio
+async def test_arbitration_lost_does_not_consume_retries(evse_slac_session):
+    """
+    Tests that a session that lost the arbitration waits for the next
+    CM_SLAC_PARM.REQ without counting the attempt as a failed one
+    """
+
+    async def evse_slac_parm():
+        evse_slac_session.state = STATE_MATCHING
+
+    async def atten_charac_routine():
+        if atten_charac_routine.lost:
+            evse_slac_session.state = STATE_MATCHED
+            return
+        atten_charac_routine.lost = True
+        raise ArbitrationLost("Lost")
+
+    atten_charac_routine.lost = False
+    evse_slac_session.evse_slac_parm = evse_slac_parm
+    evse_slac_session.atten_charac_routine = AsyncMock(side_effect=atten_charac_routine)
+    evse_slac_session.monitor_link = AsyncMock()
+    evse_slac_session.leave_logical_network_nowait = Mock()
+    controller = SlacSessionController()
+    controller.notify_matching_failed = AsyncMock()
+
+    await controller.start_matching(evse_slac_session, number_of_retries=1)
+
+    assert evse_slac_session.atten_charac_routine.await_count == 2
+    controller.notify_matching_failed.assert_not_awaited()
+    assert evse_slac_session.metrics.matchings_attempted == 2
+    assert evse_slac_session.metrics.matchings_succeeded == 1
+    assert evse_slac_session.metrics.matchings_failed == 0
+
+
+@pytest.mark.asyncio
+async def test_candidate_run_is_matched(evse_slac_session, evse_mac):
+    """
+    Tests that, if the first CM_SLAC_PARM.REQ came from a neighbour EV, the
+    request of the EV plugged into the EVSE is also answered and its run is
+    matched once it sends CM_SLAC_MATCH.REQ, without a new matching attempt
+    """
+    neighbour_mac = b"\xCC" * 6
+    neighbour_run_id = b"\x0A" * 8
+
+    def start_atten_char(pev_mac: bytes, run_id: bytes) -> bytes:
+        return build_frame(
+            BROADCAST_ADDR,
+            pev_mac,
+            CM_START_ATTEN_CHAR | MMTYPE_IND,
+            StartAtennChar(
+                num_sounds=1,
+                time_out=SLAC_ATTEN_TIMEOUT,
+                forwarding_sta=pev_mac,
+                run_id=run_id,
+            ),
+        )
+
+    def atten_char_rsp(pev_mac: bytes, run_id: bytes) -> bytes:
+        return build_frame(
+            evse_mac,
+            pev_mac,
+            CM_ATTEN_CHAR | MMTYPE_RSP,
+            AtennCharRsp(
+                source_address=pev_mac,
+                run_id=run_id,
+                source_id=0x00,
+                resp_id=0x00,
+                result=0x00,
+            ),
+        )
+
+    neighbour_sound = build_frame(
+        evse_mac,
+        EVSE_PLC_MAC,
+        CM_ATTEN_PROFILE | MMTYPE_IND,
+        AttenProfile(pev_mac=neighbour_mac, aag=[50] * SLAC_GROUPS),
+    )
+    frames = [
+        build_frame(
+            BROADCAST_ADDR,
+            PEV_MAC,
+            CM_SLAC_PARM | MMTYPE_REQ,
+            SlacParmReq(run_id=RUN_ID),
+        ),
+        start_atten_char(neighbour_mac, neighbour_run_id),
+        start_atten_char(PEV_MAC, RUN_ID),
+        neighbour_sound,
+        *sound_frames(evse_mac, 0),
+        atten_char_rsp(neighbour_mac, neighbour_run_id),
+        atten_char_rsp(PEV_MAC, RUN_ID),
+        build_frame(
+            evse_mac,
+            PEV_MAC,
+            CM_SLAC_MATCH | MMTYPE_REQ,
+            MatchReq(pev_mac=PEV_MAC, evse_mac=evse_mac, run_id=RUN_ID),
+        ),
+    ]
+    evse_slac_session.send_frame = AsyncMock()
+    evse_slac_session.evse_mac = evse_mac
+    evse_slac_session.pev_mac = neighbour_mac
+    evse_slac_session.run_id = neighbour_run_id
+    evse_slac_session.nid = QUALCOMM_NID
+    evse_slac_session.nmk = QUALCOMM_NMK
+
+    with patch("pyslac.session.readeth", new=AsyncMock(side_effect=frames)):
+        await evse_slac_session.atten_charac_routine()
+
+    assert evse_slac_session.state == STATE_MATCHED
+    assert evse_slac_session.run_id == RUN_ID
+    assert evse_slac_session.pev_mac == PEV_MAC
+    assert evse_slac_session.aag == [30] * SLAC_GROUPS
+    assert not evse_slac_session.candidates
+    sent = [
+        (
+            HomePlugHeader.from_bytes(call.args[0]).mm_type,
+            EthernetHeader.from_bytes(call.args[0]).dst_mac,
+        )
+        for call in evse_slac_session.send_frame.call_args_list
+    ]
+    assert sorted(sent) == sorted(
+        [
+            (CM_SLAC_PARM | MMTYPE_CNF, PEV_MAC),
+            (CM_ATTEN_CHAR | MMTYPE_IND, neighbour_mac),
+            (CM_ATTEN_CHAR | MMTYPE_IND, PEV_MAC),
+            (CM_SLAC_MATCH | MMTYPE_CNF, PEV_MAC),
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_slac_restarted_by_the_ev(evse_slac_session, evse_mac):
+    """
+    Tests that a CM_SLAC_PARM.REQ with a new run_id from the EV followed
+    makes the session follow the new run
+    """
+    evse_slac_session.send_frame = AsyncMock()
+    evse_slac_session.evse_mac = evse_mac
+    evse_slac_session.pev_mac = PEV_MAC
+    evse_slac_session.run_id = b"\x0A" * 8
+    frames = [
+        build_frame(
+            BROADCAST_ADDR,
+            PEV_MAC,
+            CM_SLAC_PARM | MMTYPE_REQ,
+            SlacParmReq(run_id=RUN_ID),
+        ),
+        build_frame(
+            BROADCAST_ADDR,
+            PEV_MAC,
+            CM_START_ATTEN_CHAR | MMTYPE_IND,
+            StartAtennChar(
+                num_sounds=1,
+                time_out=SLAC_ATTEN_TIMEOUT,
+                forwarding_sta=PEV_MAC,
+                run_id=RUN_ID,
+            ),
+        ),
+        *sound_frames(evse_mac, 0),
+    ]
+    with patch("pyslac.session.readeth", new=AsyncMock(side_effect=frames)):
+        await evse_slac_session.run_state_machine(
+            SlacEvseState.SOUNDING, SlacEvseState.WAIT_ATTEN_CHAR_RSP
+        )
+
+    assert evse_slac_session.run_id == RUN_ID
+    assert not evse_slac_session.candidates
+    # The sounding started again with the sounds of the new run
+    assert evse_slac_session.num_total_sounds == 1
+    assert evse_slac_session.fsm_state == SlacEvseState.WAIT_ATTEN_CHAR_RSP
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_validation(evse_slac_session, evse_mac):
+    """
+    Tests the optional validation step: the EVSE gets ready, counts the CP
+    toggles reported to the controller while the EV toggles and sends their
+    number before the EV requests the match
+    """
+    frames = [
+        build_frame(evse_mac, PEV_MAC, CM_VALIDATE | MMTYPE_REQ, ValidateReq()),
+        build_frame(evse_mac, PEV_MAC, CM_VALIDATE | MMTYPE_REQ, ValidateReq(timer=1)),
+        build_frame(
+            evse_mac,
+            PEV_MAC,
+            CM_SLAC_MATCH | MMTYPE_REQ,
+            MatchReq(pev_mac=PEV_MAC, evse_mac=evse_mac, run_id=RUN_ID),
+        ),
+    ]
+    evse_slac_session.config.slac_validation = True
+    evse_slac_session.send_frame = AsyncMock()
+    evse_slac_session.evse_mac = evse_mac
+    evse_slac_session.pev_mac = PEV_MAC
+    evse_slac_session.run_id = RUN_ID
+    # The CP states do not start a new matching process while one is ongoing
+    evse_slac_session.matching_process_task = Mock()
+    controller = SlacSessionController()
+    controller._register_session(evse_slac_session)
+
+    async def toggle_cp():
+        while evse_slac_session.evse_id not in controller._cp_toggle_counters:
+            await asyncio.sleep(0.01)
+        for cp_state in ["C2", "B2", "C2", "B2", "C2"]:
+            await controller.process_cp_state(evse_slac_session, cp_state)
+
+    with patch("pyslac.session.readeth", new=AsyncMock(side_effect=frames)):
+        await asyncio.gather(
+            evse_slac_session.run_state_machine(
+                SlacEvseState.WAIT_SLAC_MATCH_REQ, SlacEvseState.MATCHED
+            ),
+            toggle_cp(),
+        )
+
+    assert evse_slac_session.state == STATE_MATCHED
+    validate_cnfs = [
+        ValidateCnf.from_bytes(call.args[0])
+        for call in evse_slac_session.send_frame.call_args_list
+        if HomePlugHeader.from_bytes(call.args[0]).mm_type == CM_VALIDATE | MMTYPE_CNF
+    ]
+    assert validate_cnfs == [
+        ValidateCnf(result=CM_VALIDATE_RESULT_READY),
+        ValidateCnf(result=CM_VALIDATE_RESULT_SUCCESS, toggle_num=2),
+    ]
+    assert not controller._cp_toggle_counters
+
+
+@pytest.mark.asyncio
+async def test_validation_not_required(evse_slac_session, evse_mac):
+    evse_slac_session.send_frame = AsyncMock()
+    evse_slac_session.pev_mac = PEV_MAC
+    frame = build_frame(evse_mac, PEV_MAC, CM_VALIDATE | MMTYPE_REQ, ValidateReq())
+
+    next_state = await evse_slac_session._on_validate_req(
+        SlacEvent(CM_VALIDATE | MMTYPE_REQ, frame)
+    )
+
+    assert next_state == evse_slac_session.fsm_state
+    assert ValidateCnf.from_bytes(
+        evse_slac_session.send_frame.call_args.args[0]
+    ) == ValidateCnf(result=CM_VALIDATE_RESULT_NOT_REQUIRED)
+
+
+@pytest.mark.asyncio
+async def test_session_registered_once(evse_slac_session):
+    """
+    The session is registered when its matching starts; the CP toggles during
+    the matching do not replace its hooks
+    """
+    controller = SlacSessionController()
+    with patch.object(controller, "start_matching", new=AsyncMock()):
+        await controller.process_cp_state(evse_slac_session, "B2")
+    assert controller.sessions == {evse_slac_session.evse_id: evse_slac_session}
+
+    count_cp_toggles = AsyncMock(return_value=2)
+    evse_slac_session.count_cp_toggles = count_cp_toggles
+    evse_slac_session.arbiter = None
+    controller.enable_attenuation_arbitration()
+    for cp_state in ["C2", "B2", "C2"]:
+        await controller.process_cp_state(evse_slac_session, cp_state)
+
+    assert evse_slac_session.count_cp_toggles is count_cp_toggles
+    assert evse_slac_session.arbiter is controller.arbiter
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_cancel_task_survives_a_dropped_cancellation():
+    """
+    The task is cancelled again if the first cancellation is dropped, as
+    asyncio.wait_for may do before Python 3.12
+    """
+    polls = 0
+
+    async def monitor():
+        nonlocal polls
+        while True:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                if polls == 0:
+                    polls += 1
+                    continue
+                raise
+
+    task = asyncio.create_task(monitor())
+    await asyncio.sleep(0)
+    await cancel_task(task)
+
+    assert task.cancelled()
+    assert polls == 1
@@ -0,0 +1,193 @@
+import io
+import json
+import socket
+import struct
+from unittest.mock import patch
+
+import pytest
+
+from pyslac.enums import (
+    CM_MNBC_SOUND,
+    CM_SLAC_PARM,
+    LINK_STATUS,
+    MMTYPE_CNF,
+    MMTYPE_IND,
+    MMTYPE_REQ,
+    SLAC_MSOUNDS,
+)
+from pyslac.fragmentation import fragment_frame
+from pyslac.layer_2_headers import EthernetHeader, HomePlugHeader, HomePlugVendorHeader
+from pyslac.messages import MnbcSound, SlacParmCnf, SlacParmReq
+from pyslac.sniffer import (
+    FrameFilter,
+    Sniffer,
+    build_filter,
+    main,
+    mm_type_name,
+    parse_mm_type,
+)
+from pyslac.vendor_messages import LinkStatusReq
+
+PEV_MAC = b"\xBB" * 6
+EVSE_MAC = b"\xAB" * 6
+RUN_ID = b"\xFA" * 8
+OTHER_RUN_ID = b"\x01" * 8
+
+
+def build_frame(mm_type: int, message, src_mac: bytes = PEV_MAC) -> bytes:
+    return bytes(
+        EthernetHeader(dst_mac=EVSE_MAC, src_mac=src_mac).pack_big()
+        + HomePlugHeader(mm_type).pack_big()
+        + message.pack_big()
+    )
+
+
+def write_pcap(frames) -> io.BytesIO:
+    pcap_file = io.BytesIO()
+    pcap_file.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+    for index, frame in enumerate(frames):
+        pcap_file.write(struct.pack("<IIII", 100, index, len(frame), len(frame)))
+        pcap_file.write(frame)
+    pcap_file.seek(0)
+    return pcap_file
+
+
+@pytest.fixture
+def frames():
+    return [
+        build_frame(CM_SLAC_PARM | MMTYPE_REQ, SlacParmReq(run_id=RUN_ID)),
+        build_frame(
+            CM_SLAC_PARM | MMTYPE_CNF,
+            SlacParmCnf(forwarding_sta=PEV_MAC, run_id=OTHER_RUN_ID),
+            src_mac=EVSE_MAC,
+        ),
+        build_frame(
+            CM_MNBC_SOUND | MMTYPE_IND, MnbcSound(cnt=SLAC_MSOUNDS, run_id=RUN_ID)
+        ),
+    ]
+
+
+def test_mm_type_names():
+    assert mm_type_name(CM_SLAC_PARM | MMTYPE_CNF) == "CM_SLAC_PARM.CNF"
+    assert mm_type_name(LINK_STATUS | MMTYPE_REQ) == "LINK_STATUS.REQ"
+    assert mm_type_name(0x1234) == "0x1234"
+    assert parse_mm_type("cm_slac_parm") == (CM_SLAC_PARM, True)
+    assert parse_mm_type("CM_SLAC_PARM.CNF") == (CM_SLAC_PARM | MMTYPE_CNF, False)
+    assert parse_mm_type("0x6064") == (CM_SLAC_PARM, False)
+    with pytest.raises(ValueError):
+        parse_mm_type("CM_SLAC_PARM.FOO")
+
+
+def test_read_pcap_text(frames):
+    output = io.StringIO()
+    sniffer = Sniffer(output=output)
+    sniffer.read_pcap(write_pcap(frames), batch_size=2)
+
+    lines = output.getvalue().splitlines()
+    assert len(lines) == 3
+    assert lines[0].startswith(
+        "100.000000 pcap bb:bb:bb:bb:bb:bb > ab:ab:ab:ab:ab:ab CM_SLAC_PARM.REQ"
+    )
+    assert f"run_id={RUN_ID.hex()}" in lines[0]
+    assert sniffer.frames_rcvd == sniffer.frames_printed == 3
+
+
+@pytest.mark.parametrize(
+    "frame_filter, expected_names",
+    [
+        (
+            build_filter(["CM_SLAC_PARM"], [], None),
+            ["CM_SLAC_PARM.REQ", "CM_SLAC_PARM.CNF"],
+        ),
+        (build_filter(["CM_SLAC_PARM.CNF"], [], None), ["CM_SLAC_PARM.CNF"]),
+        (FrameFilter(run_id=RUN_ID), ["CM_SLAC_PARM.REQ", "CM_MNBC_SOUND.IND"]),
+        (
+            build_filter([], ["ab:ab:ab:ab:ab:ab"], None),
+            ["CM_SLAC_PARM.REQ", "CM_SLAC_PARM.CNF", "CM_MNBC_SOUND.IND"],
+        ),
+        (build_filter([], ["bb-bb-bb-bb-bb-bb"], OTHER_RUN_ID.hex()), []),
+    ],
+)
+def test_filters(frames, frame_filter, expected_names):
+    output = io.StringIO()
+    sniffer = Sniffer(output=output, frame_filter=frame_filter, json_output=True)
+    sniffer.read_pcap(write_pcap(frames))
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record["name"] for record in records] == expected_names
+
+
+def test_fragmented_and_malformed_frames():
+    link_status_req = bytes(
+        EthernetHeader(dst_mac=EVSE_MAC, src_mac=PEV_MAC).pack_big()
+        + HomePlugVendorHeader(LINK_STATUS | MMTYPE_REQ).pack_big()
+        + LinkStatusReq().pack_big()
+    )
+    fragments = fragment_frame(
+        build_frame(CM_SLAC_PARM | MMTYPE_REQ, SlacParmReq(run_id=RUN_ID)),
+        fmsn=1,
+        max_fragment_size=5,
+    )
+    truncated_sound = build_frame(
+        CM_MNBC_SOUND | MMTYPE_IND, MnbcSound(cnt=SLAC_MSOUNDS, run_id=RUN_ID)
+    )[:40]
+    not_homeplug = b"\x00" * 12 + b"\x08\x00" + b"\x00" * 46
+
+    output = io.StringIO()
+    sniffer = Sniffer(output=output, json_output=True)
+    sniffer.process_batch(
+        [(0.0, "eth0", frame) for frame in fragments]
+        + [(0.0, "eth0", link_status_req), (0.0, "eth0", truncated_sound)]
+        + [(0.0, "eth0", not_homeplug)]
+    )
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert [record["name"] for record in records] == [
+        "CM_SLAC_PARM.REQ",
+        "LINK_STATUS.REQ",
+        "CM_MNBC_SOUND.IND",
+    ]
+    assert records[0]["message"]["run_id"] == RUN_ID.hex()
+    assert records[1]["message"] == {"oui": "00b052"}
+    assert records[2]["message"] is None
+    assert "error" in records[2]
+    assert sniffer.frames_malformed == 1
+
+
+def test_sniff_interfaces_batches_reads(frames):
+    rcv_socket, snd_socket = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    rcv_socket.setblocking(False)
+    for frame in frames:
+        snd_socket.send(frame)
+
+    output = io.StringIO()
+    sniffer = Sniffer(output=output)
+    batches = []
+
+    def process_batch(batch):
+        batches.append(batch)
+        raise KeyboardInterrupt
+
+    with patch("pyslac.sniffer.create_socket", return_value=rcv_socket), patch.object(
+        sniffer, "process_batch", side_effect=process_batch
+    ):
+        with pytest.raises(KeyboardInterrupt):
+            sniffer.sniff_interfaces(["eth0"])
+
+    snd_socket.close()
+    # All the frames queued were read in a single batch
+    assert len(batches) == 1
+    assert [frame for _, _, frame in batches[0]] == frames
+    assert all(iface == "eth0" for _, iface, _ in batches[0])
+
+
+def test_main_reads_pcap(frames, tmp_path, capsys):
+    pcap_path = tmp_path / "capture.pcap"
+    pcap_path.write_bytes(write_pcap(frames).getvalue())
+
+    assert main(["-r", str(pcap_path), "--json", "-t", "CM_MNBC_SOUND"]) == 0
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(records) == 1
+    assert records[0]["message"]["cnt"] == SLAC_MSOUNDS
+
+    pcap_path.write_bytes(b"\x0a\x0d\x0d\x0a" + b"\x00" * 40)
+    assert main(["-r", str(pcap_path)]) == 1
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from pyslac.enums import STATE_MATCHED
+from pyslac.environment import Config
+from pyslac.ev_session import SlacEvSession
+from pyslac.session import SlacEvseSession, SlacSessionController
+from pyslac.sockets.loopback import LoopbackNetwork
+from pyslac.state_store import PersistedSession, SessionStateStore
+
+EVSE_ID = "DE*12*122333"
+EVSE_MAC = b"\xAB" * 6
+PEV_MAC = b"\xBB" * 6
+
+
+def persisted_session(**kwargs) -> PersistedSession:
+    params = dict(
+        evse_id=EVSE_ID,
+        evse_mac=EVSE_MAC,
+        plc_node_mac=b"\x00\xb0\x52\x00\x00\x01",
+        nmk=b"\x01" * 16,
+        nid=b"\x02" * 7,
+    )
+    params.update(kwargs)
+    return PersistedSession(**params)
+
+
+def test_save_and_load(tmp_path):
+    store = SessionStateStore(str(tmp_path / "state"), EVSE_ID)
+    assert store.load() is None
+
+    store.save(persisted_session())
+    store.save(persisted_session(nmk_sent=True))
+
+    saved = store.load()
+    assert saved.nmk == b"\x01" * 16
+    assert saved.nmk_sent
+    assert saved.saved_at > 0
+    assert os.listdir(tmp_path / "state") == ["DE_12_122333.json"]
+    assert os.stat(store.path).st_mode & 0o777 == 0o600
+
+
+def test_unusable_state_ignored(tmp_path):
+    store = SessionStateStore(str(tmp_path), EVSE_ID)
+    with open(store.path, "w", encoding="utf-8") as file:
+        file.write('{"evse_id": "DE*12*122333", "nmk": ')
+    assert store.load() is None
+
+    store.save(persisted_session(evse_id="DE/12/122333"))
+    assert store.load() is None
+
+    store.clear()
+    store.clear()
+    assert not os.path.exists(store.path)
+
+
+def start_session(network: LoopbackNetwork, state_dir: str, socket=None):
+    """
+    A new session, as after a restart of the process; the socket given
+    stands for the PLC node, which keeps its key
+    """
+    socket = socket or network.attach(EVSE_MAC, plc_node=True)
+    return SlacEvseSession(EVSE_ID, "loop", Config(state_dir=state_dir), socket)
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_key_restored_after_restart(tmp_path):
+    network = LoopbackNetwork()
+    slac_session = start_session(network, str(tmp_path))
+    assert not await slac_session.evse_init_key()
+    await slac_session.wait_state_saved()
+
+    restarted = start_session(network, str(tmp_path), slac_session.socket)
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+
+    assert await restarted.evse_init_key()
+
+    assert (restarted.nmk, restarted.nid) == (slac_session.nmk, slac_session.nid)
+    # A single VS_NW_INFO exchange, without CM_SET_KEY nor settle time
+    assert loop.time() == started_at
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_key_not_restored_once_sent_to_an_ev(tmp_path):
+    network = LoopbackNetwork()
+    controller = SlacSessionController()
+    slac_session = start_session(network, str(tmp_path))
+    await slac_session.evse_init_key()
+    network.link(PEV_MAC, EVSE_MAC)
+    await controller.process_cp_state(slac_session, "B")
+    await asyncio.sleep(0)
+    ev = SlacEvSession("loop", network.attach(PEV_MAC), num_evses=1)
+    await ev.matching_process()
+    await slac_session.wait_state_saved()
+    assert slac_session.state_store.load().nmk_sent
+
+    # The process restarts while the EV is matched
+    restarted = start_session(network, str(tmp_path), slac_session.socket)
+
+    assert not await restarted.evse_init_key()
+    await restarted.wait_state_saved()
+    assert restarted.nmk != ev.nmk
+    assert not restarted.state_store.load().nmk_sent
+    await controller.process_cp_state(slac_session, "A")
+
+
+@pytest.mark.virtual_clock
+@pytest.mark.asyncio
+async def test_key_not_restored_if_plc_node_lost_it(tmp_path):
+    network = LoopbackNetwork()
+    slac_session = start_session(network, str(tmp_path))
+    await slac_session.evse_init_key()
+    await slac_session.wait_state_saved()
+    # e.g. the PLC node was power cycled along with the host
+    slac_session.socket.nid = b""
+
+    restarted = start_session(network, str(tmp_path), slac_session.socket)
+
+    assert not await restarted.evse_init_key()
+    assert restarted.socket.nid == restarted.nid
+
+
+@pytest.mark.asyncio
+async def test_state_saved_off_the_event_loop(tmp_path):
+    network = LoopbackNetwork()
+    slac_session = start_session(network, str(tmp_path))
+    writers = []
+    save = SessionStateStore.save
+
+    def record_writer(store, session_state):
+        writers.append(threading.get_ident())
+        save(store, session_state)
+
+    with patch.object(SessionStateStore, "save", new=record_writer):
+        await slac_session.evse_init_key()
+        # Changes of the session state alone are not saved
+        slac_session.state = STATE_MATCHED
+        await slac_session.wait_state_saved()
+
+    assert len(writers) == 1
+    assert threading.get_ident() not in writers
+    assert slac_session.state_store.load().nid == slac_session.nid
@@ -0,0 +1,129 @@
+import asyncio
+import json
+from typing import List
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from pyslac.enums import CM_SLAC_PARM, MMTYPE_REQ, STATE_MATCHING
+from pyslac.layer_2_headers import EthernetHeader, HomePlugHeader
+from pyslac.messages import SlacParmReq
+from pyslac.session import SlacSessionController
+from pyslac.tracing import NOOP_SPAN, NOOP_TRACER, JsonLinesExporter, Span, Tracer
+from pyslac.utils import cancel_task
+
+PEV_MAC = b"\xBB" * 6
+RUN_ID = b"\xFA" * 8
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+def test_spans_share_the_trace():
+    exporter = ListExporter()
+    tracer = Tracer(exporter)
+    root = tracer.start_span("matching_attempt", attributes={"evse_id": "EVSE1"})
+    child = tracer.start_span("SOUNDING", parent=root)
+    child.set_attribute("num_sounds", 10)
+    child.end()
+    root.set_error(TimeoutError("No sounds received"))
+    root.end()
+    root.end()
+
+    assert exporter.spans == [child, root]
+    assert child.trace_id == root.trace_id
+    assert child.parent_id == root.span_id
+    assert root.parent_id is None
+    assert child.attributes == {"num_sounds": 10}
+    assert root.status == "error"
+    assert root.as_dict()["duration_ms"] >= 0
+
+
+def test_noop_tracer():
+    span = NOOP_TRACER.start_span("matching_attempt")
+    assert span is NOOP_SPAN
+    span.set_attribute("run_id", "fafa")
+    span.end()
+    # A child of the no-op span is the root of a new trace
+    exporter = ListExporter()
+    child = Tracer(exporter).start_span("SOUNDING", parent=NOOP_SPAN)
+    assert child.parent_id is None
+
+
+def test_json_lines_exporter(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = JsonLinesExporter(str(path))
+    tracer = Tracer(exporter)
+    tracer.start_span("CM_SLAC_PARM.CNF", attributes={"run_id": "fafa"}).end()
+    tracer.start_span("CM_SLAC_MATCH.CNF").end()
+    exporter.close().result()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["CM_SLAC_PARM.CNF", "CM_SLAC_MATCH.CNF"]
+    assert spans[0]["attributes"] == {"run_id": "fafa"}
+
+
+@pytest.mark.asyncio
+async def test_session_trace(evse_slac_session, evse_mac):
+    """Tests the spans of a matching attempt that only gets to CM_SLAC_PARM"""
+    exporter = ListExporter()
+    evse_slac_session.tracer = Tracer(exporter)
+    slac_parm_req_frame = (
+        EthernetHeader(dst_mac=evse_mac, src_mac=PEV_MAC).pack_big()
+        + HomePlugHeader(CM_SLAC_PARM | MMTYPE_REQ).pack_big()
+        + SlacParmReq(RUN_ID).pack_big()
+    )
+    evse_slac_session.send_frame = AsyncMock()
+    evse_slac_session.start_trace(attempt=1)
+    with patch(
+        "pyslac.session.readeth", new=AsyncMock(return_value=slac_parm_req_frame)
+    ):
+        await evse_slac_session.evse_slac_parm()
+    evse_slac_session.end_trace()
+
+    response, phase, attempt = exporter.spans
+    assert (response.name, phase.name, attempt.name) == (
+        "CM_SLAC_PARM.CNF",
+        "WAIT_SLAC_PARM_REQ",
+        "matching_attempt",
+    )
+    assert response.parent_id == phase.span_id
+    assert phase.parent_id == attempt.span_id
+    assert attempt.attributes == {
+        "evse_id": evse_slac_session.evse_id,
+        "attempt": 1,
+        "run_id": RUN_ID.hex(),
+        "matched": False,
+    }
+    assert evse_slac_session.trace_span is NOOP_SPAN
+
+
+@pytest.mark.asyncio
+async def test_cancelled_matching_is_traced(evse_slac_session):
+    """The spans of a matching cancelled, e.g. on unplug, are still exported"""
+    exporter = ListExporter()
+    evse_slac_session.tracer = Tracer(exporter)
+
+    async def evse_slac_parm():
+        evse_slac_session.state = STATE_MATCHING
+
+    async def readeth(*args):
+        await asyncio.Event().wait()
+
+    evse_slac_session.evse_slac_parm = evse_slac_parm
+    with patch("pyslac.session.readeth", new=readeth):
+        task = asyncio.create_task(
+            SlacSessionController().start_matching(evse_slac_session)
+        )
+        await asyncio.sleep(0.01)
+        await cancel_task(task)
+
+    phase, attempt = exporter.spans
+    assert (phase.name, attempt.name) == ("WAIT_START_ATTEN_CHAR", "matching_attempt")
+    assert phase.status == attempt.status == "cancelled"
+    assert evse_slac_session.trace_span is NOOP_SPAN
@@ -0,0 +1,169 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from pyslac.enums import (
+    EVSE_PLC_MAC,
+    LINK_STATUS,
+    LINK_STATUS_CONNECTED,
+    LINK_STATUS_DISCONNECTED,
+    MMTYPE_CNF,
+    MMTYPE_REQ,
+    QUALCOMM_NID,
+    QUALCOMM_OUI,
+    VS_NW_INFO,
+    VS_RESET,
+    VS_SW_VER,
+)
+from pyslac.layer_2_headers import EthernetHeader, HomePlugVendorHeader
+from pyslac.vendor_messages import (
+    LinkStatusCnf,
+    LinkStatusReq,
+    NetworkInfo,
+    StationInfo,
+    VsNwInfoCnf,
+    VsResetCnf,
+    VsSwVerCnf,
+    VsSwVerReq,
+)
+
+PEV_MAC = b"\xBB" * 6
+HOST_MAC = b"\xAB" * 6
+
+
+def build_frame(mm_type: int, payload: bytes) -> bytes:
+    frame = (
+        EthernetHeader(dst_mac=HOST_MAC, src_mac=EVSE_PLC_MAC).pack_big()
+        + HomePlugVendorHeader(mm_type).pack_big()
+        + payload
+    )
+    # Min Ethernet frame size
+    return bytes(frame.ljust(60, b"\x00"))
+
+
+def test_vendor_header():
+    homeplug_header = HomePlugVendorHeader(LINK_STATUS | MMTYPE_REQ)
+    assert homeplug_header.pack_big() == b"\x00\xb8\xa0"
+
+    frame = build_frame(LINK_STATUS | MMTYPE_REQ, LinkStatusReq().pack_big())
+    assert HomePlugVendorHeader.from_bytes(frame) == homeplug_header
+    assert frame[17:20] == QUALCOMM_OUI
+    assert LinkStatusReq.from_bytes(frame) == LinkStatusReq()
+
+
+def test_sw_ver():
+    sw_ver_req = VsSwVerReq(cookie=0x01020304)
+    frame = build_frame(VS_SW_VER | MMTYPE_REQ, sw_ver_req.pack_big())
+    assert VsSwVerReq.from_bytes(frame) == sw_ver_req
+
+    sw_ver_cnf = VsSwVerCnf(
+        status=0x00,
+        device_id=0x21,
+        version="QCA7000-MAC-QCA7000-1.1.0.730-04",
+        upgradeable=0x01,
+        cookie=0x01020304,
+    )
+    frame = build_frame(VS_SW_VER | MMTYPE_CNF, sw_ver_cnf.pack_big())
+    assert VsSwVerCnf.from_bytes(frame) == sw_ver_cnf
+    assert sw_ver_cnf.is_success
+
+    # Older chips do not send the Upgradeable and Cookie fields
+    decoded = VsSwVerCnf.from_bytes(frame[: 20 + 3 + 128])
+    assert decoded.version == sw_ver_cnf.version
+    assert decoded.upgradeable == 0x00
+    assert decoded.cookie == 0x00
+
+
+def test_reset_cnf():
+    frame = build_frame(VS_RESET | MMTYPE_CNF, VsResetCnf(status=0x01).pack_big())
+    reset_cnf = VsResetCnf.from_bytes(frame)
+    assert reset_cnf.status == 0x01
+    assert not reset_cnf.is_success
+
+
+def test_nw_info_cnf():
+    networks = (
+        NetworkInfo(
+            nid=QUALCOMM_NID,
+            snid=0x0A,
+            tei=0x02,
+            role=0x00,
+            cco_mac=PEV_MAC,
+            cco_tei=0x01,
+            stations=(
+                StationInfo(PEV_MAC, 0x01, b"\x00" * 6, 10, 9),
+                StationInfo(b"\xCC" * 6, 0x03, b"\xDD" * 6, 8, 7),
+            ),
+        ),
+        NetworkInfo(
+            nid=b"\x01" * 7,
+            snid=0x0B,
+            tei=0x01,
+            role=0x02,
+            cco_mac=EVSE_PLC_MAC,
+            cco_tei=0x01,
+        ),
+    )
+    payload = VsNwInfoCnf(networks=networks).pack_big()
+    assert len(payload) == 4 + 2 * 18 + 2 * 15
+    nw_info_cnf = VsNwInfoCnf.from_bytes(build_frame(VS_NW_INFO | MMTYPE_CNF, payload))
+
+    assert nw_info_cnf.networks == networks
+    assert nw_info_cnf.has_nid(QUALCOMM_NID)
+    assert not nw_info_cnf.has_nid(b"\x02" * 7)
+    assert VsNwInfoCnf.from_bytes(
+        build_frame(VS_NW_INFO | MMTYPE_CNF, QUALCOMM_OUI + b"\x00")
+    ) == VsNwInfoCnf(networks=())
+
+
+def test_nw_info_cnf_truncated():
+    payload = QUALCOMM_OUI + b"\x01" + b"\x00" * 17 + b"\x03"
+    frame = EthernetHeader(dst_mac=HOST_MAC, src_mac=EVSE_PLC_MAC).pack_big()
+    frame += HomePlugVendorHeader(VS_NW_INFO | MMTYPE_CNF).pack_big() + payload
+    # The network announces 3 stations, but none is present
+    with pytest.raises(ValueError):
+        VsNwInfoCnf.from_bytes(bytes(frame))
+    # More networks announced than the ones present
+    with pytest.raises(ValueError):
+        VsNwInfoCnf.from_bytes(bytes(frame[:20]) + b"\x02" + b"\x00" * 18)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "status, link_status, expected",
+    [
+        (0x00, LINK_STATUS_CONNECTED, True),
+        (0x00, LINK_STATUS_DISCONNECTED, False),
+        (0x01, LINK_STATUS_CONNECTED, False),
+    ],
+)
+async def test_is_link_status_active(evse_slac_session, status, link_status, expected):
+    link_status_cnf = build_frame(
+        LINK_STATUS | MMTYPE_CNF,
+        LinkStatusCnf(status=status, link_status=link_status).pack_big(),
+    )
+    evse_slac_session.send_frame = AsyncMock()
+    with patch("pyslac.session.readeth", new=AsyncMock(return_value=link_status_cnf)):
+        assert await evse_slac_session.is_link_status_active() is expected
+
+    frame_sent = evse_slac_session.send_frame.call_args.args[0]
+    assert HomePlugVendorHeader.from_bytes(frame_sent) == HomePlugVendorHeader(
+        LINK_STATUS | MMTYPE_REQ
+    )
+    assert frame_sent[17:20] == QUALCOMM_OUI
+
+
+@pytest.mark.asyncio
+async def test_is_link_status_active_wrong_reply(evse_slac_session):
+    """
+    Frames other than LINK_STATUS.CNF are skipped, so the link is reported
+    as inactive once the CNF timeout expires
+    """
+    sw_ver_cnf = build_frame(
+        VS_SW_VER | MMTYPE_CNF,
+        VsSwVerCnf(status=0x00, device_id=0x21, version="1").pack_big(),
+    )
+    evse_slac_session.send_frame = AsyncMock()
+    with patch("pyslac.session.LINK_STATUS_TIMEOUT", 0.05):
+        with patch("pyslac.session.readeth", new=AsyncMock(return_value=sw_ver_cnf)):
+            assert not await evse_slac_session.is_link_status_active()